@@ -0,0 +1,73 @@
+import argparse
+import json
+import db
+import migrations
+
+# Enrollment analytics over EnrollmentCounts (migration 10), the per-course,
+# per-semester-label, per-status counters the Registrations triggers keep
+# current. A report reads at most one row per (course, label, status), so its
+# cost follows the catalog size, not the number of registrations.
+#
+#   python analytics.py --db university.db [--semester-label "Fall 2024"] [--top 10]
+
+REGISTERED = 'Registered'
+WAITLISTED = 'Waitlisted'
+DEFAULT_TOP = 10
+
+
+def _counts(conn, semester_label=None):
+    sql = """SELECT ec.course_id, c.course_name, c.capacity, ec.semester_label, ec.status, ec.count
+             FROM EnrollmentCounts ec LEFT JOIN Courses c ON c.course_id = ec.course_id"""
+    if semester_label is None: return conn.execute(sql).fetchall()
+    return conn.execute(sql + ' WHERE ec.semester_label = ?', (semester_label,)).fetchall()
+
+
+def fill_rate(registered, capacity):
+    """registered / capacity, or None for a course without a limit."""
+    return round(registered / capacity, 4) if capacity else None
+
+
+def enrollment(conn, semester_label=None, top=DEFAULT_TOP):
+    """Totals by status and by semester label, per-course counts with fill rates, and
+    the top courses by demand (registered + waitlisted). Fill rates are per label, so
+    a course's reported rate is its fullest label's."""
+    by_status, by_label, courses = {}, {}, {}
+    for course_id, name, capacity, label, status, count in _counts(conn, semester_label):
+        by_status[status] = by_status.get(status, 0) + count
+        label_totals = by_label.setdefault(label, {})
+        label_totals[status] = label_totals.get(status, 0) + count
+        course = courses.setdefault(course_id, {"course_id": course_id, "course_name": name, "capacity": capacity,
+                                                "registered": 0, "waitlisted": 0, "total": 0, "fill_rate": None, "_labels": {}})
+        course["total"] += count
+        if status == REGISTERED:
+            course["registered"] += count
+            course["_labels"][label] = count
+        elif status == WAITLISTED: course["waitlisted"] += count
+
+    for course in courses.values():
+        labels = course.pop("_labels")
+        if course["capacity"] and labels: course["fill_rate"] = fill_rate(max(labels.values()), course["capacity"])
+    rows = sorted(courses.values(), key=lambda c: c["course_id"])
+    demand = sorted(rows, key=lambda c: (-(c["registered"] + c["waitlisted"]), c["course_id"]))[:top]
+    return {
+        "semester_label": semester_label,
+        "total": sum(by_status.values()),
+        "by_status": by_status,
+        "by_semester_label": by_label,
+        "courses": rows,
+        "top_demand": [{"course_id": c["course_id"], "course_name": c["course_name"],
+                        "demand": c["registered"] + c["waitlisted"], "fill_rate": c["fill_rate"]} for c in demand],
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Print enrollment counts, fill rates and top-demand courses.')
+    parser.add_argument('--db', default=db.DB_PATH)
+    parser.add_argument('--semester-label')
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP)
+    args = parser.parse_args()
+
+    conn = db.open_raw(args.db)
+    migrations.migrate(conn)
+    print(json.dumps(enrollment(conn, args.semester_label, args.top), indent=2))
+    conn.close()
@@ -1,54 +1,127 @@
-import sqlite3
-import csv
 import io
-from flask import Flask, jsonify, request, make_response
+import logging
+from flask import Flask, Response, current_app, jsonify, request, make_response
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+import analytics
+import batch
+import catalog
+import conflicts
+import db
+import exports
+import listing
+import metrics
+import migrations
+import planner
+import precompute
+import registrations
+import roadmap_cache
+import serialize
+import simulation
+import student_state
+import timetable
+from prereq_graph import PrereqCycleError
+
+class FastJSONProvider(DefaultJSONProvider):
+    # jsonify() through serialize.dumps (orjson when installed); same compact, key-sorted output
+    def dumps(self, obj, **kwargs):
+        if kwargs.get('indent') is not None: return super().dumps(obj, **kwargs)
+        return serialize.dumps(obj, default=self.default, sort_keys=self.sort_keys).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return serialize.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Bytes straight into the response (no str round trip); pretty-printed output still goes through Flask
+        if (self.compact is None and current_app.debug) or self.compact is False: return super().response(*args, **kwargs)
+        if args and kwargs: raise TypeError('app.json.response() takes either args or kwargs, not both')
+        obj = kwargs or (args[0] if len(args) == 1 else list(args) if args else None)
+        return current_app.response_class(serialize.dumps(obj, default=self.default, sort_keys=self.sort_keys) + b'\n', mimetype=self.mimetype)
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(app)
+log = logging.getLogger('course_advisor')
+metrics.install()
+metrics.SAMPLED.extend([
+    ('course_advisor_roadmap_cache_hits_total', 'counter', 'Roadmap cache hits.', lambda: roadmap_cache.cache.hits),
+    ('course_advisor_roadmap_cache_misses_total', 'counter', 'Roadmap cache misses.', lambda: roadmap_cache.cache.misses),
+    ('course_advisor_roadmap_cache_entries', 'gauge', 'Roadmaps currently cached.', lambda: len(roadmap_cache.cache)),
+    ('course_advisor_db_pool_idle', 'gauge', 'Idle pooled SQLite connections.', db.idle_connections),
+    ('course_advisor_registration_writer_backlog', 'gauge', 'Register requests waiting for the writer.', registrations.WRITER.backlog),
+    ('course_advisor_registration_group_commits_total', 'counter', 'Registration transactions committed by the writer.', lambda: registrations.WRITER.commits),
+])
+
+@app.before_request
+def _start_metrics():
+    metrics.begin_request(request.url_rule.rule if request.url_rule else 'unmatched', request.method)
+
+@app.after_request
+def _status_metrics(response):
+    metrics.set_status(response.status_code)
+    return response
+
+@app.after_request
+def _compress(response):
+    # gzip/brotli for JSON, NDJSON and CSV bodies above the size threshold; streams are compressed chunk by chunk
+    if 'Content-Encoding' in response.headers or response.status_code < 200 or response.status_code in (204, 304): return response
+    if not serialize.compressible(response.mimetype): return response
+    response.vary.add('Accept-Encoding')
+    encoding = serialize.negotiate(request.headers.get('Accept-Encoding'))
+    if encoding is None: return response
+    if response.is_streamed:
+        response.response = serialize.compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < serialize.MIN_COMPRESS_BYTES: return response
+        response.set_data(serialize.compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+@app.teardown_request
+def _end_metrics(_exc):
+    metrics.end_request()
+
+def failure(e):
+    # Handled errors still answer {"success": False}, but are logged and counted
+    metrics.record_error(e)
+    log.warning('%s failed: %s', request.path, e, exc_info=True)
+    return jsonify({"success": False, "message": str(e)})
 
 def get_db_connection():
-    conn = sqlite3.connect('../university.db')
-    conn.row_factory = sqlite3.Row
-    return conn
-
-# --- HELPERS ---
-def get_course_type(course_id):
-    if any(x in course_id for x in ['CSDE', 'ITDC', 'SEDC', 'DSDC', 'AIDC']): return 'Elective'
-    return 'Core'
-
-def calculate_dependency_weight(course_id, prereqs_db, memo={}):
-    if course_id in memo: return memo[course_id]
-    dependents = [p['course_id'] for p in prereqs_db if p['prereq_id'] == course_id]
-    if not dependents: return 0
-    max_depth = 0
-    for dep in dependents:
-        depth = 1 + calculate_dependency_weight(dep, prereqs_db, memo)
-        if depth > max_depth: max_depth = depth
-    memo[course_id] = max_depth
-    return max_depth
+    return db.connect()
 
-# --- 1. AUTH ---
-@app.route('/api/login', methods=['POST'])
-def login():
-    data = request.json
+def init_db():
     conn = get_db_connection()
-    user = conn.execute('SELECT * FROM Users WHERE username = ? AND password = ?', 
-                        (data['username'], data['password'])).fetchone()
+    try: migrations.migrate(conn)
+    finally: conn.close()
+
+init_db()
+
+_ready = False
+
+def warm_up():
+    # Load the catalog snapshot and compile the prerequisite graph before serving (and, under gunicorn, before forking)
+    global _ready
+    snap = catalog.get_snapshot(get_db_connection)
+    try: planner.get_index(snap)
+    except PrereqCycleError as e: log.error('Planner unavailable: %s', e)
+    _ready = True
+
+# --- 1. AUTH ---
+def login_result(conn, username, password):
+    # One row: the user joined to its materialized StudentState (profile, registration flag, passed bitset)
+    user = conn.execute('SELECT u.username, u.role, s.* FROM Users u LEFT JOIN StudentState s ON s.roll_number = u.username '
+                        'WHERE u.username = ? AND u.password = ?', (username, password)).fetchone()
     if user:
         profile = {}
         passed_courses = []
         if user['role'] == 'student':
-            row = conn.execute('SELECT * FROM StudentProfiles WHERE roll_number = ?', (user['username'],)).fetchone()
-            if row: 
-                profile = dict(row)
-                current_label = f"Semester {profile['current_semester']}"
-                reg_check = conn.execute("SELECT 1 FROM Registrations WHERE roll_number=? AND semester_label LIKE ?", 
-                                         (user['username'], f'%{current_label}%')).fetchone()
-                profile['is_registered'] = True if reg_check else False
-                
-                passed_rows = conn.execute('SELECT course_id FROM PassedCourses WHERE roll_number = ?', (user['username'],)).fetchall()
-                passed_courses = [r['course_id'] for r in passed_rows]
+            if user['roll_number'] is not None:
+                state = student_state.ensure_passed(conn, dict(user))
+                profile = student_state.profile(state)
+                passed_courses = student_state.decode(catalog.get_snapshot(get_db_connection), state['passed'], conn)
             else:
                 profile = {
                     'roll_number': user['username'],
@@ -61,45 +134,143 @@ def login():
                 }
                 passed_courses = []
 
-        conn.close()
-        return jsonify({"success": True, "role": user['role'], "profile": profile, "username": user['username'], "passed_courses": passed_courses})
-    conn.close()
-    return jsonify({"success": False, "message": "Invalid Credentials"})
+        return {"success": True, "role": user['role'], "profile": profile, "username": user['username'], "passed_courses": passed_courses}
+    return {"success": False, "message": "Invalid Credentials"}
+
+@app.route('/api/login', methods=['POST'])
+def login():
+    data = request.json
+    conn = get_db_connection()
+    try: return jsonify(login_result(conn, data['username'], data['password']))
+    finally: conn.close()
 
 # --- 2. ADMIN ENDPOINTS ---
+STUDENTS_LIST = listing.Listing(
+    ['roll_number', 'full_name', 'father_name', 'gpa', 'cgpa', 'current_semester'],
+    'FROM StudentProfiles',
+    [('roll_number', 'ASC')],
+    {'semester': 'current_semester'})
+
+REGISTRATIONS_LIST = listing.Listing(
+    ['r.roll_number', 'r.course_id', 'c.course_name', 'r.semester_label', 'r.status'],
+    """FROM Registrations r
+       CROSS JOIN Courses c ON r.course_id = c.course_id""",
+    [('r.semester_label', 'DESC'), ('r.roll_number', 'ASC'), ('r.course_id', 'ASC')],
+    {'semester': 'r.semester', 'semester_label': 'r.semester_label', 'course_id': 'r.course_id', 'status': 'r.status'})
+
+COURSE_REGISTRATIONS_LIST = listing.Listing(
+    ['r.roll_number', 'sp.full_name', 'r.semester_label', 'r.status'],
+    """FROM Registrations r
+       CROSS JOIN StudentProfiles sp ON r.roll_number = sp.roll_number""",
+    [('r.semester_label', 'DESC'), ('r.roll_number', 'ASC')],
+    {'semester': 'r.semester', 'semester_label': 'r.semester_label', 'status': 'r.status'},
+    where='r.course_id = ?')
+
+def list_response(spec, params, base_params=()):
+    # Three shapes: the legacy full array, a keyset page when limit/cursor is given,
+    # or NDJSON streamed from the cursor with format=ndjson (or Accept: application/x-ndjson)
+    filters = {name: params.get(name) for name in spec.filters}
+    if params.get('format') == 'ndjson' or request.accept_mimetypes.best == 'application/x-ndjson':
+        return Response(spec.stream(get_db_connection, filters, base_params), mimetype='application/x-ndjson')
+    conn = get_db_connection()
+    try:
+        # Row JSON is built by SQLite (json_object), so no dict per row on the way out
+        if params.get('limit') or params.get('cursor'):
+            body = spec.page_json(conn, filters, params.get('cursor'), params.get('limit') or 100, base_params)
+        else:
+            body = spec.all_json(conn, filters, base_params)
+        return Response(body, mimetype='application/json')
+    except ValueError as e: return jsonify({"success": False, "message": str(e)}), 400
+    finally: conn.close()
+
 @app.route('/api/admin/students', methods=['GET'])
 def get_students():
-    conn = get_db_connection()
-    students = conn.execute('SELECT * FROM StudentProfiles').fetchall()
-    conn.close()
-    return jsonify([dict(s) for s in students])
+    return list_response(STUDENTS_LIST, request.args)
 
 @app.route('/api/admin/registrations', methods=['GET'])
 def get_all_registrations():
-    conn = get_db_connection()
-    query = """
-        SELECT DISTINCT r.roll_number, r.course_id, c.course_name, r.semester_label, r.status 
-        FROM Registrations r
-        JOIN Courses c ON r.course_id = c.course_id
-        ORDER BY r.semester_label DESC, r.roll_number
-    """
-    regs = conn.execute(query).fetchall()
-    conn.close()
-    return jsonify([dict(r) for r in regs])
+    return list_response(REGISTRATIONS_LIST, request.args)
 
 @app.route('/api/admin/registrations/course', methods=['POST'])
 def get_registrations_by_course():
     data = request.json
+    params = {**request.args.to_dict(), **data}
+    return list_response(COURSE_REGISTRATIONS_LIST, params, (data['course_id'],))
+
+@app.route('/api/admin/analytics', methods=['GET'])
+def enrollment_analytics():
+    # ?semester_label=...&top=N; read from the EnrollmentCounts counters, not from Registrations
+    conn = get_db_connection()
+    try: return jsonify(analytics.enrollment(conn, request.args.get('semester_label'), request.args.get('top', analytics.DEFAULT_TOP, type=int)))
+    finally: conn.close()
+
+@app.route('/api/admin/roadmap-cache', methods=['GET', 'DELETE'])
+def roadmap_cache_stats():
+    if request.method == 'DELETE': roadmap_cache.cache.clear()
+    return jsonify(roadmap_cache.cache.stats())
+
+@app.route('/api/admin/precompute', methods=['GET', 'POST'])
+def precompute_jobs():
+    # POST {strategy, semester | roll_numbers, workers} starts a background job over a process pool
+    conn = get_db_connection()
+    try:
+        if request.method == 'GET': return jsonify(precompute.list_jobs(conn))
+        data = request.json or {}
+        job_id = precompute.create_job(conn, data.get('strategy', 'balanced'), data.get('semester'), data.get('roll_numbers'))
+        precompute.start_job(job_id, data.get('workers'))
+        return jsonify({"success": True, "job": precompute.get_job(conn, job_id)})
+    except Exception as e: return failure(e)
+    finally: conn.close()
+
+@app.route('/api/admin/precompute/<int:job_id>', methods=['GET'])
+def precompute_job(job_id):
+    conn = get_db_connection()
+    try:
+        job = precompute.get_job(conn, job_id)
+        if job is None: return jsonify({"success": False, "message": "Unknown job"}), 404
+        return jsonify(job)
+    finally: conn.close()
+
+@app.route('/api/admin/precompute/<int:job_id>/<action>', methods=['POST'])
+def precompute_job_action(job_id, action):
+    conn = get_db_connection()
+    try:
+        if precompute.get_job(conn, job_id) is None: return jsonify({"success": False, "message": "Unknown job"}), 404
+        if action == 'resume': ok = precompute.start_job(job_id, (request.json or {}).get('workers') if request.is_json else None)
+        elif action == 'cancel': ok = precompute.cancel_job(conn, job_id)
+        else: return jsonify({"success": False, "message": f"Unknown action {action}"}), 400
+        return jsonify({"success": ok, "job": precompute.get_job(conn, job_id)})
+    finally: conn.close()
+
+@app.route('/api/admin/timetable/solve', methods=['POST'])
+def solve_timetable():
+    # {rooms, time_limit, courses: [ids] to re-place only those, dry_run: true to preview}
+    data = request.json or {}
+    conn = get_db_connection()
+    try:
+        time_limit = min(float(data.get('time_limit', 5)), 30)
+        assignment, stats = timetable.resolve(conn, data.get('courses'), data.get('rooms'), time_limit, not data.get('dry_run'))
+        result = {"success": True, "stats": stats}
+        if data.get('dry_run'):
+            result["schedule"] = [{"course_id": cid, "day": day, "start": start, "end": end}
+                                  for cid, day, start, end in timetable.schedule_rows(assignment, stats['changed_courses'])]
+        return jsonify(result)
+    except Exception as e: return failure(e)
+    finally: conn.close()
+
+@app.route('/api/admin/simulate', methods=['POST'])
+def simulate_catalog_change():
+    # {diff: {min_semester, credits, add_prereqs, remove_prereqs}, strategy, horizon, semester}; nothing is written
+    data = request.json or {}
     conn = get_db_connection()
-    query = """
-        SELECT DISTINCT r.roll_number, sp.full_name, r.semester_label, r.status
-        FROM Registrations r
-        JOIN StudentProfiles sp ON r.roll_number = sp.roll_number
-        WHERE r.course_id = ?
-    """
-    regs = conn.execute(query, (data['course_id'],)).fetchall()
-    conn.close()
-    return jsonify([dict(r) for r in regs])
+    try:
+        horizon = min(int(data.get('horizon', simulation.DEFAULT_HORIZON)), 3 * planner.MAX_SEMESTER)
+        report = simulation.simulate(conn, data.get('diff') or {}, data.get('strategy', 'balanced'), horizon,
+                                     data.get('semester'), catalog.get_snapshot(get_db_connection))
+        return jsonify({"success": True, **report})
+    except ValueError as e: return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e: return failure(e)
+    finally: conn.close()
 
 @app.route('/api/admin/add-student', methods=['POST'])
 def add_student():
@@ -110,7 +281,7 @@ def add_student():
         conn.execute('INSERT INTO StudentProfiles VALUES (?, ?, ?, ?, ?, ?)', 
                      (data['roll_number'], data['full_name'], data['father_name'], data['gpa'], data['cgpa'], data['current_semester']))
         conn.commit(); return jsonify({"success": True})
-    except Exception as e: return jsonify({"success": False, "message": str(e)})
+    except Exception as e: return failure(e)
     finally: conn.close()
 
 @app.route('/api/admin/delete-student', methods=['POST'])
@@ -121,7 +292,7 @@ def delete_student():
         conn.execute('DELETE FROM StudentProfiles WHERE roll_number = ?', (data['roll_number'],))
         conn.execute('DELETE FROM Users WHERE username = ?', (data['roll_number'],))
         conn.commit(); return jsonify({"success": True})
-    except Exception as e: return jsonify({"success": False, "message": str(e)})
+    except Exception as e: return failure(e)
     finally: conn.close()
 
 @app.route('/api/admin/add-course', methods=['POST'])
@@ -129,12 +300,28 @@ def add_course():
     data = request.json
     conn = get_db_connection()
     try:
-        conn.execute('INSERT INTO Courses VALUES (?,?,?,?,?)', (data['id'], data['name'], data['credits'], data['difficulty'], 1))
+        conn.execute('INSERT INTO Courses (course_id, course_name, credits, difficulty_level, min_semester, capacity) VALUES (?,?,?,?,?,?)',
+                     (data['id'], data['name'], data['credits'], data['difficulty'], 1, data.get('capacity')))
         # Basic schedule default
         conn.execute('INSERT INTO CourseSchedule (course_id, day_of_week, start_time, end_time) VALUES (?,?,?,?)', 
                      (data['id'], data['day'], data['start'], data['end']))
-        conn.commit(); return jsonify({"success": True})
-    except Exception as e: return jsonify({"success": False, "message": str(e)})
+        conn.commit(); catalog.bump_version()
+        return jsonify({"success": True})
+    except Exception as e: return failure(e)
+    finally: conn.close()
+
+@app.route('/api/admin/course-capacity', methods=['POST'])
+def set_course_capacity():
+    # {course_id, capacity}; null removes the limit. Seats freed by a raise go to the waitlist, oldest first
+    data = request.json
+    conn = get_db_connection()
+    try:
+        cur = conn.execute('UPDATE Courses SET capacity = ? WHERE course_id = ?', (data.get('capacity'), data['course_id']))
+        conn.commit()
+        if cur.rowcount == 0: return jsonify({"success": False, "message": "Unknown course"}), 404
+        catalog.bump_version()
+        return jsonify({"success": True, "promoted": registrations.promote_waitlist(conn, data['course_id'])})
+    except Exception as e: return failure(e)
     finally: conn.close()
 
 @app.route('/api/admin/update-schedule', methods=['POST'])
@@ -147,171 +334,327 @@ def update_schedule():
         conn.execute('DELETE FROM CourseSchedule WHERE course_id=?', (data['course_id'],))
         conn.execute('INSERT INTO CourseSchedule (course_id, day_of_week, start_time, end_time) VALUES (?,?,?,?)',
                      (data['course_id'], data['day'], data['start'], data['end']))
-        conn.commit(); return jsonify({"success": True})
-    except Exception as e: return jsonify({"success": False, "message": str(e)})
+        conn.commit(); catalog.bump_version()
+        return jsonify({"success": True})
+    except Exception as e: return failure(e)
     finally: conn.close()
 
 # --- 3. STUDENT ENDPOINTS ---
+def student_registrations(conn, roll_number):
+    rows = conn.execute('''
+        SELECT r.course_id, c.course_name, r.semester_label, r.semester, r.status
+        FROM Registrations r LEFT JOIN Courses c ON c.course_id = r.course_id
+        WHERE r.roll_number = ?
+        ORDER BY r.semester_label DESC, r.course_id
+    ''', (roll_number,)).fetchall()
+    return [dict(r) for r in rows]
+
+@app.route('/api/student/registrations', methods=['GET'])
+def get_student_registrations():
+    conn = get_db_connection()
+    try: return jsonify(student_registrations(conn, request.args['roll_number']))
+    finally: conn.close()
+
 @app.route('/api/student/register', methods=['POST'])
 def register_courses():
+    # Committed by the registration writer thread together with other waiting requests
     data = request.json
-    conn = get_db_connection()
     try:
         sem_label = data.get('semester_label', 'Unknown Semester')
-        for c_id in data['courses']:
-            exists = conn.execute('SELECT 1 FROM Registrations WHERE roll_number=? AND course_id=? AND semester_label=?', 
-                                  (data['username'], c_id, sem_label)).fetchone()
-            if not exists:
-                conn.execute('INSERT INTO Registrations (roll_number, course_id, semester_label, status) VALUES (?, ?, ?, ?)',
-                             (data['username'], c_id, sem_label, 'Registered'))
-        conn.commit()
-        return jsonify({"success": True})
-    except Exception as e: return jsonify({"success": False, "message": str(e)})
+        rows = [(data['username'], c_id, sem_label) for c_id in data['courses']]
+        outcomes = registrations.WRITER.register(rows)
+        return jsonify({"success": True, "results": [{"course_id": r[1], "outcome": o} for r, o in zip(rows, outcomes)]})
+    except registrations.WriterBusy as e:
+        metrics.record_error(e)
+        resp = jsonify({"success": False, "message": str(e)})
+        resp.status_code, resp.headers['Retry-After'] = 503, '1'
+        return resp
+    except Exception as e: return failure(e)
+
+@app.route('/api/admin/registrations/bulk', methods=['POST'])
+def register_bulk():
+    # Either explicit rows, or every listed student x every listed course under one label
+    data = request.json
+    conn = get_db_connection()
+    try:
+        if 'registrations' in data:
+            rows = [(r.get('roll_number'), r.get('course_id'), r.get('semester_label', data.get('semester_label'))) for r in data['registrations']]
+        else:
+            rows = [(roll, c_id, data['semester_label']) for roll in data['roll_numbers'] for c_id in data['courses']]
+        outcomes = registrations.register_bulk(conn, rows)
+        counts = {}
+        for o in outcomes: counts[o] = counts.get(o, 0) + 1
+        results = [{"roll_number": r[0], "course_id": r[1], "semester_label": r[2], "outcome": o} for r, o in zip(rows, outcomes)]
+        return jsonify({"success": True, "counts": counts, "results": results})
+    except Exception as e: return failure(e)
+    finally: conn.close()
+
+@app.route('/api/admin/registrations/import', methods=['POST'])
+def import_registrations():
+    # CSV upload (multipart "file" or a raw text/csv body), committed in batches as it streams in
+    upload = request.files.get('file')
+    raw = upload.stream if upload else request.stream
+    stream = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+    batch_size = request.args.get('batch_size', 5000, type=int)
+    conn = get_db_connection()
+    try:
+        result = registrations.import_csv(conn, stream, batch_size, request.args.get('semester_label'))
+        return jsonify({"success": True, **result})
+    except Exception as e: return failure(e)
     finally: conn.close()
 
 # --- 4. GENERAL & AI ---
 @app.route('/api/courses', methods=['GET'])
 def get_courses():
-    conn = get_db_connection()
-    courses = conn.execute('SELECT * FROM Courses').fetchall()
-    final_catalog = []
-    for c in courses:
-        c_id = c['course_id']
-        
-        # === UPDATE: FETCH ALL SCHEDULE ROWS ===
-        sched_rows = conn.execute('SELECT * FROM CourseSchedule WHERE course_id=?', (c_id,)).fetchall()
-        schedule_list = [{"day": s['day_of_week'], "start": s['start_time'], "end": s['end_time']} for s in sched_rows]
-        # =======================================
-        
-        prereqs = [r['prereq_id'] for r in conn.execute('SELECT prereq_id FROM Prerequisites WHERE course_id=?', (c_id,)).fetchall()]
-        
-        final_catalog.append({
-            "id": c_id, "name": c['course_name'], "credits": c['credits'], 
-            "difficulty": c['difficulty_level'], "prereqs": prereqs, "schedule": schedule_list
-        })
-    conn.close()
-    return jsonify(final_catalog)
+    snap = catalog.get_snapshot(get_db_connection)
+    encoding = serialize.negotiate(request.headers.get('Accept-Encoding')) if len(snap.body) >= serialize.MIN_COMPRESS_BYTES else None
+    if encoding:
+        # Compressed once per snapshot and encoding, at the highest level
+        resp = make_response(snap.derived(('body', encoding), lambda: serialize.compress(snap.body, encoding, cached=True)))
+        resp.headers['Content-Encoding'] = encoding
+        resp.set_etag(f"{snap.digest}-{encoding}")
+    else:
+        resp = make_response(snap.body)
+        resp.set_etag(snap.digest)
+    resp.mimetype = 'application/json'
+    resp.vary.add('Accept-Encoding')
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp.make_conditional(request)
+
+def conflict_result(new, curr):
+    if not new.get('schedule'): return {"conflict": False}
+
+    clash = conflicts.ScheduleIndex(curr).first_clash(new)
+    if clash:
+        ex, s1 = clash[4], clash[4]['schedule'][clash[3]]
+        return {"conflict": True, "message": f"Clash with {ex['name']} ({s1['day']} {s1['start']})" }
+    return {"conflict": False}
+
+def conflicts_result(schedule):
+    # "schedule" holds catalog course ids or full course objects
+    snap = catalog.get_snapshot(get_db_connection)
+    by_id = {c['id']: c for c in snap.payload}
+    try: courses = [by_id[c] if isinstance(c, str) else c for c in schedule]
+    except KeyError as e: return {"conflict": True, "message": f"Unknown course {e.args[0]}"}
+    clashes = conflicts.find_clashes(courses)
+    return {"conflict": bool(clashes), "clashes": clashes}
 
 @app.route('/api/check-conflict', methods=['POST'])
 def check_conflict():
     try:
         data = request.json
-        new, curr = data.get('new_course'), data.get('current_schedule')
-        if not new.get('schedule'): return jsonify({"conflict": False})
-        
-        for ex in curr:
-            if not ex.get('schedule'): continue
-            
-            # === UPDATE: LOOP THROUGH ALL SLOTS ===
-            # Compare every slot of New Course vs Every slot of Existing Course
-            for s1 in ex['schedule']:
-                for s2 in new['schedule']:
-                    if s1['day'] == s2['day']:
-                        if s1['start'] < s2['end'] and s2['start'] < s1['end']:
-                            return jsonify({"conflict": True, "message": f"Clash with {ex['name']} ({s1['day']} {s1['start']})" })
-            # ======================================
-            
-        return jsonify({"conflict": False})
+        return jsonify(conflict_result(data.get('new_course'), data.get('current_schedule')))
     except Exception as e:
+        metrics.record_error(e); log.exception('%s failed', request.path)
+        return jsonify({"conflict": True, "message": "Server Error"})
+
+@app.route('/api/check-conflicts', methods=['POST'])
+def check_conflicts():
+    # Whole-timetable check
+    try:
+        return jsonify(conflicts_result(request.json.get('schedule', [])))
+    except Exception as e:
+        metrics.record_error(e); log.exception('%s failed', request.path)
         return jsonify({"conflict": True, "message": "Server Error"})
 
 @app.route('/api/report/download', methods=['POST'])
 def download_report():
     schedule = request.json.get('schedule', [])
-    si = io.StringIO()
-    cw = csv.writer(si)
-    cw.writerow(['Course Code', 'Course Name', 'Credits', 'Day', 'Time'])
-    for c in schedule:
-        time = f"{c['schedule']['start']}-{c['schedule']['end']}" if c.get('schedule') else "TBA"
-        cw.writerow([c['id'], c['name'], c['credits'], c['schedule'].get('day', ''), time])
-    
-    output = make_response(si.getvalue())
-    output.headers["Content-Disposition"] = "attachment; filename=report.csv"
-    output.headers["Content-type"] = "text/csv"
-    return output
+    def rows():
+        for c in schedule:
+            time = f"{c['schedule']['start']}-{c['schedule']['end']}" if c.get('schedule') else "TBA"
+            yield [c['id'], c['name'], c['credits'], c['schedule'].get('day', ''), time]
+    return exports.csv_response('report.csv', ['Course Code', 'Course Name', 'Credits', 'Day', 'Time'], rows())
 
 # --- 4. SMART PATH GENERATOR (The AI Logic) ---
-@app.route('/api/generate-path', methods=['POST'])
-def generate_path():
+def plan_for_student(username, strategy='balanced', current_schedule=(), mode='greedy', deadline_ms=planner.DEFAULT_DEADLINE_MS, stats=None, conn=None):
+    # conn: an already open connection (e.g. a batch's shared reader); otherwise one is borrowed from the pool
+    snap = catalog.get_snapshot(get_db_connection)
+    own_conn = conn is None
+    if own_conn: conn = get_db_connection()
     try:
-        data = request.json
-        username = data.get('username')
-        strategy = data.get('strategy', 'balanced')
-        current_schedule = data.get('current_schedule', [])
-        
-        conn = get_db_connection()
-        
-        passed_courses_rows = conn.execute('SELECT course_id FROM PassedCourses WHERE roll_number = ?', (username,)).fetchall()
-        passed = {row['course_id'] for row in passed_courses_rows}
+        state = student_state.load(conn, username)
+        if state is not None:
+            passed = set(student_state.decode(snap, state['passed'], conn))
+        else:
+            passed = {row['course_id'] for row in conn.execute('SELECT course_id FROM PassedCourses WHERE roll_number = ?', (username,))}
         
         for c in current_schedule: 
             passed.add(c['id'])
         
-        student = conn.execute('SELECT current_semester FROM StudentProfiles WHERE roll_number = ?', (username,)).fetchone()
-        start_sem = (student['current_semester'] + 1) if student else 1
-        all_courses = conn.execute('SELECT * FROM Courses').fetchall()
-        prereqs_db = conn.execute('SELECT * FROM Prerequisites').fetchall()
-        conn.close()
-
-        courses_map = {c['course_id']: dict(c) for c in all_courses}
-        adj_list = {c['course_id']: [] for c in all_courses}
-        for p in prereqs_db: 
-            if p['course_id'] in adj_list: adj_list[p['course_id']].append(p['prereq_id'])
-        
-        course_weights = {c['course_id']: calculate_dependency_weight(c['course_id'], prereqs_db, {}) for c in all_courses}
-        roadmap = []
-        remaining = [c['course_id'] for c in all_courses if c['course_id'] not in passed]
-        current_sem = start_sem
-        
-        while remaining and current_sem <= 8:
-            semester_load = []
-            credits_sum = 0
-            electives_count = 0
-            explanation = []
-            candidates = []
-            for cid in remaining:
-                course = courses_map[cid]
-                if not all(r in passed for r in adj_list.get(cid, [])): continue
-                min_sem = course['min_semester'] if course['min_semester'] else 1
-                if current_sem < min_sem: continue
-                if course['course_id'] in ['CMPC-6702', 'CMPC-6703']: continue
-                candidates.append(course)
-
-            def score_course(c):
-                diff = c['difficulty_level'] if c.get('difficulty_level') else 3
-                crit = course_weights[c['course_id']]
-                is_elec = 1 if get_course_type(c['course_id']) == 'Elective' else 0
-                score = crit * 15
-                if strategy == 'aggressive': score += diff * 5
-                elif strategy == 'relaxed': score -= diff * 20
-                else:
-                    if current_sem <= 2: score -= diff * 10
-                    elif current_sem >= 7: score += diff * 5
-                return score
-
-            candidates.sort(key=score_course, reverse=True)
-            limit = 14 if strategy == 'relaxed' else 18
-
-            for c in candidates:
-                if credits_sum + c['credits'] > limit: continue
-                if get_course_type(c['course_id']) == 'Elective':
-                    if electives_count >= 2: continue
-                    electives_count += 1
-                semester_load.append(c)
-                credits_sum += c['credits']
-            
-            if not semester_load:
-                if not candidates: current_sem += 1; continue
-                break
-                
-            if current_sem <= 2: explanation.append("Focusing on foundational courses.")
-            roadmap.append({"semester": current_sem, "courses": semester_load, "total_credits": credits_sum, "reason": " ".join(explanation)})
-            for c in semester_load: passed.add(c['course_id']); remaining.remove(c['course_id'])
-            current_sem += 1
-            
-        return jsonify(roadmap)
-    except Exception as e: print(e); return jsonify([])
+        start_sem = (state['current_semester'] + 1) if state else 1
+
+        passed_mask = planner.get_index(snap).mask_of(passed)
+        key = roadmap_cache.make_key(snap.digest, passed_mask, strategy, start_sem, mode)
+        cached = roadmap_cache.cache.get(key)
+        source = 'cache'
+        if cached is None and mode != 'optimal':
+            # Precomputed cohort plans are served only while their key (catalog, passed set, semester) matches
+            roadmap = precompute.lookup(conn, username, strategy, key)
+            if roadmap is not None:
+                cached = (roadmap, {})
+                roadmap_cache.cache.put(key, cached)
+                source = 'precomputed'
+    finally:
+        if own_conn: conn.close()
+
+    if cached is None:
+        plan_stats, source = {}, 'computed'
+        if mode == 'optimal':
+            roadmap = planner.search_roadmap(snap, passed_mask, start_sem, strategy, deadline_ms, plan_stats)
+        else:
+            roadmap = planner.plan_roadmap(snap, passed_mask, start_sem, strategy)
+        cached = (roadmap, plan_stats)
+        # A search cut off by its deadline may do better with more time, so only proven plans are kept
+        if mode != 'optimal' or plan_stats['optimal']: roadmap_cache.cache.put(key, cached)
+    # The cached stats describe how the plan was made; source is where this call got it from
+    if stats is not None: stats.update(cached[1], source=source)
+    return cached[0]
+
+@app.route('/api/generate-path', methods=['POST'])
+def generate_path():
+    try:
+        data = request.json
+        # mode "optimal" searches for the fewest semesters within deadline_ms, returning the best plan found so far
+        deadline_ms = min(max(int(data.get('deadline_ms', planner.DEFAULT_DEADLINE_MS)), 1), planner.MAX_DEADLINE_MS)
+        stats = {}
+        resp = jsonify(plan_for_student(data.get('username'), data.get('strategy', 'balanced'), data.get('current_schedule', []),
+                                        data.get('mode', 'greedy'), deadline_ms, stats))
+        resp.headers['X-Plan-Source'] = stats['source']
+        if 'optimal' in stats:
+            resp.headers['X-Plan-Optimal'] = 'true' if stats['optimal'] else 'false'
+            resp.headers['X-Plan-Semesters'] = str(stats['semesters'])
+            resp.headers['X-Plan-Lower-Bound'] = str(stats['lower_bound'])
+            resp.headers['X-Plan-Exceeds-Max-Semester'] = 'true' if stats['exceeds_max_semester'] else 'false'
+        return resp
+    except Exception as e:
+        metrics.record_error(e); log.exception('generate-path failed')
+        return jsonify([])
+
+@app.route('/api/generate-path/batch', methods=['POST'])
+def generate_path_batch():
+    # Plans for a list of roll numbers, or a whole cohort via {"semester": N}, with one DB load
+    data = request.json
+    strategy = data.get('strategy', 'balanced')
+    conn = get_db_connection()
+    try:
+        if data.get('roll_numbers') is not None:
+            rolls = list(dict.fromkeys(data['roll_numbers']))
+            semesters, passed = {}, {r: set() for r in rolls}
+            for chunk in (rolls[k:k + 500] for k in range(0, len(rolls), 500)):
+                marks = ','.join('?' * len(chunk))
+                for row in conn.execute(f'SELECT roll_number, current_semester FROM StudentProfiles WHERE roll_number IN ({marks})', chunk):
+                    semesters[row['roll_number']] = row['current_semester']
+                for row in conn.execute(f'SELECT roll_number, course_id FROM PassedCourses WHERE roll_number IN ({marks})', chunk):
+                    passed[row['roll_number']].add(row['course_id'])
+        else:
+            cohort = data['semester']
+            semesters = {r['roll_number']: r['current_semester'] for r in
+                         conn.execute('SELECT roll_number, current_semester FROM StudentProfiles WHERE current_semester = ?', (cohort,))}
+            rolls, passed = list(semesters), {r: set() for r in semesters}
+            query = """
+                SELECT pc.roll_number, pc.course_id FROM PassedCourses pc
+                JOIN StudentProfiles sp ON sp.roll_number = pc.roll_number
+                WHERE sp.current_semester = ?
+            """
+            for row in conn.execute(query, (cohort,)):
+                passed[row['roll_number']].add(row['course_id'])
+    except Exception as e: return failure(e)
+    finally: conn.close()
+
+    try:
+        snap = catalog.get_snapshot(get_db_connection)
+        idx = planner.get_index(snap)
+        plans, memo = {}, {}
+        for roll in rolls:
+            start_sem = (semesters[roll] + 1) if roll in semesters else 1
+            key = (idx.mask_of(passed[roll]), start_sem)
+            # Cohorts share passed sets, so most students reuse an already computed plan
+            if key not in memo:
+                memo[key] = roadmap_cache.cache.get_or_compute(
+                    roadmap_cache.make_key(snap.digest, key[0], strategy, start_sem),
+                    lambda: (planner.plan_roadmap(snap, key[0], start_sem, strategy), {}))[0]
+            plans[roll] = memo[key]
+        return jsonify({"success": True, "plans": plans})
+    except Exception as e: return failure(e)
+
+# Sub-operations accepted by /api/batch; each returns what its standalone endpoint would
+BATCH_OPS = {
+    'login': lambda conn, username, password: login_result(conn, username, password),
+    'courses': lambda conn: catalog.get_snapshot(get_db_connection).payload,
+    'registrations': lambda conn, roll_number: student_registrations(conn, roll_number),
+    'generate_path': lambda conn, username, strategy='balanced', current_schedule=(), mode='greedy', deadline_ms=planner.DEFAULT_DEADLINE_MS:
+        plan_for_student(username, strategy, current_schedule, mode,
+                         min(max(int(deadline_ms), 1), planner.MAX_DEADLINE_MS), conn=conn),
+    'check_conflict': lambda conn, new_course, current_schedule: conflict_result(new_course, current_schedule),
+    'check_conflicts': lambda conn, schedule: conflicts_result(schedule),
+}
+
+@app.route('/api/batch', methods=['POST'])
+def run_batch():
+    # {"ops": {"name": {"op": "courses", "args": {...}}}} -> {"results": {"name": ...}, "errors": {"name": "..."}}
+    try: ops = batch.parse(request.json, BATCH_OPS)
+    except batch.BatchError as e: return jsonify({"success": False, "message": str(e)}), 400
+    conn = get_db_connection()
+    try:
+        results, errors = batch.run(conn, ops)
+        return jsonify({"success": not errors, "results": results, "errors": errors})
+    except Exception as e: return failure(e)
+    finally: conn.close()
+
+# --- 5. SERVER-SIDE EXPORTS (streamed CSV) ---
+@app.route('/api/export/plan', methods=['GET'])
+def export_plan():
+    username = request.args['username']
+    roadmap = plan_for_student(username, request.args.get('strategy', 'balanced'))
+    snap = catalog.get_snapshot(get_db_connection)
+    return exports.csv_response(f'plan_{username}.csv', exports.PLAN_HEADER, exports.plan_rows(roadmap, snap.schedules))
+
+@app.route('/api/export/registrations', methods=['GET'])
+def export_registrations():
+    if request.args.get('semester'):
+        try: semester = int(request.args['semester'])
+        except ValueError: return jsonify({"success": False, "message": "semester must be an integer"}), 400
+        where, params, name = 'r.semester = ?', (semester,), f"registrations_semester_{semester}.csv"
+    elif request.args.get('semester_label'):
+        where, params, name = 'r.semester_label = ?', (request.args['semester_label'],), 'registrations.csv'
+    else:
+        where, params, name = '1 = 1', (), 'registrations.csv'
+    rows = exports.query_rows(get_db_connection, exports.REGISTRATIONS_SQL.format(where=where), params)
+    return exports.csv_response(name, exports.REGISTRATIONS_HEADER, rows)
+
+@app.route('/api/export/roster', methods=['GET'])
+def export_roster():
+    course_id = request.args['course_id']
+    rows = exports.query_rows(get_db_connection, exports.ROSTER_SQL, (course_id,))
+    return exports.csv_response(f'roster_{course_id}.csv', exports.ROSTER_HEADER, rows)
+
+@app.route('/api/export/students', methods=['GET'])
+def export_students():
+    rows = exports.query_rows(get_db_connection, exports.STUDENTS_SQL)
+    return exports.csv_response('students.csv', exports.STUDENTS_HEADER, rows)
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    return jsonify({"status": "ok"})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    # Ready once warmed up and the database answers at the latest schema version
+    if not _ready: return jsonify({"ready": False, "reason": "warming up"}), 503
+    conn = get_db_connection()
+    try: version = migrations.current_version(conn)
+    except Exception as e: return jsonify({"ready": False, "reason": str(e)}), 503
+    finally: conn.close()
+    if version != migrations.latest_version(): return jsonify({"ready": False, "reason": f"schema version {version}"}), 503
+    return jsonify({"ready": True, "catalog": catalog.get_snapshot(get_db_connection).digest})
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    warm_up()
     print("✅ Final Backend Running on Port 5000")
     app.run(port=5000, debug=True)
@@ -0,0 +1,75 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+
+# Composite read requests. A batch names several read-only sub-operations
+# ({"ops": {"name": {"op": "courses", "args": {...}}}}); they share one pooled
+# connection inside a single read transaction, so every operation sees the same
+# database snapshot, and independent operations run on a small thread pool.
+# Statements are serialized on the shared connection; planning and conflict
+# checks overlap with them.
+
+MAX_OPS = 20
+MAX_WORKERS = 4
+
+
+class BatchError(ValueError):
+    pass
+
+
+class _Rows(list):
+    """Fully fetched result that still answers fetchone()/fetchall()."""
+
+    def fetchone(self):
+        return self[0] if self else None
+
+    def fetchall(self):
+        return list(self)
+
+
+class SnapshotReader:
+    """Connection stand-in shared by a batch's operations; execute() is serialized."""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._lock = threading.Lock()
+
+    def execute(self, sql, params=()):
+        with self._lock:
+            return _Rows(self._conn.execute(sql, params).fetchall())
+
+
+def parse(payload, handlers):
+    ops = (payload or {}).get('ops')
+    if not isinstance(ops, dict) or not ops: raise BatchError('Expected {"ops": {"name": {"op": ..., "args": {...}}}}')
+    if len(ops) > MAX_OPS: raise BatchError(f'At most {MAX_OPS} operations per batch')
+    parsed = {}
+    for name, spec in ops.items():
+        op = spec.get('op') if isinstance(spec, dict) else None
+        if op not in handlers: raise BatchError(f'{name}: unknown op {op!r} (expected one of {", ".join(sorted(handlers))})')
+        parsed[name] = (handlers[op], spec.get('args') or {})
+    return parsed
+
+
+def run(conn, ops):
+    """Run parsed ops against conn in one read transaction. Returns (results, errors) keyed by op name."""
+    reader = SnapshotReader(conn)
+    parent = metrics.current()
+    results, errors = {}, {}
+
+    def call(name, handler, args):
+        with metrics.adopt(parent):
+            return handler(reader, **args)
+
+    conn.execute('BEGIN')  # deferred: the snapshot is taken by the first read and held until rollback
+    try:
+        with ThreadPoolExecutor(min(len(ops), MAX_WORKERS)) as pool:
+            futures = {name: pool.submit(call, name, handler, args) for name, (handler, args) in ops.items()}
+            for name, future in futures.items():
+                try: results[name] = future.result()
+                except Exception as e:
+                    metrics.record_error(e)
+                    errors[name] = f"{type(e).__name__}: {e}" if isinstance(e, (KeyError, TypeError)) else str(e)
+    finally:
+        conn.rollback()  # read-only
+    return results, errors
@@ -0,0 +1,215 @@
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import catalog
+import db
+import synthetic
+
+# Endpoint benchmark suite. Seeds synthetic databases at several sizes, drives
+# every route through the Flask test client and records latency percentiles,
+# throughput and SQL statements per request. Results are written as JSON and can
+# be compared against a stored baseline; exceeding the regression threshold makes
+# the run exit non-zero so it can gate CI. Seeded databases are cached as
+# templates and every run benchmarks a fresh copy, so write routes (register)
+# never change what the next run starts from.
+#
+#   python benchmark.py --sizes small,medium --output bench_results.json
+#   python benchmark.py --sizes small --baseline bench_baseline.json --threshold 0.25
+
+SIZES = {
+    'small': {'courses': 60, 'students': 2000},
+    'medium': {'courses': 200, 'students': 20000},
+    'large': {'courses': 500, 'students': 200000},
+}
+
+# Counted across threads: register requests run their SQL on the registration
+# writer thread, and scenarios are driven one request at a time
+_statements = [0]
+_statements_lock = threading.Lock()
+
+
+def _count_statement(_sql):
+    with _statements_lock: _statements[0] += 1
+
+
+def percentile(sorted_values, p):
+    if not sorted_values: return 0.0
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))  # nearest rank
+    return sorted_values[k]
+
+
+class Fixture:
+    """Request payload material picked (deterministically) from a seeded database."""
+
+    def __init__(self, client, path, seed):
+        rng = random.Random(seed)
+        conn = db.open_raw(path)
+        self.students = [r[0] for r in conn.execute('SELECT roll_number FROM StudentProfiles ORDER BY roll_number')]
+        conn.close()
+        self.catalog = client.get('/api/courses').get_json()
+        self.etag = client.get('/api/courses').headers['ETag']
+        self.rng = rng
+        self.counter = 0
+
+    def student(self):
+        return self.rng.choice(self.students)
+
+    def courses(self, k):
+        return self.rng.sample(self.catalog, min(k, len(self.catalog)))
+
+    def unique_label(self):
+        self.counter += 1
+        return f"Benchmark #{self.counter}"
+
+
+def scenarios(fx):
+    """(name, method, url, payload factory, headers)"""
+    return [
+        ('login', 'POST', '/api/login', lambda: {'username': fx.student(), 'password': '1234'}, None),
+        ('courses', 'GET', '/api/courses', None, None),
+        ('courses_304', 'GET', '/api/courses', None, {'If-None-Match': fx.etag}),
+        ('check_conflict', 'POST', '/api/check-conflict',
+         lambda: (lambda cs: {'new_course': cs[0], 'current_schedule': cs[1:]})(fx.courses(7)), None),
+        ('check_conflicts', 'POST', '/api/check-conflicts', lambda: {'schedule': [c['id'] for c in fx.courses(8)]}, None),
+        ('generate_path', 'POST', '/api/generate-path', lambda: {'username': fx.student(), 'strategy': 'balanced'}, None),
+        ('generate_path_batch', 'POST', '/api/generate-path/batch',
+         lambda: {'roll_numbers': [fx.student() for _ in range(50)]}, None),
+        ('admin_students', 'GET', '/api/admin/students?limit=100', None, None),
+        ('admin_registrations', 'GET', '/api/admin/registrations?limit=100', None, None),
+        ('admin_registrations_course', 'POST', '/api/admin/registrations/course',
+         lambda: {'course_id': fx.courses(1)[0]['id'], 'limit': 100}, None),
+        ('register', 'POST', '/api/student/register',
+         lambda: {'username': fx.student(), 'courses': [c['id'] for c in fx.courses(6)], 'semester_label': fx.unique_label()}, None),
+    ]
+
+
+def run_scenario(client, method, url, payload, headers, iterations, warmup):
+    latencies, statements = [], []
+    for i in range(warmup + iterations):
+        body = payload() if payload else None
+        _statements[0] = 0
+        t = time.perf_counter()
+        resp = client.open(url, method=method, json=body, headers=headers)
+        resp.get_data()  # drain streamed bodies inside the timing window
+        elapsed = time.perf_counter() - t
+        if resp.status_code >= 500: raise RuntimeError(f"{method} {url} -> {resp.status_code}")
+        if i >= warmup:
+            latencies.append(elapsed * 1000)
+            statements.append(_statements[0])
+    latencies.sort()
+    total_s = sum(latencies) / 1000
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(sum(latencies) / len(latencies), 3),
+        'throughput_rps': round(iterations / total_s, 1) if total_s else None,
+        'queries_per_request': round(sum(statements) / len(statements), 2),
+    }
+
+
+def seed_database(size, data_dir, seed):
+    spec = SIZES[size]
+    path = os.path.join(data_dir, f"bench_{size}_{spec['courses']}c_{spec['students']}s_seed{seed}.db")
+    if not os.path.exists(path):
+        print(f"... seeding {size} database ({spec['courses']} courses, {spec['students']} students)")
+        synthetic.generate(path, spec['courses'], spec['students'], seed, log=lambda m: print(f"    {m}"))
+    return path
+
+
+def working_copy(path, work_dir):
+    """A copy of a seeded database for one run; the cached template is never opened for writing."""
+    copy = os.path.join(work_dir, os.path.basename(path))
+    shutil.copyfile(path, copy)
+    return copy
+
+
+def run(sizes, iterations, warmup, data_dir, seed, only=None):
+    db.TRACE_HOOKS.append(_count_statement)
+    results = {}
+    app_module = None
+    work_dir = tempfile.mkdtemp(prefix='course_advisor_bench_')
+    try:
+        for size in sizes:
+            path = working_copy(seed_database(size, data_dir, seed), work_dir)
+            db.configure(path)
+            if app_module is None:
+                import app as app_module  # imported after configure so its startup migration targets the bench DB
+            else:
+                app_module.init_db()
+            catalog.bump_version()
+            client = app_module.app.test_client()
+            fx = Fixture(client, path, seed)
+            results[size] = {}
+            for name, method, url, payload, headers in scenarios(fx):
+                if only and name not in only: continue
+                results[size][name] = run_scenario(client, method, url, payload, headers, iterations, warmup)
+                r = results[size][name]
+                print(f"  {size:<7} {name:<28} p50 {r['p50_ms']:>8.2f}ms  p95 {r['p95_ms']:>8.2f}ms  "
+                      f"p99 {r['p99_ms']:>8.2f}ms  {r['throughput_rps'] or 0:>8.1f} req/s  {r['queries_per_request']:>5.1f} q/req")
+    finally:
+        db.TRACE_HOOKS.remove(_count_statement)
+        db.reset_pool()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Regressions where p95 grew by more than threshold, or queries per request went up."""
+    regressions = []
+    for size, scenarios_ in results.items():
+        for name, r in scenarios_.items():
+            base = baseline.get(size, {}).get(name)
+            if not base: continue
+            if r['p95_ms'] > base['p95_ms'] * (1 + threshold):
+                regressions.append(f"{size}/{name}: p95 {base['p95_ms']}ms -> {r['p95_ms']}ms")
+            if r['queries_per_request'] > base['queries_per_request']:
+                regressions.append(f"{size}/{name}: queries/request {base['queries_per_request']} -> {r['queries_per_request']}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the backend endpoints against seeded databases.')
+    parser.add_argument('--sizes', default='small', help=f"comma separated, from {', '.join(SIZES)}")
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--scenarios', default=None, help='comma separated subset of scenario names')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'course_advisor_bench'),
+                        help='where seeded databases are cached between runs')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', default=None, help='baseline results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed relative p95 regression (0.2 = 20%%)')
+    parser.add_argument('--save-baseline', action='store_true', help='write this run to --baseline instead of comparing')
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    sizes = [s.strip() for s in args.sizes.split(',') if s.strip()]
+    only = set(args.scenarios.split(',')) if args.scenarios else None
+    results = run(sizes, args.iterations, args.warmup, args.data_dir, args.seed, only)
+
+    report = {'meta': {'iterations': args.iterations, 'warmup': args.warmup, 'seed': args.seed,
+                       'python': sys.version.split()[0], 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')},
+              'results': results}
+    with open(args.output, 'w') as f: json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, 'w') as f: json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as f: baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for r in regressions: print(f"   - {r}")
+            sys.exit(1)
+        print(f"\n✅ No regressions beyond {args.threshold:.0%} against {args.baseline}")
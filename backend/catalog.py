@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import serialize
+from prereq_graph import PrereqGraph
+
+# In-process catalog cache. Courses, schedules and prerequisites are loaded
+# with set-based queries into a CatalogSnapshot, which is rebuilt only when
+# the version counter moves (bump_version is called by every catalog write).
+# Writes made by other processes (other server workers, scripts) are picked up
+# by polling the trigger-maintained CatalogVersion row every CHECK_INTERVAL.
+
+CHECK_INTERVAL = float(os.environ.get('COURSE_ADVISOR_CATALOG_CHECK_S', '1.0'))
+
+_lock = threading.Lock()
+_version = 0
+_snapshot = None
+_db_version = None
+_checked_at = 0.0
+
+# Callables run after every version bump (caches derived from the catalog)
+ON_CHANGE = []
+
+
+class CatalogSnapshot:
+    def __init__(self, version, courses, schedules, prereqs, course_bits=()):
+        self.version = version
+        self.courses = courses            # [dict(Courses row)] in catalog order
+        self.schedules = schedules        # course_id -> [{"day", "start", "end"}]
+        self.prereqs = prereqs            # [(course_id, prereq_id)] as stored
+        self.course_bits = course_bits    # CourseIndex: bit -> course_id (student_state bitsets)
+        self.courses_map = {c['course_id']: c for c in courses}
+
+        prereq_lists = {c['course_id']: [] for c in courses}
+        for course_id, prereq_id in prereqs:
+            if course_id in prereq_lists: prereq_lists[course_id].append(prereq_id)
+
+        self.payload = [{
+            "id": c['course_id'], "name": c['course_name'], "credits": c['credits'],
+            "difficulty": c['difficulty_level'], "prereqs": prereq_lists[c['course_id']],
+            "schedule": schedules.get(c['course_id'], [])
+        } for c in courses]
+        self.body = serialize.dumps(self.payload)
+        # min_semester is not part of the payload, so the digest covers the raw rows
+        raw = json.dumps([courses, prereqs, self.payload], sort_keys=True, default=str)
+        self.digest = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+        self._graph = None
+        self._derived = {}
+
+    @property
+    def graph(self):
+        # Compiled lazily so a bad Prerequisites row (cycle) only fails the planner
+        if self._graph is None:
+            self._graph = PrereqGraph([c['course_id'] for c in self.courses], self.prereqs)
+        return self._graph
+
+    def derived(self, key, build):
+        """Memoize a structure computed from this snapshot; it dies with the snapshot."""
+        value = self._derived.get(key)
+        if value is None:
+            value = self._derived[key] = build()
+        return value
+
+
+def load_snapshot(conn, version=0):
+    # Explicit columns: course rows are embedded in roadmaps, so later Courses columns (capacity) stay out of them
+    courses = [dict(r) for r in conn.execute('SELECT course_id, course_name, credits, difficulty_level, min_semester FROM Courses')]
+    schedules = {}
+    for s in conn.execute('SELECT course_id, day_of_week, start_time, end_time FROM CourseSchedule ORDER BY schedule_id'):
+        schedules.setdefault(s['course_id'], []).append({"day": s['day_of_week'], "start": s['start_time'], "end": s['end_time']})
+    prereqs = [(r['course_id'], r['prereq_id']) for r in conn.execute('SELECT course_id, prereq_id FROM Prerequisites')]
+    try: course_bits = [r[0] for r in conn.execute('SELECT course_id FROM CourseIndex ORDER BY bit')]
+    except sqlite3.OperationalError: course_bits = []  # schema not migrated yet
+    return CatalogSnapshot(version, courses, schedules, prereqs, course_bits)
+
+
+def read_db_version(conn):
+    try: return conn.execute('SELECT version FROM CatalogVersion WHERE id = 1').fetchone()[0]
+    except (sqlite3.OperationalError, TypeError): return None  # schema not migrated yet
+
+
+def _poll(conn_factory):
+    global _db_version, _checked_at
+    now = time.monotonic()
+    if now - _checked_at < CHECK_INTERVAL: return
+    _checked_at = now
+    conn = conn_factory()
+    try: version = read_db_version(conn)
+    finally: conn.close()
+    if _db_version is not None and version != _db_version: bump_version()
+    _db_version = version
+
+
+def get_snapshot(conn_factory):
+    """Return the current snapshot, loading it through conn_factory() when stale."""
+    global _snapshot
+    _poll(conn_factory)
+    snap = _snapshot
+    if snap is not None and snap.version == _version: return snap
+    with _lock:
+        if _snapshot is None or _snapshot.version != _version:
+            version = _version
+            conn = conn_factory()
+            try: _snapshot = load_snapshot(conn, version)
+            finally: conn.close()
+        return _snapshot
+
+
+def bump_version():
+    global _version
+    with _lock:
+        _version += 1
+    for hook in ON_CHANGE: hook()
+    return _version
+
+
+def current_version():
+    return _version
@@ -0,0 +1,59 @@
+from bisect import bisect_left
+
+# Schedule conflict engine. A timetable is indexed per day as intervals sorted by
+# start time with a running max of end times, so checking one slot is a bisect
+# plus a walk over the intervals that actually overlap.
+
+
+class ScheduleIndex:
+    def __init__(self, courses):
+        by_day = {}
+        for pos, course in enumerate(courses):
+            for slot_pos, slot in enumerate(course.get('schedule') or []):
+                by_day.setdefault(slot['day'], []).append((slot['start'], slot['end'], pos, slot_pos, course))
+        self.days = {}
+        for day, entries in by_day.items():
+            entries.sort(key=lambda e: e[0])
+            max_end, running = [], None
+            for e in entries:
+                running = e[1] if running is None or e[1] > running else running
+                max_end.append(running)
+            self.days[day] = ([e[0] for e in entries], max_end, entries)
+
+    def overlapping(self, slot):
+        """Indexed entries (start, end, course_pos, slot_pos, course) overlapping slot."""
+        day = self.days.get(slot['day'])
+        if not day: return []
+        starts, max_end, entries = day
+        out = []
+        i = bisect_left(starts, slot['end']) - 1  # entries before i+1 start before slot ends
+        while i >= 0 and max_end[i] > slot['start']:
+            if entries[i][1] > slot['start']: out.append(entries[i])
+            i -= 1
+        return out
+
+    def first_clash(self, course):
+        """The clash /api/check-conflict reports: earliest existing course, then earliest slot."""
+        hits = [e for slot in course.get('schedule') or [] for e in self.overlapping(slot)]
+        return min(hits, key=lambda e: (e[2], e[3])) if hits else None
+
+
+def find_clashes(courses):
+    """Every clashing pair in a proposed timetable, via a per-day sweep over sorted slots."""
+    by_day = {}
+    for pos, course in enumerate(courses):
+        for slot in course.get('schedule') or []:
+            by_day.setdefault(slot['day'], []).append((slot['start'], slot['end'], pos))
+    pairs = {}
+    for day, slots in by_day.items():
+        slots.sort()
+        active = []
+        for start, end, pos in slots:
+            active = [a for a in active if a[1] > start]
+            for a_start, a_end, a_pos in active:
+                if a_pos == pos: continue
+                key = (min(a_pos, pos), max(a_pos, pos))
+                pairs.setdefault(key, []).append({"day": day, "start": max(start, a_start), "end": min(end, a_end)})
+            active.append((start, end, pos))
+    return [{"courses": [courses[a]['id'], courses[b]['id']], "names": [courses[a].get('name'), courses[b].get('name')], "slots": slots}
+            for (a, b), slots in sorted(pairs.items())]
@@ -0,0 +1,117 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# Connection management. Connections are opened once with WAL and tuned pragmas
+# and recycled through a small pool; callers keep the usual get/close pattern
+# because close() on a pooled connection just hands it back.
+
+DB_PATH = os.path.abspath(os.environ.get('COURSE_ADVISOR_DB', os.path.join(os.path.dirname(__file__), '..', 'university.db')))
+POOL_SIZE = int(os.environ.get('COURSE_ADVISOR_DB_POOL_SIZE', '16'))
+BUSY_TIMEOUT_MS = int(os.environ.get('COURSE_ADVISOR_DB_BUSY_TIMEOUT_MS', '5000'))
+
+PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}',
+    'PRAGMA cache_size=-16000',      # 16 MB page cache per connection
+    'PRAGMA mmap_size=268435456',    # 256 MB memory-mapped reads
+    'PRAGMA temp_store=MEMORY',
+)
+
+# Callables run on every newly opened connection
+CONNECT_HOOKS = []
+# Per statement: TRACE_HOOKS get the SQL as SQLite starts it (trace callback, so
+# implicit BEGIN/COMMIT are included); STATEMENT_HOOKS get (sql, seconds) after
+# execute()/executemany() on a pooled connection returns
+TRACE_HOOKS = []
+STATEMENT_HOOKS = []
+
+_pool = queue.LifoQueue(maxsize=POOL_SIZE)
+_lock = threading.Lock()
+
+
+class PooledConnection:
+    """sqlite3.Connection proxy whose close() returns the connection to the pool."""
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def _live(self):
+        if self._raw is None: raise sqlite3.ProgrammingError('Cannot operate on a closed database.')
+        return self._raw
+
+    def __getattr__(self, name):
+        return getattr(self._live(), name)
+
+    def execute(self, sql, params=()):
+        return self._timed(self._live().execute, sql, params)
+
+    def executemany(self, sql, seq):
+        return self._timed(self._live().executemany, sql, seq)
+
+    @staticmethod
+    def _timed(fn, sql, params):
+        if not STATEMENT_HOOKS: return fn(sql, params)
+        t = time.perf_counter()
+        try: return fn(sql, params)
+        finally:
+            elapsed = time.perf_counter() - t
+            for hook in STATEMENT_HOOKS: hook(sql, elapsed)
+
+    def __enter__(self):
+        return self._raw.__enter__()
+
+    def __exit__(self, *exc):
+        return self._raw.__exit__(*exc)
+
+    def close(self):
+        raw, self._raw = self._raw, None
+        if raw is not None: _release(raw)
+
+
+def open_raw(path=None):
+    raw = sqlite3.connect(path or DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    raw.row_factory = sqlite3.Row
+    for pragma in PRAGMAS: raw.execute(pragma)
+    raw.set_trace_callback(_trace)
+    for hook in CONNECT_HOOKS: hook(raw)
+    return raw
+
+
+def _trace(sql):
+    for hook in TRACE_HOOKS: hook(sql)
+
+
+def connect():
+    try: raw = _pool.get_nowait()
+    except queue.Empty: raw = open_raw()
+    return PooledConnection(raw)
+
+
+def _release(raw):
+    try:
+        if raw.in_transaction: raw.rollback()
+        _pool.put_nowait(raw)
+    except (sqlite3.Error, queue.Full):
+        raw.close()
+
+
+def idle_connections():
+    return _pool.qsize()
+
+
+def reset_pool():
+    """Close every idle pooled connection (after a path change or in a forked child)."""
+    with _lock:
+        while True:
+            try: _pool.get_nowait().close()
+            except queue.Empty: break
+
+
+def configure(path):
+    global DB_PATH
+    DB_PATH = os.path.abspath(path)
+    reset_pool()
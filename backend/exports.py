@@ -0,0 +1,91 @@
+import csv
+import io
+import re
+import unicodedata
+from urllib.parse import quote
+from flask import Response
+
+# Streaming CSV exports. Rows come off a cursor in fetchmany chunks and are
+# encoded a chunk at a time, so an export runs in constant memory and the first
+# bytes leave before the query has finished.
+
+FETCH_CHUNK = 1000
+
+
+def query_rows(conn_factory, sql, params=()):
+    """Yield result tuples chunk by chunk; the connection is released when the generator ends."""
+    conn = conn_factory()
+    try:
+        cur = conn.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(FETCH_CHUNK)
+            if not rows: break
+            yield from rows
+    finally:
+        conn.close()
+
+
+def csv_chunks(header, rows, rows_per_chunk=FETCH_CHUNK):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    n = 0
+    for row in rows:
+        writer.writerow(tuple(row))
+        n += 1
+        if n % rows_per_chunk == 0:
+            yield buf.getvalue()
+            buf.seek(0); buf.truncate()
+    if buf.tell(): yield buf.getvalue()
+
+
+def csv_response(filename, header, rows):
+    resp = Response(csv_chunks(header, rows), mimetype='text/csv')
+    resp.headers.set("Content-Disposition", "attachment", **disposition_names(filename))
+    return resp
+
+
+def disposition_names(filename):
+    """Content-Disposition parameters for a filename that may carry user input (as send_file builds them)."""
+    filename = re.sub(r'[\x00-\x1f\x7f]', '_', filename)
+    try:
+        filename.encode('ascii')
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode('ascii')
+        return {'filename': simple, 'filename*': f"UTF-8''{quote(filename, safe='!#$&+-.^_`|~')}"}
+    return {'filename': filename}
+
+
+STUDENTS_SQL = """
+    SELECT roll_number, full_name, father_name, gpa, cgpa, current_semester
+    FROM StudentProfiles ORDER BY roll_number
+"""
+STUDENTS_HEADER = ['Roll Number', 'Full Name', 'Father Name', 'GPA', 'CGPA', 'Current Semester']
+
+REGISTRATIONS_SQL = """
+    SELECT r.roll_number, sp.full_name, r.course_id, c.course_name, r.semester_label, r.status
+    FROM Registrations r
+    JOIN Courses c ON r.course_id = c.course_id
+    LEFT JOIN StudentProfiles sp ON r.roll_number = sp.roll_number
+    WHERE {where}
+    ORDER BY r.semester_label DESC, r.roll_number, r.course_id
+"""
+REGISTRATIONS_HEADER = ['Roll Number', 'Full Name', 'Course Code', 'Course Name', 'Semester', 'Status']
+
+ROSTER_SQL = """
+    SELECT r.roll_number, sp.full_name, sp.father_name, r.semester_label, r.status
+    FROM Registrations r
+    LEFT JOIN StudentProfiles sp ON r.roll_number = sp.roll_number
+    WHERE r.course_id = ?
+    ORDER BY r.semester_label DESC, r.roll_number
+"""
+ROSTER_HEADER = ['Roll Number', 'Full Name', 'Father Name', 'Semester', 'Status']
+
+PLAN_HEADER = ['Semester', 'Course Code', 'Course Name', 'Credits', 'Schedule']
+
+
+def plan_rows(roadmap, schedules):
+    for sem in roadmap:
+        for c in sem['courses']:
+            slots = '; '.join(f"{s['day']} {s['start']}-{s['end']}" for s in schedules.get(c['course_id'], [])) or 'TBA'
+            yield (sem['semester'], c['course_id'], c['course_name'], c['credits'], slots)
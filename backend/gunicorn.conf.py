@@ -0,0 +1,29 @@
+import os
+
+# gunicorn settings for run.py --prod. Every value can be overridden through
+# the environment (or gunicorn's own command line flags).
+#
+# One worker by default: /api/metrics counters, the roadmap cache and the
+# registration writer live in process memory, so with several workers each
+# process answers with its own share (metrics carry a worker="<pid>" label to
+# tell them apart and have to be summed by the scraper). Scale with threads
+# first; raise COURSE_ADVISOR_WORKERS only with that in mind.
+
+bind = os.environ.get('COURSE_ADVISOR_BIND', '127.0.0.1:5000')
+workers = int(os.environ.get('COURSE_ADVISOR_WORKERS', '1'))
+threads = int(os.environ.get('COURSE_ADVISOR_THREADS', '8'))
+worker_class = 'gthread'
+preload_app = True  # import + warm up once in the master, then fork
+timeout = int(os.environ.get('COURSE_ADVISOR_TIMEOUT', '60'))
+graceful_timeout = 30
+keepalive = 5
+max_requests = int(os.environ.get('COURSE_ADVISOR_MAX_REQUESTS', '0'))  # 0: never recycle workers
+max_requests_jitter = max_requests // 10
+accesslog = os.environ.get('COURSE_ADVISOR_ACCESS_LOG') or None
+errorlog = '-'
+loglevel = os.environ.get('COURSE_ADVISOR_LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    import db
+    db.reset_pool()  # never reuse a connection the master opened
@@ -1,6 +1,9 @@
 import sqlite3
 import random
-import os
+import db
+import migrations
+import student_state
+import timetable
 
 def init_system():
     # --- BRANDING HEADER ---
@@ -14,77 +17,12 @@ def init_system():
     # Ensure consistent data generation
     random.seed(42)
     
-    db_path = os.path.join(os.path.dirname(__file__), '..', 'university.db')
-    conn = sqlite3.connect(db_path)
+    conn = sqlite3.connect(db.DB_PATH)
     cursor = conn.cursor()
 
-    # 1. CLEANUP & SCHEMA
-    cursor.executescript("""
-    DROP TABLE IF EXISTS PassedCourses;
-    DROP TABLE IF EXISTS Registrations;
-    DROP TABLE IF EXISTS StudentProfiles;
-    DROP TABLE IF EXISTS Users;
-    DROP TABLE IF EXISTS CourseSchedule;
-    DROP TABLE IF EXISTS Prerequisites;
-    DROP TABLE IF EXISTS Courses;
-    
-    CREATE TABLE Users (
-        username TEXT PRIMARY KEY,
-        password TEXT,
-        role TEXT
-    );
-
-    CREATE TABLE StudentProfiles (
-        roll_number TEXT PRIMARY KEY,
-        full_name TEXT,
-        father_name TEXT,
-        gpa REAL,
-        cgpa REAL,
-        current_semester INTEGER,
-        FOREIGN KEY (roll_number) REFERENCES Users(username)
-    );
-
-    CREATE TABLE Courses (
-        course_id VARCHAR(20) PRIMARY KEY,
-        course_name VARCHAR(100),
-        credits INTEGER,
-        difficulty_level INTEGER,
-        min_semester INTEGER
-    );
-
-    CREATE TABLE PassedCourses (
-        roll_number TEXT,
-        course_id VARCHAR(20),
-        PRIMARY KEY (roll_number, course_id),
-        FOREIGN KEY (roll_number) REFERENCES StudentProfiles(roll_number),
-        FOREIGN KEY (course_id) REFERENCES Courses(course_id)
-    );
-
-    CREATE TABLE Prerequisites (
-        course_id VARCHAR(20),
-        prereq_id VARCHAR(20),
-        FOREIGN KEY (course_id) REFERENCES Courses(course_id),
-        FOREIGN KEY (prereq_id) REFERENCES Courses(course_id)
-    );
-
-    CREATE TABLE CourseSchedule (
-        schedule_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        course_id VARCHAR(20),
-        day_of_week VARCHAR(3),
-        start_time INTEGER,
-        end_time INTEGER,
-        FOREIGN KEY (course_id) REFERENCES Courses(course_id)
-    );
-
-    CREATE TABLE Registrations (
-        reg_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        roll_number TEXT,
-        course_id TEXT,
-        semester_label TEXT,
-        status TEXT,
-        FOREIGN KEY (roll_number) REFERENCES Users(username)
-    );
-    """)
+    # 1. CLEANUP & SCHEMA (rebuilt through the versioned migrations)
+    migrations.reset(conn)
+    migrations.migrate(conn)
 
     # 2. INSERT COURSES
     all_courses = [
@@ -122,7 +60,7 @@ def init_system():
         ('CSDE-6505', 'Large Language Models', 3, 5, 6), ('CSDE-6501', 'MERN Stack Development', 3, 4, 5),
         ('DSDE-5102', 'Database Admin & Mgmt', 3, 3, 6)
     ]
-    cursor.executemany("INSERT INTO Courses VALUES (?,?,?,?,?)", all_courses)
+    cursor.executemany("INSERT INTO Courses (course_id, course_name, credits, difficulty_level, min_semester) VALUES (?,?,?,?,?)", all_courses)
 
     # 3. INSERT PREREQUISITES
     prereqs = [
@@ -133,38 +71,14 @@ def init_system():
     ]
     cursor.executemany("INSERT INTO Prerequisites VALUES (?,?)", prereqs)
 
-    # 4. INSERT SCHEDULE (Multi-Slot Logic)
+    # 4. INSERT SCHEDULE (clash-free per semester cohort, see timetable.py)
     print("... 🗓️  Generating Multi-Day Time Slots ...")
-    schedule_data = []
-    
-    # Base hours for each semester batch
-    base_hours = {1: 800, 3: 800, 5: 800, 7: 800, 
-                  2: 1200, 4: 1200, 6: 1200, 8: 1200}
-    
-    current_hour_offset = {1:0, 2:0, 3:0, 4:0, 5:0, 6:0, 7:0, 8:0}
-
-    for course in all_courses:
-        cid, name, credits, diff, min_sem = course
-        
-        sem_key = min_sem if min_sem else 7
-        if sem_key > 8: sem_key = 8
-
-        start = base_hours[sem_key] + (current_hour_offset[sem_key] * 100)
-        if start >= 1600: start = base_hours[sem_key] # Reset if too late
-        
-        # Logic: Split credits into 1-hour blocks
-        days = []
-        if credits == 4: days = ['Mon', 'Tue', 'Wed', 'Thu']
-        elif credits == 3: days = ['Mon', 'Wed', 'Fri']
-        elif credits == 2: days = ['Tue', 'Thu']
-        else: days = ['Fri']
-
-        for day in days:
-            schedule_data.append((cid, day, start, start + 100))
-        
-        current_hour_offset[sem_key] += 1
-
-    cursor.executemany("INSERT INTO CourseSchedule (course_id, day_of_week, start_time, end_time) VALUES (?,?,?,?)", schedule_data)
+    sections = [(cid, credits, min_sem) for cid, _, credits, _, min_sem in all_courses]
+    problem = timetable.Problem(sections, timetable.cohort_edges(sections))
+    assignment, stats = timetable.solve(problem)
+    if not stats['clash_free']: print(f"... ⚠️  Timetable still has {stats['clashing_pairs']} clashing pair(s)")
+    cursor.executemany("INSERT INTO CourseSchedule (course_id, day_of_week, start_time, end_time) VALUES (?,?,?,?)",
+                       timetable.schedule_rows(assignment))
 
     # 5. GENERATE STUDENTS
     print("... 👥 Generating Students ...")
@@ -206,6 +120,7 @@ def init_system():
             if min_semester < current_semester:
                 passed_courses_data.append((roll_number, course_id))
     cursor.executemany("INSERT INTO PassedCourses VALUES (?,?)", passed_courses_data)
+    student_state.refresh_all(conn)
 
     conn.commit()
     conn.close()
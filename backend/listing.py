@@ -0,0 +1,109 @@
+import base64
+import json
+
+# Keyset pagination and NDJSON streaming for the admin list endpoints. A Listing
+# is a base query plus the ordered key columns that make each row unique, and
+# its source must walk an index in key order (Registrations first, hence the
+# CROSS JOINs in app.py: no TEMP B-TREE in the plan). A page resumes strictly
+# after the last key it returned through index seeks, so deep pages cost the
+# same as the first one and nothing is materialized beyond one page or chunk.
+# The *_json variants have SQLite build each row's JSON object (json_object), so
+# rows go from the cursor to the response body without a dict per row.
+
+MAX_LIMIT = 1000
+STREAM_CHUNK = 500
+
+
+class Listing:
+    def __init__(self, columns, source, keys, filters=None, where=None):
+        self.columns = columns        # output column expressions; the JSON key is the part after the last '.'
+        self.source = source          # FROM ... [JOIN ...] without WHERE / ORDER BY
+        self.select = f"SELECT {', '.join(columns)} {source}"
+        pairs = ', '.join(f"'{_name(c)}', {c}" for c in columns)
+        self.json_select = f"SELECT json_object({pairs}), {', '.join(c for c, _ in keys)} {source}"
+        self.keys = keys              # [(column expression, 'ASC' | 'DESC')]
+        self.filters = filters or {}  # request parameter -> column expression
+        self.where = where            # fixed condition whose ? params come from base_params
+
+    def _where(self, filters, bound):
+        clauses, params = ([self.where] if self.where else []), []
+        for name, value in filters.items():
+            if name in self.filters and value not in (None, ''):
+                clauses.append(f"{self.filters[name]} = ?"); params.append(value)
+        if bound:
+            clauses.append(bound[0]); params.extend(bound[1])
+        return clauses, params
+
+    def _after(self, after):
+        """Rows past the key `after`, as one (clause, params) per key column, nearest first: the leading
+        keys equal to the cursor and the next one strictly past it. Each is an equality prefix plus one
+        range on the order index, so every segment is a seek (an OR of them in one query is not)."""
+        segments = []
+        for i in reversed(range(len(self.keys))):
+            col, direction = self.keys[i]
+            clause = ' AND '.join([f"{c} = ?" for c, _ in self.keys[:i]] + [f"{col} {'<' if direction == 'DESC' else '>'} ?"])
+            segments.append((clause, [*after[:i], after[i]]))
+        return segments
+
+    def query(self, filters, bound=None, limit=None, base_params=(), as_json=False):
+        clauses, params = self._where(filters, bound)
+        sql = (self.json_select if as_json else self.select) + (' WHERE ' + ' AND '.join(clauses) if clauses else '')
+        sql += ' ORDER BY ' + ', '.join(f"{c} {d}" for c, d in self.keys)
+        if limit is not None: sql += f' LIMIT {int(limit)}'
+        return sql, [*base_params, *params]
+
+    def key_of(self, row):
+        return [row[_name(col)] for col, _ in self.keys]
+
+    def _page_rows(self, conn, filters, cursor, limit, base_params, as_json):
+        limit = max(1, min(int(limit), MAX_LIMIT))
+        after = decode_cursor(cursor)
+        if after is not None and (not isinstance(after, list) or len(after) != len(self.keys)): raise ValueError('Invalid cursor')
+        rows = []
+        for bound in (self._after(after) if after is not None else [None]):
+            sql, params = self.query(filters, bound, limit + 1 - len(rows), base_params, as_json)
+            rows += conn.execute(sql, params).fetchall()
+            if len(rows) > limit: break
+        next_cursor = encode_cursor(self.key_of(rows[limit - 1])) if len(rows) > limit else None
+        return rows[:limit], next_cursor
+
+    def page(self, conn, filters, cursor=None, limit=100, base_params=()):
+        rows, next_cursor = self._page_rows(conn, filters, cursor, limit, base_params, False)
+        return [dict(r) for r in rows], next_cursor
+
+    def page_json(self, conn, filters, cursor=None, limit=100, base_params=()):
+        """{"items": [...], "next_cursor": ...} as JSON text."""
+        rows, next_cursor = self._page_rows(conn, filters, cursor, limit, base_params, True)
+        return '{"items":[' + ','.join(r[0] for r in rows) + '],"next_cursor":' + json.dumps(next_cursor) + '}'
+
+    def all_json(self, conn, filters, base_params=()):
+        """Every matching row as one JSON array text."""
+        sql, params = self.query(filters, base_params=base_params, as_json=True)
+        return '[' + ','.join(r[0] for r in conn.execute(sql, params)) + ']'
+
+    def stream(self, conn_factory, filters, base_params=()):
+        """Yield NDJSON lines straight off a cursor; the connection lives as long as the generator."""
+        sql, params = self.query(filters, base_params=base_params, as_json=True)
+        conn = conn_factory()
+        try:
+            cur = conn.execute(sql, params)
+            while True:
+                rows = cur.fetchmany(STREAM_CHUNK)
+                if not rows: break
+                yield ''.join(r[0] + '\n' for r in rows)
+        finally:
+            conn.close()
+
+
+def _name(column):
+    return column.split('.')[-1]
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    if not cursor: return None
+    try: return json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except ValueError: raise ValueError('Invalid cursor')
@@ -0,0 +1,187 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+import db
+
+# Process-local instrumentation: per-endpoint latency histograms, in-flight
+# gauges, SQL statements per request (counted through db.TRACE_HOOKS, timed
+# through db.STATEMENT_HOOKS around execute) and planner phase timers.
+# render() emits the Prometheus text format for /api/metrics; every series is
+# labelled worker="<pid>" since each gunicorn worker keeps its own. Requests slower
+# than COURSE_ADVISOR_SLOW_REQUEST_MS are logged with their statement list.
+
+SLOW_REQUEST_MS = float(os.environ.get('COURSE_ADVISOR_SLOW_REQUEST_MS', '0'))  # 0 disables the slow log
+SLOW_LOG_MAX_QUERIES = 50
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500, 1000)
+
+log = logging.getLogger('course_advisor.slow_requests')
+_lock = threading.Lock()
+_local = threading.local()
+
+
+class Histogram:
+    def __init__(self, name, help_, buckets):
+        self.name, self.help, self.buckets = name, help_, buckets
+        self.series = {}  # labels tuple -> [bucket counts..., sum, count]
+
+    def observe(self, labels, value):
+        with _lock:
+            s = self.series.get(labels)
+            if s is None: s = self.series[labels] = [0] * (len(self.buckets) + 2)
+            for k, bound in enumerate(self.buckets):
+                if value <= bound: s[k] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    def render(self, label_names):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with _lock: items = sorted((k, list(v)) for k, v in self.series.items())
+        for labels, s in items:
+            base = _labels(label_names, labels)
+            for bound, n in zip(self.buckets, s):
+                lines.append(f"{self.name}_bucket{{{base}{',' if base else ''}le=\"{bound}\"}} {n}")
+            lines.append(f"{self.name}_bucket{{{base}{',' if base else ''}le=\"+Inf\"}} {s[-1]}")
+            lines.append(f"{self.name}_sum{{{base}}} {s[-2]}")
+            lines.append(f"{self.name}_count{{{base}}} {s[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_, kind='counter'):
+        self.name, self.help, self.kind = name, help_, kind
+        self.series = {}
+
+    def inc(self, labels, value=1):
+        with _lock: self.series[labels] = self.series.get(labels, 0) + value
+
+    def render(self, label_names):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with _lock: items = sorted(self.series.items())
+        lines.extend(f"{self.name}{{{_labels(label_names, k)}}} {v}" for k, v in items)
+        return lines
+
+
+def _labels(names, values):
+    # os.getpid() at render time: the values must be those of the forked worker, not the master
+    return ','.join(f'{n}="{_escape(v)}"' for n, v in zip(('worker', *names), (os.getpid(), *values)))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REQUEST_LATENCY = Histogram('course_advisor_request_duration_seconds', 'Request latency by endpoint.', LATENCY_BUCKETS)
+REQUESTS = Counter('course_advisor_requests_total', 'Requests by endpoint, method and status.')
+IN_FLIGHT = Counter('course_advisor_requests_in_flight', 'Requests currently being handled.', kind='gauge')
+SQL_PER_REQUEST = Histogram('course_advisor_sql_statements_per_request', 'SQL statements executed per request.', COUNT_BUCKETS)
+SQL_SECONDS = Counter('course_advisor_sql_seconds_total', 'Time spent in execute() by endpoint.')
+ERRORS = Counter('course_advisor_handled_errors_total', 'Exceptions turned into error responses, by endpoint and type.')
+PLANNER_PHASE = Histogram('course_advisor_planner_phase_seconds', 'Planner time by phase.', LATENCY_BUCKETS)
+
+# (name, type, help, callable returning a number) sampled at render time
+SAMPLED = []
+
+
+class RequestStats:
+    __slots__ = ('endpoint', 'method', 'started', 'status', 'statements', 'sql_seconds', 'queries')
+
+    def __init__(self, endpoint, method):
+        self.endpoint, self.method = endpoint, method
+        self.started = time.perf_counter()
+        self.status = 500
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.queries = [] if SLOW_REQUEST_MS else None
+
+
+def current():
+    return getattr(_local, 'request', None)
+
+
+def trace_statement(sql):
+    """db.TRACE_HOOKS entry: count (and, for the slow log, remember) statements."""
+    stats = current()
+    if stats is None: return
+    stats.statements += 1
+    if stats.queries is not None and len(stats.queries) < SLOW_LOG_MAX_QUERIES: stats.queries.append(sql)
+
+
+def time_statement(_sql, seconds):
+    """db.STATEMENT_HOOKS entry."""
+    stats = current()
+    if stats is not None: stats.sql_seconds += seconds
+
+
+def begin_request(endpoint, method):
+    _local.request = RequestStats(endpoint, method)
+    IN_FLIGHT.inc((endpoint,))
+
+
+def set_status(status):
+    stats = current()
+    if stats is not None: stats.status = status
+
+
+def end_request():
+    stats = current()
+    if stats is None: return
+    _local.request = None
+    elapsed = time.perf_counter() - stats.started
+    IN_FLIGHT.inc((stats.endpoint,), -1)
+    REQUEST_LATENCY.observe((stats.endpoint, stats.method), elapsed)
+    REQUESTS.inc((stats.endpoint, stats.method, stats.status))
+    SQL_PER_REQUEST.observe((stats.endpoint,), stats.statements)
+    SQL_SECONDS.inc((stats.endpoint,), stats.sql_seconds)
+    if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+        queries = ''.join('\n  ' + ' '.join(q.split()) for q in stats.queries)
+        log.warning("%s %s took %.1f ms (status %s, %d statements, %.1f ms in SQL)%s", stats.method, stats.endpoint,
+                    elapsed * 1000, stats.status, stats.statements, stats.sql_seconds * 1000, queries)
+
+
+@contextmanager
+def adopt(stats):
+    """Attribute work done on this thread (e.g. a pool thread) to another request's stats."""
+    previous = current()
+    _local.request = stats
+    try: yield
+    finally: _local.request = previous
+
+
+def record_error(exc):
+    stats = current()
+    ERRORS.inc((stats.endpoint if stats else 'none', type(exc).__name__))
+
+
+def observe_phase(phase, seconds):
+    PLANNER_PHASE.observe((phase,), seconds)
+
+
+@contextmanager
+def phase(name):
+    t = time.perf_counter()
+    try: yield
+    finally: observe_phase(name, time.perf_counter() - t)
+
+
+def render():
+    lines = []
+    lines += REQUEST_LATENCY.render(('endpoint', 'method'))
+    lines += REQUESTS.render(('endpoint', 'method', 'status'))
+    lines += IN_FLIGHT.render(('endpoint',))
+    lines += SQL_PER_REQUEST.render(('endpoint',))
+    lines += SQL_SECONDS.render(('endpoint',))
+    lines += ERRORS.render(('endpoint', 'type'))
+    lines += PLANNER_PHASE.render(('phase',))
+    for name, kind, help_, fn in SAMPLED:
+        lines += [f"# HELP {name} {help_}", f"# TYPE {name} {kind}", f"{name}{{{_labels((), ())}}} {fn()}"]
+    return '\n'.join(lines) + '\n'
+
+
+def install():
+    """Register the SQL hooks on db (idempotent)."""
+    if trace_statement not in db.TRACE_HOOKS: db.TRACE_HOOKS.append(trace_statement)
+    if time_statement not in db.STATEMENT_HOOKS: db.STATEMENT_HOOKS.append(time_statement)
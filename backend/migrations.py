@@ -0,0 +1,349 @@
+import argparse
+import sqlite3
+import db
+
+# Versioned schema migrations. The applied version lives in PRAGMA user_version;
+# each migration runs in its own transaction and bumps it, so an existing
+# university.db is upgraded in place instead of being dropped and rebuilt.
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+
+@migration(1, 'base schema')
+def _base_schema(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS Users (
+        username TEXT PRIMARY KEY,
+        password TEXT,
+        role TEXT
+    )""")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS StudentProfiles (
+        roll_number TEXT PRIMARY KEY,
+        full_name TEXT,
+        father_name TEXT,
+        gpa REAL,
+        cgpa REAL,
+        current_semester INTEGER,
+        FOREIGN KEY (roll_number) REFERENCES Users(username)
+    )""")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS Courses (
+        course_id VARCHAR(20) PRIMARY KEY,
+        course_name VARCHAR(100),
+        credits INTEGER,
+        difficulty_level INTEGER,
+        min_semester INTEGER
+    )""")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS PassedCourses (
+        roll_number TEXT,
+        course_id VARCHAR(20),
+        PRIMARY KEY (roll_number, course_id),
+        FOREIGN KEY (roll_number) REFERENCES StudentProfiles(roll_number),
+        FOREIGN KEY (course_id) REFERENCES Courses(course_id)
+    )""")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS Prerequisites (
+        course_id VARCHAR(20),
+        prereq_id VARCHAR(20),
+        FOREIGN KEY (course_id) REFERENCES Courses(course_id),
+        FOREIGN KEY (prereq_id) REFERENCES Courses(course_id)
+    )""")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS CourseSchedule (
+        schedule_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        course_id VARCHAR(20),
+        day_of_week VARCHAR(3),
+        start_time INTEGER,
+        end_time INTEGER,
+        FOREIGN KEY (course_id) REFERENCES Courses(course_id)
+    )""")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS Registrations (
+        reg_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        roll_number TEXT,
+        course_id TEXT,
+        semester_label TEXT,
+        status TEXT,
+        FOREIGN KEY (roll_number) REFERENCES Users(username)
+    )""")
+
+
+@migration(2, 'numeric semester column on Registrations')
+def _registration_semester(conn):
+    # Virtual generated column: "Semester 3 (Regular)" -> 3, labels without "Semester N" -> NULL.
+    # Every write path gets it for free and it can be indexed like a normal column.
+    conn.execute("""
+    ALTER TABLE Registrations ADD COLUMN semester INTEGER GENERATED ALWAYS AS (
+        CASE WHEN instr(semester_label, 'Semester ') > 0
+             THEN CAST(substr(semester_label, instr(semester_label, 'Semester ') + 9) AS INTEGER)
+        END
+    ) VIRTUAL""")
+
+
+@migration(3, 'unique registrations per student, course and semester label')
+def _registration_unique(conn):
+    conn.execute("""
+    DELETE FROM Registrations WHERE reg_id NOT IN (
+        SELECT MIN(reg_id) FROM Registrations GROUP BY roll_number, course_id, semester_label
+    )""")
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS ux_registrations_student_course_label ON Registrations (roll_number, course_id, semester_label)')
+
+
+@migration(4, 'lookup indexes')
+def _lookup_indexes(conn):
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_registrations_student_semester ON Registrations (roll_number, semester)')
+    # Course first for roster lookups; the rest matches the ORDER BY of the paginated course list
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_registrations_course_order ON Registrations (course_id, semester_label DESC, roll_number)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_prerequisites_course ON Prerequisites (course_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_prerequisites_prereq ON Prerequisites (prereq_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_schedule_course ON CourseSchedule (course_id)')
+
+
+@migration(5, 'keyset pagination indexes for the admin registration lists')
+def _listing_indexes(conn):
+    # Match the ORDER BY of the paginated list so each page is an index range scan
+    # (the per-course list uses idx_registrations_course_order from migration 4)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_registrations_order ON Registrations (semester_label DESC, roll_number, course_id)')
+
+
+@migration(6, 'precomputed roadmaps and precompute jobs')
+def _planned_roadmaps(conn):
+    # plan_key hashes catalog digest, passed set, strategy and start semester (roadmap_cache.make_key),
+    # so a row is only served while all of them still match
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS PlannedRoadmaps (
+        roll_number TEXT NOT NULL,
+        strategy TEXT NOT NULL,
+        catalog_digest TEXT NOT NULL,
+        plan_key TEXT NOT NULL,
+        start_semester INTEGER,
+        graduation_semester INTEGER,
+        roadmap TEXT NOT NULL,
+        job_id INTEGER,
+        computed_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (roll_number, strategy)
+    )""")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS PrecomputeJobs (
+        job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        strategy TEXT NOT NULL,
+        filter TEXT,
+        status TEXT NOT NULL DEFAULT 'pending',
+        total INTEGER,
+        done INTEGER NOT NULL DEFAULT 0,
+        last_roll TEXT,
+        error TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )""")
+
+
+@migration(7, 'catalog version counter maintained by triggers')
+def _catalog_version(conn):
+    # Lets every worker process notice catalog writes made by another one (catalog.get_snapshot polls it)
+    conn.execute('CREATE TABLE IF NOT EXISTS CatalogVersion (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)')
+    conn.execute('INSERT OR IGNORE INTO CatalogVersion (id, version) VALUES (1, 0)')
+    for table in ('Courses', 'CourseSchedule', 'Prerequisites'):
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_catalog_version_{table.lower()}_{event.lower()}
+            AFTER {event} ON {table}
+            BEGIN UPDATE CatalogVersion SET version = version + 1 WHERE id = 1; END""")
+
+
+@migration(8, 'materialized per-student state')
+def _student_state(conn):
+    # CourseIndex gives every course id a permanent bit (append-only, so stored bitsets never need rewriting).
+    # StudentState mirrors the profile and the current-semester registration flag through triggers; passed is
+    # a bitset over CourseIndex that PassedCourses writes reset to NULL, rebuilt on the next read (student_state.py)
+    conn.execute('CREATE TABLE IF NOT EXISTS CourseIndex (course_id TEXT PRIMARY KEY, bit INTEGER NOT NULL UNIQUE)')
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS StudentState (
+        roll_number TEXT PRIMARY KEY,
+        full_name TEXT,
+        father_name TEXT,
+        gpa REAL,
+        cgpa REAL,
+        current_semester INTEGER,
+        is_registered INTEGER NOT NULL DEFAULT 0,
+        passed BLOB,
+        passed_version INTEGER NOT NULL DEFAULT 0
+    )""")
+    append_bit = """INSERT OR IGNORE INTO CourseIndex (course_id, bit)
+                    SELECT NEW.course_id, COALESCE(MAX(bit) + 1, 0) FROM CourseIndex"""
+    registered = """EXISTS (SELECT 1 FROM Registrations r
+                            WHERE r.roll_number = StudentState.roll_number AND r.semester = StudentState.current_semester)"""
+    dirty = 'passed = NULL, passed_version = passed_version + 1'
+    triggers = {
+        'course_index_courses_insert': f'AFTER INSERT ON Courses BEGIN {append_bit}; END',
+        'course_index_courses_update': f'AFTER UPDATE OF course_id ON Courses BEGIN {append_bit}; END',
+        'student_state_profile_insert': f"""AFTER INSERT ON StudentProfiles BEGIN
+            INSERT OR REPLACE INTO StudentState (roll_number, full_name, father_name, gpa, cgpa, current_semester)
+            VALUES (NEW.roll_number, NEW.full_name, NEW.father_name, NEW.gpa, NEW.cgpa, NEW.current_semester);
+            UPDATE StudentState SET is_registered = {registered} WHERE roll_number = NEW.roll_number; END""",
+        'student_state_profile_update': f"""AFTER UPDATE ON StudentProfiles BEGIN
+            UPDATE StudentState SET roll_number = NEW.roll_number, full_name = NEW.full_name, father_name = NEW.father_name,
+                gpa = NEW.gpa, cgpa = NEW.cgpa, current_semester = NEW.current_semester,
+                passed = CASE WHEN NEW.roll_number = OLD.roll_number THEN passed END,
+                passed_version = passed_version + (NEW.roll_number IS NOT OLD.roll_number)
+            WHERE roll_number = OLD.roll_number;
+            UPDATE StudentState SET is_registered = {registered} WHERE roll_number = NEW.roll_number; END""",
+        'student_state_profile_delete': 'AFTER DELETE ON StudentProfiles BEGIN DELETE FROM StudentState WHERE roll_number = OLD.roll_number; END',
+        'student_state_registration_insert': """AFTER INSERT ON Registrations BEGIN
+            UPDATE StudentState SET is_registered = 1 WHERE roll_number = NEW.roll_number AND current_semester = NEW.semester; END""",
+        'student_state_registration_update': f"""AFTER UPDATE OF roll_number, semester_label ON Registrations BEGIN
+            UPDATE StudentState SET is_registered = {registered} WHERE roll_number IN (OLD.roll_number, NEW.roll_number); END""",
+        'student_state_registration_delete': f"""AFTER DELETE ON Registrations BEGIN
+            UPDATE StudentState SET is_registered = {registered} WHERE roll_number = OLD.roll_number; END""",
+        'student_state_passed_insert': f"""AFTER INSERT ON PassedCourses BEGIN {append_bit};
+            UPDATE StudentState SET {dirty} WHERE roll_number = NEW.roll_number; END""",
+        'student_state_passed_update': f"""AFTER UPDATE ON PassedCourses BEGIN {append_bit};
+            UPDATE StudentState SET {dirty} WHERE roll_number IN (OLD.roll_number, NEW.roll_number); END""",
+        'student_state_passed_delete': f"""AFTER DELETE ON PassedCourses BEGIN
+            UPDATE StudentState SET {dirty} WHERE roll_number = OLD.roll_number; END""",
+    }
+    for name, body in triggers.items():
+        conn.execute(f'CREATE TRIGGER IF NOT EXISTS trg_{name} {body}')
+
+    # Backfill every id already in Courses or PassedCourses; passed bitsets start dirty and are built on first read
+    conn.execute("""
+    INSERT OR IGNORE INTO CourseIndex (course_id, bit)
+    SELECT course_id, (SELECT COUNT(*) FROM CourseIndex) + ROW_NUMBER() OVER (ORDER BY course_id) - 1
+    FROM (SELECT course_id FROM Courses UNION SELECT course_id FROM PassedCourses) WHERE course_id IS NOT NULL""")
+    conn.execute("""
+    INSERT OR REPLACE INTO StudentState (roll_number, full_name, father_name, gpa, cgpa, current_semester, is_registered)
+    SELECT sp.roll_number, sp.full_name, sp.father_name, sp.gpa, sp.cgpa, sp.current_semester,
+           EXISTS (SELECT 1 FROM Registrations r WHERE r.roll_number = sp.roll_number AND r.semester = sp.current_semester)
+    FROM StudentProfiles sp""")
+
+
+@migration(9, 'course seat capacity')
+def _course_capacity(conn):
+    # NULL capacity means unlimited; seats are the course's 'Registered' rows per semester label
+    conn.execute('ALTER TABLE Courses ADD COLUMN capacity INTEGER')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_registrations_seats ON Registrations (course_id, semester_label, status)')
+
+
+@migration(10, 'enrollment counts maintained by triggers')
+def _enrollment_counts(conn):
+    # One row per (course, semester label, status) with its Registrations count, so seat checks and
+    # /api/admin/analytics read counters instead of counting rows; empty counters are removed
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS EnrollmentCounts (
+        course_id TEXT NOT NULL,
+        semester_label TEXT NOT NULL,
+        status TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (course_id, semester_label, status)
+    ) WITHOUT ROWID""")
+    key = "IFNULL({0}.course_id, ''), IFNULL({0}.semester_label, ''), IFNULL({0}.status, '')"
+    match = "course_id = IFNULL({0}.course_id, '') AND semester_label = IFNULL({0}.semester_label, '') AND status = IFNULL({0}.status, '')"
+    add = f"""INSERT INTO EnrollmentCounts (course_id, semester_label, status, count) VALUES ({key.format('NEW')}, 1)
+              ON CONFLICT (course_id, semester_label, status) DO UPDATE SET count = count + 1"""
+    remove = f"""UPDATE EnrollmentCounts SET count = count - 1 WHERE {match.format('OLD')};
+                 DELETE FROM EnrollmentCounts WHERE {match.format('OLD')} AND count <= 0"""
+    conn.execute(f'CREATE TRIGGER IF NOT EXISTS trg_enrollment_counts_insert AFTER INSERT ON Registrations BEGIN {add}; END')
+    conn.execute(f'CREATE TRIGGER IF NOT EXISTS trg_enrollment_counts_delete AFTER DELETE ON Registrations BEGIN {remove}; END')
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_enrollment_counts_update
+                     AFTER UPDATE OF course_id, semester_label, status ON Registrations BEGIN {remove}; {add}; END""")
+    conn.execute(f"""
+    INSERT INTO EnrollmentCounts (course_id, semester_label, status, count)
+    SELECT {key.format('r')}, COUNT(*) FROM Registrations r GROUP BY 1, 2, 3""")
+
+
+@migration(11, 'waitlisted rows do not count as registered')
+def _registered_status(conn):
+    # StudentState.is_registered only counts 'Registered' rows, and status changes (waitlist promotion) re-evaluate it;
+    # every trigger that computes it is recreated with the status condition
+    registered = """EXISTS (SELECT 1 FROM Registrations r WHERE r.roll_number = StudentState.roll_number
+                            AND r.semester = StudentState.current_semester AND r.status = 'Registered')"""
+    for name in ('registration_insert', 'registration_update', 'registration_delete', 'profile_insert', 'profile_update'):
+        conn.execute(f'DROP TRIGGER IF EXISTS trg_student_state_{name}')
+    conn.execute(f"""CREATE TRIGGER trg_student_state_profile_insert AFTER INSERT ON StudentProfiles BEGIN
+        INSERT OR REPLACE INTO StudentState (roll_number, full_name, father_name, gpa, cgpa, current_semester)
+        VALUES (NEW.roll_number, NEW.full_name, NEW.father_name, NEW.gpa, NEW.cgpa, NEW.current_semester);
+        UPDATE StudentState SET is_registered = {registered} WHERE roll_number = NEW.roll_number; END""")
+    conn.execute(f"""CREATE TRIGGER trg_student_state_profile_update AFTER UPDATE ON StudentProfiles BEGIN
+        UPDATE StudentState SET roll_number = NEW.roll_number, full_name = NEW.full_name, father_name = NEW.father_name,
+            gpa = NEW.gpa, cgpa = NEW.cgpa, current_semester = NEW.current_semester,
+            passed = CASE WHEN NEW.roll_number = OLD.roll_number THEN passed END,
+            passed_version = passed_version + (NEW.roll_number IS NOT OLD.roll_number)
+        WHERE roll_number = OLD.roll_number;
+        UPDATE StudentState SET is_registered = {registered} WHERE roll_number = NEW.roll_number; END""")
+    conn.execute("""CREATE TRIGGER trg_student_state_registration_insert AFTER INSERT ON Registrations WHEN NEW.status = 'Registered' BEGIN
+        UPDATE StudentState SET is_registered = 1 WHERE roll_number = NEW.roll_number AND current_semester = NEW.semester; END""")
+    conn.execute(f"""CREATE TRIGGER trg_student_state_registration_update AFTER UPDATE OF roll_number, semester_label, status ON Registrations BEGIN
+        UPDATE StudentState SET is_registered = {registered} WHERE roll_number IN (OLD.roll_number, NEW.roll_number); END""")
+    conn.execute(f"""CREATE TRIGGER trg_student_state_registration_delete AFTER DELETE ON Registrations WHEN OLD.status = 'Registered' BEGIN
+        UPDATE StudentState SET is_registered = {registered} WHERE roll_number = OLD.roll_number; END""")
+    conn.execute(f'UPDATE StudentState SET is_registered = {registered}')
+
+
+@migration(12, 'precompute job claims and heartbeats')
+def _precompute_claims(conn):
+    # A job is claimed by one UPDATE that sets a fresh runner token, so every process (gunicorn worker, CLI) sees
+    # the same owner; heartbeat_at (unix seconds) tells a live 'running' job from one whose process died
+    conn.execute('ALTER TABLE PrecomputeJobs ADD COLUMN runner TEXT')
+    conn.execute('ALTER TABLE PrecomputeJobs ADD COLUMN heartbeat_at REAL')
+
+
+def current_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def latest_version():
+    return MIGRATIONS[-1][0]
+
+
+def migrate(conn, target=None):
+    """Apply pending migrations up to target (default: latest). Returns the versions applied."""
+    target = latest_version() if target is None else target
+    applied = []
+    for version, description, fn in MIGRATIONS:
+        if version <= current_version(conn) or version > target: continue
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Re-check under the write lock in case another process migrated first
+            if version > current_version(conn):
+                fn(conn)
+                conn.execute(f'PRAGMA user_version = {version}')
+                applied.append(version)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+    return applied
+
+
+def reset(conn):
+    """Drop every table so migrate() rebuilds the schema from scratch."""
+    tables = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")]
+    for t in tables: conn.execute(f'DROP TABLE IF EXISTS "{t}"')
+    conn.execute('PRAGMA user_version = 0')
+    conn.commit()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Apply schema migrations to the university database.')
+    parser.add_argument('--db', default=db.DB_PATH)
+    parser.add_argument('--to', type=int, default=None, help='target version (default: latest)')
+    parser.add_argument('--status', action='store_true', help='only print the current version')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db, isolation_level=None)
+    if args.status:
+        print(f"Schema version {current_version(conn)} (latest {latest_version()})")
+    else:
+        applied = migrate(conn, args.to)
+        print(f"Applied {applied or 'nothing'}; schema version {current_version(conn)}")
+    conn.close()
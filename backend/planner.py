@@ -0,0 +1,349 @@
+# Semester planner core. Courses are addressed by their bit in the snapshot's
+# PrereqGraph, so a passed set, a prerequisite set or "open in semester N" is a
+# single int and candidate filtering is a mask test.
+
+import time
+import metrics
+
+FYP_COURSES = ('CMPC-6702', 'CMPC-6703')
+ELECTIVE_PREFIXES = ('CSDE', 'ITDC', 'SEDC', 'DSDC', 'AIDC')
+MAX_SEMESTER = 8
+
+
+def get_course_type(course_id):
+    if any(x in course_id for x in ELECTIVE_PREFIXES): return 'Elective'
+    return 'Core'
+
+
+def credit_limit(strategy):
+    return 14 if strategy == 'relaxed' else 18
+
+
+class PlannerIndex:
+    """Per-snapshot arrays the planner loop reads instead of course dicts."""
+
+    def __init__(self, snap):
+        graph = snap.graph
+        self.graph = graph
+        self.courses = snap.courses
+        n = len(snap.courses)  # catalog courses occupy bits 0..n-1
+        self.catalog_mask = (1 << n) - 1
+        self.prereq_mask = graph.prereq_mask
+        self.credits = [c['credits'] for c in snap.courses]
+        self.difficulty = [c['difficulty_level'] if c['difficulty_level'] else 3 for c in snap.courses]
+        self.weight = [graph.depth[c['course_id']] for c in snap.courses]
+        self.elective = [get_course_type(c['course_id']) == 'Elective' for c in snap.courses]
+        self.excluded_mask = graph.mask_of(FYP_COURSES)
+
+        min_sems = [c['min_semester'] if c['min_semester'] else 1 for c in snap.courses]
+        self.min_sem = min_sems
+        top = max([MAX_SEMESTER, *min_sems])
+        # open_mask[s]: catalog courses whose min_semester allows them in semester s
+        self.open_mask = [0] * (top + 1)
+        for i, m in enumerate(min_sems):
+            for s in range(max(m, 0), top + 1): self.open_mask[s] |= 1 << i
+
+        # Catalog-only views of the DAG for the search planner
+        index = graph._index
+        self.topo = [index[c] for c in graph.topo_order if index[c] < n]
+        self.prereq_bits = [[index[p] for p in graph.prereqs[c['course_id']]] for c in snap.courses]
+        self.dependent_bits = [[index[d] for d in graph.dependents[c['course_id']] if index[d] < n] for c in snap.courses]
+
+    def mask_of(self, course_ids):
+        return self.graph.mask_of(course_ids)
+
+    def score(self, i, strategy, current_sem):
+        diff = self.difficulty[i]
+        score = self.weight[i] * 15
+        if strategy == 'aggressive': score += diff * 5
+        elif strategy == 'relaxed': score -= diff * 20
+        else:
+            if current_sem <= 2: score -= diff * 10
+            elif current_sem >= 7: score += diff * 5
+        return score
+
+    def candidates(self, remaining, passed, current_sem):
+        """Bit indices (catalog order) of courses that can be taken in current_sem."""
+        mask = remaining & self.open_mask[max(0, min(current_sem, len(self.open_mask) - 1))] & ~self.excluded_mask
+        not_passed, prereq_mask, out = ~passed, self.prereq_mask, []
+        while mask:
+            low = mask & -mask
+            i = low.bit_length() - 1
+            if not prereq_mask[i] & not_passed: out.append(i)
+            mask ^= low
+        return out
+
+
+def _build_index(snap):
+    with metrics.phase('graph_build'):  # includes compiling the snapshot's PrereqGraph
+        return PlannerIndex(snap)
+
+
+def get_index(snap):
+    return snap.derived('planner_index', lambda: _build_index(snap))
+
+
+def plan_roadmap(snap, passed_mask, start_sem, strategy='balanced', max_semester=MAX_SEMESTER):
+    """Greedy roadmap from start_sem to max_semester for a student whose passed set is passed_mask."""
+    idx = get_index(snap)
+    limit = credit_limit(strategy)
+    passed = passed_mask
+    remaining = idx.catalog_mask & ~passed
+    roadmap = []
+    current_sem = start_sem
+    t_candidates = t_scoring = 0.0
+    clock = time.perf_counter
+
+    while remaining and current_sem <= max_semester:
+        t0 = clock()
+        candidates = idx.candidates(remaining, passed, current_sem)
+        t1 = clock()
+        candidates.sort(key=lambda i: idx.score(i, strategy, current_sem), reverse=True)
+        t_candidates += t1 - t0
+        t_scoring += clock() - t1
+
+        semester_load, credits_sum, electives_count, taken = [], 0, 0, 0
+        for i in candidates:
+            if credits_sum + idx.credits[i] > limit: continue
+            if idx.elective[i]:
+                if electives_count >= 2: continue
+                electives_count += 1
+            semester_load.append(idx.courses[i])
+            credits_sum += idx.credits[i]
+            taken |= 1 << i
+
+        if not semester_load:
+            if not candidates: current_sem += 1; continue
+            break
+
+        explanation = []
+        if current_sem <= 2: explanation.append("Focusing on foundational courses.")
+        roadmap.append({"semester": current_sem, "courses": semester_load, "total_credits": credits_sum, "reason": " ".join(explanation)})
+        passed |= taken
+        remaining &= ~taken
+        current_sem += 1
+
+    metrics.observe_phase('candidates', t_candidates)
+    metrics.observe_phase('scoring', t_scoring)
+    return roadmap
+
+
+# --- Optimal-length search -------------------------------------------------
+# Minimizes the graduation semester instead of filling each semester greedily.
+# The greedy plan (up to MAX_SEMESTER) is the incumbent; the search then asks
+# "can everything be finished by semester G?" for G = incumbent - 1, - 2, ...
+# down to the lower bound, so any answer it has when the deadline hits is a
+# valid plan and the last one found when a G is proven infeasible is optimal.
+#
+# Each feasibility probe is a depth-first search over (remaining mask, semester)
+# states. Pruning:
+#   - lower bound: max of the critical path over remaining courses (earliest
+#     start respecting min_semester), remaining credits / credit limit and
+#     remaining electives / 2; a state whose bound exceeds G is dead.
+#   - forced courses: a course with a chain of t remaining dependents has to be
+#     taken by G - t; if those don't fit in one semester the state is dead.
+#   - only maximal course sets are branched on (leaving a course out that still
+#     fits never finishes earlier).
+#   - failed states are memoized, and stay failed for every smaller G.
+
+ELECTIVES_PER_SEMESTER = 2
+DEFAULT_DEADLINE_MS = 250
+MAX_DEADLINE_MS = 2000
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def plannable_mask(idx, passed_mask, limit):
+    """Unpassed catalog courses that some plan can schedule at all."""
+    ok = passed_mask
+    for i in idx.topo:
+        if passed_mask >> i & 1 or idx.excluded_mask >> i & 1 or idx.credits[i] > limit: continue
+        if idx.prereq_mask[i] & ~ok: continue  # unknown or unplannable prerequisite
+        ok |= 1 << i
+    return ok & idx.catalog_mask & ~passed_mask
+
+
+class _Search:
+    def __init__(self, idx, strategy, limit, deadline):
+        self.idx, self.strategy, self.limit, self.deadline = idx, strategy, limit, deadline
+        self.failed = set()
+        self.nodes = 0
+
+    def analyse(self, remaining, sem):
+        """(lower bound on the graduation semester, tail lengths) for a state.
+
+        est is the earliest semester a course can be taken, tail the longest chain
+        of remaining courses that depend on it. Every course with est >= k and
+        tail >= t has to fit into semesters k .. goal - t, which bounds the goal by
+        credits and by electives; k = sem, t = 0 is the plain load bound and a
+        single course gives the critical path.
+        """
+        idx, est, tail = self.idx, {}, {}
+        for i in idx.topo:
+            if not remaining >> i & 1: continue
+            e = max(sem, idx.min_sem[i])
+            for p in idx.prereq_bits[i]:
+                if p in est and est[p] + 1 > e: e = est[p] + 1
+            est[i] = e
+        load = {}  # (est, tail) -> [credits, electives]
+        for i in reversed(idx.topo):
+            if i not in est: continue
+            t = 0
+            for d in idx.dependent_bits[i]:
+                if d in tail and tail[d] + 1 > t: t = tail[d] + 1
+            tail[i] = t
+            cell = load.setdefault((est[i], t), [0, 0])
+            cell[0] += idx.credits[i]
+            cell[1] += idx.elective[i]
+
+        bound = sem - 1
+        ks = sorted({k for k, _ in load}, reverse=True)
+        ts = sorted({t for _, t in load}, reverse=True)
+        for k in ks:
+            for t in ts:
+                credits = electives = 0
+                for (k2, t2), (c, e) in load.items():
+                    if k2 >= k and t2 >= t: credits += c; electives += e
+                if not credits: continue
+                need = max(1, -(-credits // self.limit), -(-electives // ELECTIVES_PER_SEMESTER))
+                if k + t + need - 1 > bound: bound = k + t + need - 1
+        return bound, tail
+
+    def subsets(self, forced, optional, tail):
+        """Maximal course sets (as masks) that extend forced within the semester limits."""
+        idx, limit = self.idx, self.limit
+        credits = sum(idx.credits[i] for i in forced)
+        electives = sum(idx.elective[i] for i in forced)
+        if credits > limit or electives > ELECTIVES_PER_SEMESTER: return
+        base = 0
+        for i in forced: base |= 1 << i
+        n = len(optional)
+        suffix_credits, suffix_electives = [0] * (n + 1), [0] * (n + 1)
+        for k in range(n - 1, -1, -1):
+            suffix_credits[k] = suffix_credits[k + 1] + idx.credits[optional[k]]
+            suffix_electives[k] = suffix_electives[k + 1] + idx.elective[optional[k]]
+        # Courses nothing remaining depends on are interchangeable when their credits and
+        # elective flag match, so within such a group only prefixes are tried.
+        group = [(idx.credits[i], idx.elective[i]) if tail[i] == 0 else None for i in optional]
+
+        inf = limit + 1
+
+        def walk(k, mask, credits, electives, core_min, elective_min, skipped_groups):
+            # core_min / elective_min: fewest credits among skipped courses. If one of them
+            # still fits even after taking everything left, no leaf below is maximal.
+            if credits + suffix_credits[k] + core_min <= limit: return
+            if electives + suffix_electives[k] < ELECTIVES_PER_SEMESTER and credits + suffix_credits[k] + elective_min <= limit: return
+            if k == n:
+                if credits + core_min > limit and (electives >= ELECTIVES_PER_SEMESTER or credits + elective_min > limit): yield mask
+                elif time.monotonic() > self.deadline: raise SearchTimeout()
+                return
+            i, g = optional[k], group[k]
+            c, e = idx.credits[i], idx.elective[i]
+            if credits + c <= limit and not (e and electives >= ELECTIVES_PER_SEMESTER) and (g is None or g not in skipped_groups):
+                yield from walk(k + 1, mask | 1 << i, credits + c, electives + e, core_min, elective_min, skipped_groups)
+            yield from walk(k + 1, mask, credits, electives,
+                            core_min if e else min(core_min, c), min(elective_min, c) if e else elective_min,
+                            skipped_groups if g is None else skipped_groups | {g})
+
+        yield from walk(0, base, credits, electives, inf, inf, frozenset())
+
+    def solve(self, remaining, sem, passed, goal):
+        """Semester masks finishing remaining by goal, or None."""
+        if not remaining: return []
+        self.nodes += 1
+        if time.monotonic() > self.deadline: raise SearchTimeout()
+        if sem > goal or (remaining, sem) in self.failed: return None
+        bound, tail = self.analyse(remaining, sem)
+        if bound <= goal:
+            idx = self.idx
+            candidates = idx.candidates(remaining, passed, sem)
+            if not candidates:
+                rest = self.solve(remaining, sem + 1, passed, goal)
+                if rest is not None: return [0] + rest
+            else:
+                # A course with t remaining dependents in a chain must be taken by goal - t
+                forced = [i for i in candidates if goal - tail[i] <= sem]
+                optional = [i for i in candidates if goal - tail[i] > sem]
+                # Least slack first, then the greedy preference, so the first branch is a sensible plan
+                optional.sort(key=lambda i: (-tail[i], -idx.score(i, self.strategy, sem)))
+                for taken in self.subsets(forced, optional, tail):
+                    rest = self.solve(remaining & ~taken, sem + 1, passed | taken, goal)
+                    if rest is not None: return [taken] + rest
+        self.failed.add((remaining, sem))
+        return None
+
+
+def _roadmap_from_masks(idx, masks, start_sem, strategy):
+    roadmap = []
+    for offset, taken in enumerate(masks):
+        if not taken: continue
+        sem = start_sem + offset
+        picked = sorted((i for i in range(taken.bit_length()) if taken >> i & 1),
+                        key=lambda i: idx.score(i, strategy, sem), reverse=True)
+        explanation = []
+        if sem <= 2: explanation.append("Focusing on foundational courses.")
+        roadmap.append({"semester": sem, "courses": [idx.courses[i] for i in picked],
+                        "total_credits": sum(idx.credits[i] for i in picked), "reason": " ".join(explanation)})
+    return roadmap
+
+
+def _last_semester(roadmap, start_sem):
+    return roadmap[-1]['semester'] if roadmap else start_sem - 1
+
+
+def search_roadmap(snap, passed_mask, start_sem, strategy='balanced', deadline_ms=DEFAULT_DEADLINE_MS, stats=None):
+    """Shortest roadmap covering every plannable course, or the best found before deadline_ms.
+
+    Courses that can never be scheduled (FYP, unknown prerequisites, more credits
+    than the limit) are left out, as the greedy planner does. Plans stop at
+    MAX_SEMESTER like the greedy one: when the plannable courses cannot all be
+    finished by then the greedy plan is returned. If stats is a dict it receives
+    optimal, semesters and lower_bound (both counted from start_sem), nodes,
+    elapsed_ms, exceeds_max_semester (no plan can fit by MAX_SEMESTER) and
+    unscheduled (plannable course ids the returned plan leaves out).
+    """
+    started = time.monotonic()
+    idx = get_index(snap)
+    limit = credit_limit(strategy)
+    target = plannable_mask(idx, passed_mask, limit)
+    search = _Search(idx, strategy, limit, started + deadline_ms / 1000)
+    lower = search.analyse(target, start_sem)[0] if target else start_sem - 1
+
+    greedy = plan_roadmap(snap, passed_mask, start_sem, strategy)
+    covered = idx.mask_of(c['course_id'] for sem in greedy for c in sem['courses'])
+    best, optimal, exceeds = None, False, bool(target) and lower > MAX_SEMESTER
+    try:
+        if exceeds:
+            pass
+        elif covered & target == target:
+            # Tighten the greedy incumbent; failed states stay failed for every smaller goal
+            best = greedy
+            optimal = _last_semester(best, start_sem) <= lower
+            while not optimal:
+                masks = search.solve(target, start_sem, passed_mask, _last_semester(best, start_sem) - 1)
+                if masks is None: optimal = True; break
+                best = _roadmap_from_masks(idx, masks, start_sem, strategy)
+                optimal = _last_semester(best, start_sem) <= lower
+        else:
+            # The greedy pass got stuck or ran out of semesters, so there is no incumbent: search upwards from the bound
+            for goal in range(lower, MAX_SEMESTER + 1):
+                search.failed.clear()
+                masks = search.solve(target, start_sem, passed_mask, goal)
+                if masks is not None:
+                    best, optimal = _roadmap_from_masks(idx, masks, start_sem, strategy), True
+                    break
+            else:
+                exceeds = True
+    except SearchTimeout:
+        pass
+    if best is None: best = greedy
+    metrics.observe_phase('search', time.monotonic() - started)
+
+    if stats is not None:
+        left = target & ~idx.mask_of(c['course_id'] for sem in best for c in sem['courses'])
+        stats.update({'optimal': optimal, 'lower_bound': lower - start_sem + 1, 'semesters': _last_semester(best, start_sem) - start_sem + 1,
+                      'nodes': search.nodes, 'elapsed_ms': round((time.monotonic() - started) * 1000, 2),
+                      'exceeds_max_semester': exceeds, 'unscheduled': [idx.courses[i]['course_id'] for i in range(left.bit_length()) if left >> i & 1]})
+    return best
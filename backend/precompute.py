@@ -0,0 +1,274 @@
+import argparse
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+import catalog
+import db
+import migrations
+import planner
+import roadmap_cache
+
+# Cohort roadmap precomputation. A job walks the selected students in
+# roll_number order, plans chunks of them across a process pool and writes the
+# results into PlannedRoadmaps. Chunks are committed in order together with the
+# job's last_roll, so an interrupted job resumes right after the last chunk that
+# landed. generate-path serves these rows while their plan_key still matches.
+#
+# A job is claimed in PrecomputeJobs itself (migration 12), not in process
+# memory, so under several gunicorn workers only one of them runs it. The claim
+# stores a runner token and the runner refreshes heartbeat_at while it works;
+# a 'running' job whose heartbeat went stale (its process died) can be claimed
+# again, and a runner whose token was replaced stops before its next commit.
+#
+#   python precompute.py --strategy balanced --semester 3 --workers 4
+#   python precompute.py --resume 12
+
+CHUNK_SIZE = 200
+_CHUNK = 500  # stays under SQLite's bound-parameter limit
+
+HEARTBEAT_S = 10
+STALE_AFTER_S = 3 * HEARTBEAT_S  # a 'running' job without a heartbeat for this long is claimable again
+
+
+class JobRunning(RuntimeError):
+    """The job is already being run (by this or another process)."""
+
+# Worker process state: one catalog snapshot per worker, loaded in _init_worker
+_worker_snap = None
+
+
+def _init_worker(path):
+    global _worker_snap
+    conn = db.open_raw(path)
+    try: _worker_snap = catalog.load_snapshot(conn)
+    finally: conn.close()
+
+
+def plan_chunk(students, strategy):
+    """[(roll_number, start_sem, passed course ids)] -> PlannedRoadmaps rows (without job_id)."""
+    snap = _worker_snap
+    idx = planner.get_index(snap)
+    memo, rows = {}, []
+    for roll, start_sem, passed in students:
+        mask = idx.mask_of(passed)
+        if (mask, start_sem) not in memo:
+            roadmap = planner.plan_roadmap(snap, mask, start_sem, strategy)
+            memo[mask, start_sem] = (roadmap_cache.make_key(snap.digest, mask, strategy, start_sem),
+                                     roadmap[-1]['semester'] if roadmap else None, json.dumps(roadmap))
+        key, graduation, body = memo[mask, start_sem]
+        rows.append((roll, strategy, snap.digest, key, start_sem, graduation, body))
+    return rows
+
+
+def _students_after(conn, filters, last_roll, limit):
+    """Next (roll_number, start_sem, passed) batch in roll_number order."""
+    if filters.get('roll_numbers') is not None:
+        rolls = sorted(r for r in set(filters['roll_numbers']) if last_roll is None or r > last_roll)[:limit]
+    else:
+        where, params = ['roll_number > ?'], [last_roll or '']
+        if filters.get('semester') is not None: where.append('current_semester = ?'); params.append(filters['semester'])
+        rolls = [r[0] for r in conn.execute(f"SELECT roll_number FROM StudentProfiles WHERE {' AND '.join(where)} "
+                                            'ORDER BY roll_number LIMIT ?', (*params, limit))]
+    semesters, passed = {}, {r: [] for r in rolls}
+    for k in range(0, len(rolls), _CHUNK):
+        chunk = rolls[k:k + _CHUNK]
+        marks = ','.join('?' * len(chunk))
+        for row in conn.execute(f'SELECT roll_number, current_semester FROM StudentProfiles WHERE roll_number IN ({marks})', chunk):
+            semesters[row[0]] = row[1]
+        for row in conn.execute(f'SELECT roll_number, course_id FROM PassedCourses WHERE roll_number IN ({marks})', chunk):
+            passed[row[0]].append(row[1])
+    # Same start semester rule as generate-path
+    return [(r, (semesters[r] + 1) if r in semesters else 1, passed[r]) for r in rolls]
+
+
+def _count(conn, filters):
+    if filters.get('roll_numbers') is not None: return len(set(filters['roll_numbers']))
+    if filters.get('semester') is not None:
+        return conn.execute('SELECT COUNT(*) FROM StudentProfiles WHERE current_semester = ?', (filters['semester'],)).fetchone()[0]
+    return conn.execute('SELECT COUNT(*) FROM StudentProfiles').fetchone()[0]
+
+
+def create_job(conn, strategy='balanced', semester=None, roll_numbers=None):
+    filters = {'semester': semester} if roll_numbers is None else {'roll_numbers': list(roll_numbers)}
+    cur = conn.execute('INSERT INTO PrecomputeJobs (strategy, filter, total) VALUES (?, ?, ?)',
+                       (strategy, json.dumps(filters), _count(conn, filters)))
+    conn.commit()
+    return cur.lastrowid
+
+
+def get_job(conn, job_id):
+    row = conn.execute('SELECT job_id, strategy, filter, status, total, done, last_roll, error, created_at, updated_at, heartbeat_at '
+                       'FROM PrecomputeJobs WHERE job_id = ?', (job_id,)).fetchone()
+    if row is None: return None
+    job = {k: row[k] for k in row.keys() if k != 'heartbeat_at'}
+    job['filter'] = json.loads(job['filter'] or '{}')
+    if 'roll_numbers' in job['filter']: job['filter'] = {'roll_numbers': len(job['filter']['roll_numbers'])}
+    job['running'] = _alive(job['status'], row['heartbeat_at'])
+    return job
+
+
+def _alive(status, heartbeat_at):
+    return status == 'running' and heartbeat_at is not None and heartbeat_at >= time.time() - STALE_AFTER_S
+
+
+def claim_job(conn, job_id):
+    """Atomically take over a job unless a live runner holds it. Returns the new runner token, or None."""
+    runner, now = uuid.uuid4().hex, time.time()
+    cur = conn.execute("""
+        UPDATE PrecomputeJobs SET status = 'running', runner = ?, heartbeat_at = ?, error = NULL, updated_at = CURRENT_TIMESTAMP
+        WHERE job_id = ? AND (status != 'running' OR heartbeat_at IS NULL OR heartbeat_at < ?)""",
+        (runner, now, job_id, now - STALE_AFTER_S))
+    conn.commit()
+    return runner if cur.rowcount else None
+
+
+def _beat(conn, job_id, runner):
+    """Refresh the heartbeat; False once another runner has claimed the job."""
+    cur = conn.execute('UPDATE PrecomputeJobs SET heartbeat_at = ? WHERE job_id = ? AND runner = ?', (time.time(), job_id, runner))
+    conn.commit()
+    return cur.rowcount > 0
+
+
+def list_jobs(conn, limit=50):
+    ids = [r[0] for r in conn.execute('SELECT job_id FROM PrecomputeJobs ORDER BY job_id DESC LIMIT ?', (limit,))]
+    return [get_job(conn, i) for i in ids]
+
+
+def _set_status(conn, job_id, runner, status, error=None):
+    # Only the runner holding the claim may finish the job
+    conn.execute("UPDATE PrecomputeJobs SET status = ?, error = ?, updated_at = CURRENT_TIMESTAMP WHERE job_id = ? AND runner = ?",
+                 (status, error, job_id, runner))
+    conn.commit()
+
+
+def _claim(job_id, path):
+    conn = db.open_raw(path)
+    try:
+        if conn.execute('SELECT 1 FROM PrecomputeJobs WHERE job_id = ?', (job_id,)).fetchone() is None: raise KeyError(f"Unknown job {job_id}")
+        return claim_job(conn, job_id)
+    finally: conn.close()
+
+
+def run_job(job_id, workers=None, chunk_size=CHUNK_SIZE, path=None, on_progress=None):
+    """Claim and run (or resume) a job to completion in this thread. Returns its final status;
+    raises JobRunning if a live runner already holds it."""
+    path = path or db.DB_PATH
+    runner = _claim(job_id, path)
+    if runner is None: raise JobRunning(f"Job {job_id} is already running")
+    return _run_claimed(job_id, runner, workers, chunk_size, path, on_progress)
+
+
+def _run_claimed(job_id, runner, workers=None, chunk_size=CHUNK_SIZE, path=None, on_progress=None):
+    workers = workers or os.cpu_count() or 1
+    conn = db.open_raw(path)
+    try:
+        job = conn.execute('SELECT strategy, filter, done, last_roll FROM PrecomputeJobs WHERE job_id = ?', (job_id,)).fetchone()
+        strategy, filters, done, last_roll = job['strategy'], json.loads(job['filter'] or '{}'), job['done'], job['last_roll']
+        # spawn, not fork: the app process has live SQLite connections and threads
+        ctx = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker, initargs=(path,)) as pool:
+            pending, cursor, exhausted = [], last_roll, False
+            while True:
+                # Keep a bounded window of chunks in flight, committed strictly in roll order
+                while not exhausted and len(pending) < workers * 2:
+                    students = _students_after(conn, filters, cursor, chunk_size)
+                    if not students: exhausted = True; break
+                    cursor = students[-1][0]
+                    pending.append((cursor, len(students), pool.submit(plan_chunk, students, strategy)))
+                if not pending: break
+                chunk_last, n, future = pending.pop(0)
+                while True:
+                    try: rows = future.result(HEARTBEAT_S); break
+                    except FutureTimeout:
+                        if not _beat(conn, job_id, runner): return _stop(pending)
+                conn.execute('BEGIN IMMEDIATE')
+                conn.executemany("""
+                    INSERT INTO PlannedRoadmaps (roll_number, strategy, catalog_digest, plan_key, start_semester, graduation_semester, roadmap, job_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (roll_number, strategy) DO UPDATE SET
+                        catalog_digest = excluded.catalog_digest, plan_key = excluded.plan_key,
+                        start_semester = excluded.start_semester, graduation_semester = excluded.graduation_semester,
+                        roadmap = excluded.roadmap, job_id = excluded.job_id, computed_at = CURRENT_TIMESTAMP
+                """, [(*r, job_id) for r in rows])
+                done += n
+                claimed = conn.execute('UPDATE PrecomputeJobs SET done = ?, last_roll = ?, heartbeat_at = ?, updated_at = CURRENT_TIMESTAMP '
+                                       'WHERE job_id = ? AND runner = ?', (done, chunk_last, time.time(), job_id, runner)).rowcount
+                if not claimed:
+                    # Another runner took the job over (a resume after a cancel): its chunks win
+                    conn.execute('ROLLBACK')
+                    return _stop(pending)
+                status = conn.execute('SELECT status FROM PrecomputeJobs WHERE job_id = ?', (job_id,)).fetchone()[0]
+                conn.execute('COMMIT')
+                if on_progress: on_progress(done)
+                if status == 'cancelled': return _stop(pending, status)
+        _set_status(conn, job_id, runner, 'completed')
+        return 'completed'
+    except Exception as e:
+        if conn.in_transaction: conn.rollback()
+        _set_status(conn, job_id, runner, 'failed', str(e))
+        raise
+    finally:
+        conn.close()
+
+
+def _stop(pending, status='superseded'):
+    for _, _, f in pending: f.cancel()
+    return status
+
+
+def start_job(job_id, workers=None, path=None):
+    """Claim a job and run it on a background thread of this process. False if a live runner
+    (in any process) already holds it."""
+    path = path or db.DB_PATH
+    runner = _claim(job_id, path)
+    if runner is None: return False
+
+    def target():
+        try: _run_claimed(job_id, runner, workers, path=path)
+        except Exception: pass  # recorded on the job row
+
+    threading.Thread(target=target, name=f'precompute-{job_id}', daemon=True).start()
+    return True
+
+
+def cancel_job(conn, job_id):
+    """Ask a running job to stop after its current chunk (it can be resumed later)."""
+    cur = conn.execute("UPDATE PrecomputeJobs SET status = 'cancelled', updated_at = CURRENT_TIMESTAMP "
+                       "WHERE job_id = ? AND status IN ('pending', 'running')", (job_id,))
+    conn.commit()
+    return cur.rowcount > 0
+
+
+def lookup(conn, roll_number, strategy, plan_key):
+    """Precomputed roadmap for this exact plan key, or None."""
+    row = conn.execute('SELECT roadmap FROM PlannedRoadmaps WHERE roll_number = ? AND strategy = ? AND plan_key = ?',
+                       (roll_number, strategy, plan_key)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Precompute roadmaps for every student (or a cohort) into PlannedRoadmaps.')
+    parser.add_argument('--db', default=db.DB_PATH)
+    parser.add_argument('--strategy', default='balanced', choices=('balanced', 'aggressive', 'relaxed'))
+    parser.add_argument('--semester', type=int, default=None, help='only students currently in this semester')
+    parser.add_argument('--workers', type=int, default=None, help='default: one per CPU')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--resume', type=int, default=None, metavar='JOB_ID', help='continue an interrupted job')
+    args = parser.parse_args()
+
+    conn = db.open_raw(args.db)
+    migrations.migrate(conn)
+    job_id = args.resume or create_job(conn, args.strategy, args.semester)
+    total = conn.execute('SELECT total FROM PrecomputeJobs WHERE job_id = ?', (job_id,)).fetchone()[0]
+    conn.close()
+    try:
+        status = run_job(job_id, args.workers, args.chunk_size, args.db,
+                         on_progress=lambda done: print(f"... job {job_id}: {done}/{total} students", end='\r'))
+    except JobRunning as e:
+        print(e)
+        raise SystemExit(1)
+    print(f"\nJob {job_id} {status}")
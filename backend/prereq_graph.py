@@ -0,0 +1,94 @@
+# Prerequisite DAG compiled once per catalog snapshot. Every course gets a bit
+# index (catalog order first, then ids that only appear in Prerequisites rows),
+# so prerequisite sets and transitive closures are plain int bitmasks.
+
+
+class PrereqCycleError(ValueError):
+    def __init__(self, courses):
+        self.courses = sorted(courses)
+        super().__init__(f"Prerequisite cycle among: {', '.join(self.courses)}")
+
+
+class PrereqGraph:
+    def __init__(self, course_ids, edges):
+        edges = list(dict.fromkeys(edges))
+        self.nodes = list(dict.fromkeys([*course_ids, *(n for edge in edges for n in edge)]))
+        self._index = index = {n: i for i, n in enumerate(self.nodes)}
+
+        self.prereqs = {n: [] for n in self.nodes}      # course -> direct prerequisites
+        self.dependents = {n: [] for n in self.nodes}   # prerequisite -> direct dependents
+        self.prereq_mask = [0] * len(self.nodes)
+        for course_id, prereq_id in edges:
+            if course_id == prereq_id: raise PrereqCycleError([course_id])
+            self.prereqs[course_id].append(prereq_id)
+            self.dependents[prereq_id].append(course_id)
+            self.prereq_mask[index[course_id]] |= 1 << index[prereq_id]
+
+        self.topo_order = self._topological_order()
+
+        # Critical-path depth: longest chain of dependents hanging off a course
+        self.depth = {}
+        for n in reversed(self.topo_order):
+            self.depth[n] = max((1 + self.depth[d] for d in self.dependents[n]), default=0)
+
+        # Transitive closures as bitmasks, filled in topological order
+        self.ancestor_mask = [0] * len(self.nodes)
+        for n in self.topo_order:
+            i = index[n]
+            for p in self.prereqs[n]:
+                j = index[p]
+                self.ancestor_mask[i] |= (1 << j) | self.ancestor_mask[j]
+        self.descendant_mask = [0] * len(self.nodes)
+        for n in reversed(self.topo_order):
+            i = index[n]
+            for d in self.dependents[n]:
+                j = index[d]
+                self.descendant_mask[i] |= (1 << j) | self.descendant_mask[j]
+
+    def _topological_order(self):
+        indegree = {n: len(self.prereqs[n]) for n in self.nodes}
+        ready = [n for n in self.nodes if indegree[n] == 0]
+        order = []
+        while ready:
+            n = ready.pop()
+            order.append(n)
+            for d in self.dependents[n]:
+                indegree[d] -= 1
+                if indegree[d] == 0: ready.append(d)
+        if len(order) != len(self.nodes):
+            raise PrereqCycleError([n for n in self.nodes if indegree[n] > 0])
+        return order
+
+    # --- bitmask helpers ---
+    def bit(self, course_id):
+        return 1 << self._index[course_id]
+
+    def mask_of(self, course_ids):
+        index, mask = self._index, 0
+        for c in course_ids:
+            if c in index: mask |= 1 << index[c]
+        return mask
+
+    def ids_of(self, mask):
+        ids = []
+        while mask:
+            low = mask & -mask
+            ids.append(self.nodes[low.bit_length() - 1])
+            mask ^= low
+        return ids
+
+    # --- closure queries ---
+    def all_prereqs(self, course_id):
+        return set(self.ids_of(self.ancestor_mask[self._index[course_id]]))
+
+    def all_dependents(self, course_id):
+        return set(self.ids_of(self.descendant_mask[self._index[course_id]]))
+
+    def requires(self, course_id, prereq_id):
+        return bool(self.ancestor_mask[self._index[course_id]] & self.bit(prereq_id))
+
+    def would_cycle(self, course_id, prereq_id):
+        """True if adding the edge prereq_id -> course_id would close a cycle."""
+        if course_id == prereq_id: return True
+        if course_id not in self._index or prereq_id not in self._index: return False
+        return self.requires(prereq_id, course_id)
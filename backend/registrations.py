@@ -0,0 +1,297 @@
+import argparse
+import csv
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+import db
+import metrics
+import migrations
+
+# Set-based registration writes. A batch of (roll_number, course_id, semester_label)
+# rows is validated and inserted in one IMMEDIATE transaction with
+# INSERT ... ON CONFLICT DO NOTHING; the rows that actually landed are read back
+# by reg_id, which gives a per-row outcome without a SELECT-then-INSERT round
+# trip per course. Courses with a capacity take 'Registered' rows until their
+# EnrollmentCounts counter reaches it and 'Waitlisted' ones after that, decided
+# inside the insert under the write lock, so seats can't be oversold.
+#
+# Student registrations go through WRITER: one thread per process drains a queue
+# and group-commits every request waiting in it in a single transaction (one
+# savepoint per request), retrying BEGIN IMMEDIATE with backoff while another
+# process holds the write lock. Each request carries the database path configured
+# when it was submitted and the submitting request's metrics, so the writer
+# follows db.configure() and its statements are counted for the waiting request.
+
+DEFAULT_STATUS = 'Registered'
+WAITLISTED = 'Waitlisted'
+# Outcome for a row that was already there, by its stored status; any other status (e.g. Completed) is 'duplicate'
+ALREADY = {DEFAULT_STATUS: 'already_registered', WAITLISTED: 'already_waitlisted'}
+ACCEPTED = ('registered', 'waitlisted', *ALREADY.values(), 'duplicate')  # outcomes an import doesn't report as rejected
+_CHUNK = 500  # stays under SQLite's bound-parameter limit
+
+GROUP_MAX_REQUESTS = int(os.environ.get('COURSE_ADVISOR_WRITE_GROUP_MAX', '256'))
+WRITE_TIMEOUT_S = float(os.environ.get('COURSE_ADVISOR_WRITE_TIMEOUT_S', '10'))
+LOCK_RETRIES = 6
+LOCK_BACKOFF_S = 0.01  # doubled per retry
+
+
+class WriterBusy(RuntimeError):
+    """The write could not be committed in time (queue backlog or a held write lock)."""
+
+
+def _existing(conn, sql, values):
+    found, values = set(), list(values)
+    for k in range(0, len(values), _CHUNK):
+        chunk = values[k:k + _CHUNK]
+        found.update(r[0] for r in conn.execute(sql.format(marks=','.join('?' * len(chunk))), chunk))
+    return found
+
+
+def taken(conn, course_id, label):
+    """Seats held in a course for a semester label, from the EnrollmentCounts counter (migration 10)."""
+    row = conn.execute('SELECT count FROM EnrollmentCounts WHERE course_id = ? AND semester_label = ? AND status = ?',
+                       (course_id, label, DEFAULT_STATUS)).fetchone()
+    return row[0] if row else 0
+
+
+# The status is decided per row against the course's capacity and the EnrollmentCounts counter, which the
+# insert trigger bumps before the next row of the executemany is evaluated
+_SEAT_INSERT = f"""
+    INSERT INTO Registrations (roll_number, course_id, semester_label, status)
+    SELECT ?1, c.course_id, ?3,
+           CASE WHEN c.capacity IS NULL OR c.capacity > IFNULL((
+               SELECT e.count FROM EnrollmentCounts e
+               WHERE e.course_id = c.course_id AND e.semester_label = ?3 AND e.status = '{DEFAULT_STATUS}'), 0)
+           THEN '{DEFAULT_STATUS}' ELSE '{WAITLISTED}' END
+    FROM Courses c WHERE c.course_id = ?2
+    ON CONFLICT (roll_number, course_id, semester_label) DO NOTHING"""
+_PLAIN_INSERT = """
+    INSERT INTO Registrations (roll_number, course_id, semester_label, status) VALUES (?, ?, ?, ?)
+    ON CONFLICT (roll_number, course_id, semester_label) DO NOTHING"""
+
+
+def register_rows(conn, rows, status=DEFAULT_STATUS):
+    """register_bulk inside the caller's write transaction. Seats are only taken by
+    the default status; rows past a course's capacity are waitlisted instead."""
+    rows = [tuple(r) for r in rows]
+    shaped = [r for r in rows if len(r) == 3 and all(r)]
+    courses = _existing(conn, 'SELECT course_id FROM Courses WHERE course_id IN ({marks})', {r[1] for r in shaped})
+    students = _existing(conn, 'SELECT username FROM Users WHERE username IN ({marks})', {r[0] for r in shaped})
+    valid = [r for r in shaped if r[0] in students and r[1] in courses]
+
+    last_id = conn.execute('SELECT COALESCE(MAX(reg_id), 0) FROM Registrations').fetchone()[0]
+    if status == DEFAULT_STATUS: conn.executemany(_SEAT_INSERT, valid)
+    else: conn.executemany(_PLAIN_INSERT, [(*r, status) for r in valid])
+    # The rows that landed, read back by reg_id (AUTOINCREMENT ids only grow); the rest were already there
+    inserted = {(r[0], r[1], r[2]): r[3] for r in conn.execute(
+        'SELECT roll_number, course_id, semester_label, status FROM Registrations WHERE reg_id > ?', (last_id,))}
+    existing = {**_statuses(conn, {r for r in valid if r not in inserted}), **inserted}
+
+    outcomes = []
+    for r in rows:
+        if len(r) != 3 or not all(r): outcomes.append('invalid')
+        elif r[0] not in students: outcomes.append('unknown_student')
+        elif r[1] not in courses: outcomes.append('unknown_course')
+        elif r in inserted: outcomes.append('waitlisted' if inserted.pop(r) == WAITLISTED else 'registered')
+        else: outcomes.append(ALREADY.get(existing.get(r), 'duplicate'))  # including a row repeated in the same batch
+    return outcomes
+
+
+def _statuses(conn, keys):
+    """{(roll_number, course_id, semester_label): status} for rows that already exist."""
+    found, keys = {}, list(keys)
+    step = _CHUNK // 3
+    for k in range(0, len(keys), step):
+        chunk = keys[k:k + step]
+        found.update(((r[0], r[1], r[2]), r[3]) for r in conn.execute(f"""
+            SELECT r.roll_number, r.course_id, r.semester_label, r.status
+            FROM (VALUES {','.join(['(?, ?, ?)'] * len(chunk))}) v
+            JOIN Registrations r ON r.roll_number = v.column1 AND r.course_id = v.column2 AND r.semester_label = v.column3""",
+            [x for key in chunk for x in key]))
+    return found
+
+
+def register_bulk(conn, rows, status=DEFAULT_STATUS):
+    """Register rows atomically. Returns one outcome per input row: 'registered', 'waitlisted',
+    'already_registered', 'already_waitlisted', 'duplicate' (already there with another status),
+    'unknown_student', 'unknown_course' or 'invalid'."""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        outcomes = register_rows(conn, rows, status)
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    return outcomes
+
+
+def promote_waitlist(conn, course_id):
+    """Give seats freed by a capacity change to waitlisted rows, oldest first. Returns how many moved."""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        row = conn.execute('SELECT capacity FROM Courses WHERE course_id = ?', (course_id,)).fetchone()
+        moved = 0
+        labels = [] if row is None else [r[0] for r in conn.execute(
+            'SELECT DISTINCT semester_label FROM Registrations WHERE course_id = ? AND status = ?', (course_id, WAITLISTED))]
+        for label in labels:
+            free = -1  # LIMIT -1: no capacity, everyone gets a seat
+            if row[0] is not None:
+                free = row[0] - taken(conn, course_id, label)
+                if free <= 0: continue
+            moved += conn.execute("""
+                UPDATE Registrations SET status = ? WHERE reg_id IN (
+                    SELECT reg_id FROM Registrations WHERE course_id = ? AND semester_label = ? AND status = ? ORDER BY reg_id LIMIT ?)""",
+                (DEFAULT_STATUS, course_id, label, WAITLISTED, free)).rowcount
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    return moved
+
+
+class RegistrationWriter:
+    """One writer thread that group-commits queued register requests."""
+
+    def __init__(self, path=None, max_requests=GROUP_MAX_REQUESTS):
+        self.path = path
+        self.max_requests = max_requests
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.commits = self.requests = 0
+
+    def submit(self, rows, status=DEFAULT_STATUS):
+        """Queue rows for registration; the Future resolves to their outcomes once committed."""
+        self._ensure_thread()
+        future = Future()
+        self._queue.put((list(rows), status, future, self.path or db.DB_PATH, metrics.current()))
+        return future
+
+    def register(self, rows, status=DEFAULT_STATUS, timeout=WRITE_TIMEOUT_S):
+        # concurrent.futures.TimeoutError is only the builtin TimeoutError from Python 3.11 on
+        future = self.submit(rows, status)
+        try: return future.result(timeout)
+        except FutureTimeout:
+            # Busy if the request never started; once its group is running it commits, so give it one more timeout
+            if future.cancel(): raise WriterBusy('Registration is busy, please retry')
+        try: return future.result(timeout)
+        except FutureTimeout:
+            raise WriterBusy('Registration is taking too long; it may still complete, check your registrations before retrying')
+
+    def backlog(self):
+        return self._queue.qsize()
+
+    def _ensure_thread(self):
+        # Started on first use, so a preloading (pre-fork) parent never owns it
+        if self._thread is not None and self._thread.is_alive(): return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='registration-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        conn = path = None
+        while True:
+            group = [self._queue.get()]
+            while len(group) < self.max_requests:
+                try: group.append(self._queue.get_nowait())
+                except queue.Empty: break
+            group = [g for g in group if g[2].set_running_or_notify_cancel()]  # drop requests that timed out
+            # One transaction per database path, in queue order
+            while group:
+                same = [g for g in group if g[3] == group[0][3]]
+                group = [g for g in group if g[3] != same[0][3]]
+                try:
+                    if same[0][3] != path:
+                        if conn is not None: conn.close()
+                        conn, path = db.open_raw(same[0][3]), same[0][3]
+                    self._commit(conn, same)
+                except Exception as e:
+                    # The futures are already running, so nothing else would ever resolve them; reopen for the next group
+                    for g in same:
+                        if not g[2].done(): g[2].set_exception(e)
+                    if conn is not None:
+                        try: conn.close()
+                        except Exception: pass
+                    conn, path = None, None
+
+    def _begin(self, conn):
+        for attempt in range(LOCK_RETRIES + 1):
+            try: return conn.execute('BEGIN IMMEDIATE')
+            except sqlite3.OperationalError as e:
+                if 'locked' not in str(e) or attempt == LOCK_RETRIES: raise WriterBusy(str(e))
+                time.sleep(LOCK_BACKOFF_S * 2 ** attempt)
+
+    def _commit(self, conn, group):
+        results = []
+        try:
+            # The shared BEGIN/COMMIT are counted for the first request in the group
+            with metrics.adopt(group[0][4]): self._begin(conn)
+            for rows, status, future, _, stats in group:
+                with metrics.adopt(stats):
+                    # A failing request only rolls back its own savepoint
+                    conn.execute('SAVEPOINT request')
+                    try:
+                        results.append((future, register_rows(conn, rows, status), None))
+                    except Exception as e:
+                        conn.execute('ROLLBACK TO request')
+                        results.append((future, None, e))
+                    conn.execute('RELEASE request')
+            with metrics.adopt(group[0][4]): conn.execute('COMMIT')
+        except Exception as e:
+            if conn.in_transaction: conn.execute('ROLLBACK')
+            for g in group: g[2].set_exception(e)
+            return
+        self.commits += 1
+        self.requests += len(group)
+        for future, outcomes, error in results:
+            if error is not None: future.set_exception(error)
+            else: future.set_result(outcomes)
+
+
+WRITER = RegistrationWriter()
+
+
+def import_csv(conn, stream, batch_size=5000, semester_label=None, on_batch=None):
+    """Stream registrations from a CSV with roll_number, course_id[, semester_label]
+    columns, committing every batch_size rows. Returns outcome counts and the first
+    rejected rows (by CSV line)."""
+    reader = csv.DictReader(stream)
+    totals, rejected, batch, lines = {}, [], [], []
+
+    def flush():
+        for line, row, outcome in zip(lines, batch, register_bulk(conn, batch)):
+            totals[outcome] = totals.get(outcome, 0) + 1
+            if outcome not in ACCEPTED and len(rejected) < 100:
+                rejected.append({"line": line, "roll_number": row[0], "course_id": row[1], "outcome": outcome})
+        if on_batch: on_batch(dict(totals))
+        batch.clear(); lines.clear()
+
+    for rec in reader:
+        label = (rec.get('semester_label') or semester_label or '').strip()
+        batch.append(((rec.get('roll_number') or '').strip(), (rec.get('course_id') or '').strip(), label))
+        lines.append(reader.line_num)
+        if len(batch) >= batch_size: flush()
+    if batch: flush()
+    return {"counts": totals, "rejected": rejected}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Import cohort registrations from CSV (roll_number,course_id[,semester_label]).')
+    parser.add_argument('csv_file')
+    parser.add_argument('--db', default=db.DB_PATH)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--semester-label', default=None, help='label for rows without a semester_label column')
+    args = parser.parse_args()
+
+    conn = db.open_raw(args.db)
+    migrations.migrate(conn)
+    with open(args.csv_file, newline='', encoding='utf-8') as f:
+        result = import_csv(conn, f, args.batch_size, args.semester_label,
+                            on_batch=lambda t: print(f"... {sum(t.values())} rows processed", end='\r'))
+    conn.close()
+    print(f"\nImport finished: {result['counts']}")
+    for r in result['rejected']: print(f"   line {r['line']}: {r['roll_number']} / {r['course_id']} -> {r['outcome']}")
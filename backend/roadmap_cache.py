@@ -0,0 +1,78 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+import catalog
+
+# Memoized roadmaps. Cohorts share passed sets, so most generate-path calls
+# plan something already planned. Entries are keyed on a hash of the catalog
+# digest, the passed mask (passed courses plus the current schedule), strategy,
+# start semester and mode; the cache is bounded (LRU) and entries expire after
+# a TTL. catalog.bump_version() clears it.
+
+MAX_ENTRIES = int(os.environ.get('COURSE_ADVISOR_ROADMAP_CACHE_SIZE', '4096'))
+TTL_SECONDS = float(os.environ.get('COURSE_ADVISOR_ROADMAP_CACHE_TTL', '3600'))
+
+
+def make_key(digest, passed_mask, strategy, start_sem, mode='greedy'):
+    # The mask only has bits for catalog courses, so unknown ids don't split entries
+    raw = f"{digest}|{passed_mask:x}|{strategy}|{start_sem}|{mode}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class RoadmapCache:
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        if self.max_entries <= 0: return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            if value is not None: self.put(key, value)
+        return value
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self._entries), "max_entries": self.max_entries, "ttl_seconds": self.ttl,
+                    "hits": self.hits, "misses": self.misses, "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                    "evictions": self.evictions, "expirations": self.expirations}
+
+
+cache = RoadmapCache()
+catalog.ON_CHANGE.append(cache.clear)
@@ -0,0 +1,84 @@
+import gzip
+import json
+import os
+import zlib
+
+# JSON encoding and response compression. orjson is used when installed (it
+# writes bytes directly and is several times faster than the json module);
+# brotli is offered when installed, gzip always. Bodies under
+# MIN_COMPRESS_BYTES go out as they are, since compressing them costs more than
+# it saves.
+
+try: import orjson
+except ImportError: orjson = None
+
+try: import brotli
+except ImportError: brotli = None
+
+MIN_COMPRESS_BYTES = int(os.environ.get('COURSE_ADVISOR_COMPRESS_MIN_BYTES', '1024'))
+COMPRESSIBLE = ('application/json', 'application/x-ndjson', 'text/csv', 'text/plain')
+
+# (dynamic, cached) levels: per-request bodies favour speed, cached ones size
+GZIP_LEVELS = (5, 9)
+BROTLI_QUALITY = (4, 11)
+
+
+def dumps(obj, default=None, sort_keys=False):
+    """obj as UTF-8 JSON bytes (compact separators)."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0))
+    return json.dumps(obj, default=default, sort_keys=sort_keys, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(accept_encoding):
+    """Best encoding the client accepts (brotli first), or None for identity."""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try: q = float(value)
+                except ValueError: q = 0.0
+        if name: accepted[name.strip().lower()] = q
+    for encoding in available_encodings():
+        if accepted.get(encoding, accepted.get('*', 0)) > 0: return encoding
+    return None
+
+
+def compressible(mimetype):
+    return mimetype in COMPRESSIBLE
+
+
+def compress(body, encoding, cached=False):
+    if encoding == 'br': return brotli.compress(body, quality=BROTLI_QUALITY[cached])
+    if encoding == 'gzip': return gzip.compress(body, GZIP_LEVELS[cached], mtime=0)
+    raise ValueError(f'Unsupported encoding {encoding}')
+
+
+def compress_stream(chunks, encoding):
+    """Compress a streamed body chunk by chunk, flushing each so clients can decode as it arrives."""
+    if encoding == 'br':
+        comp = brotli.Compressor(quality=BROTLI_QUALITY[0])
+        process, flush, finish = comp.process, comp.flush, comp.finish
+    else:
+        comp = zlib.compressobj(GZIP_LEVELS[0], zlib.DEFLATED, 31)  # wbits 31: gzip container
+        process, flush, finish = comp.compress, (lambda: comp.flush(zlib.Z_SYNC_FLUSH)), comp.flush
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str): chunk = chunk.encode('utf-8')
+            out = process(chunk) + flush()
+            if out: yield out
+        yield finish()
+    finally:
+        # Closing the wrapper must close the source too (it may hold a pooled connection)
+        if hasattr(chunks, 'close'): chunks.close()
@@ -0,0 +1,204 @@
+import argparse
+import json
+import sys
+import time
+import catalog
+import db
+import migrations
+import planner
+
+# What-if simulation of catalog changes across the whole student body. The
+# catalog is compiled into PlannerIndex arrays (once as stored, once with the
+# proposed diff applied in memory) and every student's passed set is a row of a
+# students x courses boolean matrix, unpacked from the StudentState bitsets.
+# Cohorts are then advanced semester by semester with the greedy planner's
+# rules (credit limit, two electives, min_semester, prerequisites), one course
+# column at a time over all students at once, so projecting 100k students costs
+# courses x semesters vector operations rather than 100k plan_roadmap calls.
+# Nothing is written to the database.
+#
+#   python simulation.py --db university.db --diff '{"min_semester": {"CMPC-5201": 6}}'
+#
+# A diff may hold "min_semester" and "credits" ({course_id: value}) and
+# "add_prereqs" / "remove_prereqs" ([[course_id, prereq_id], ...]).
+
+try: import numpy as np
+except ImportError: np = None
+
+DEFAULT_HORIZON = 2 * planner.MAX_SEMESTER  # project past semester 8, so delays show up as later semesters
+SAMPLE_SIZE = 20
+_CHUNK = 500
+
+
+def apply_diff(snap, diff):
+    """A CatalogSnapshot with diff applied to its courses and prerequisites (raises ValueError on a bad diff)."""
+    if not isinstance(diff, dict): raise ValueError('A diff must be a JSON object')
+    if any(not isinstance(edge, (list, tuple)) or len(edge) != 2 for key in ('add_prereqs', 'remove_prereqs') for edge in diff.get(key) or ()):
+        raise ValueError('Prerequisite edges must be [course_id, prereq_id] pairs')
+    unknown = [c for key in ('min_semester', 'credits') for c in diff.get(key) or {} if c not in snap.courses_map]
+    unknown += [c for key in ('add_prereqs', 'remove_prereqs') for edge in diff.get(key) or () for c in edge
+                if c not in snap.courses_map]
+    if unknown: raise ValueError(f"Unknown course(s): {', '.join(sorted(set(unknown)))}")
+
+    courses = [dict(c) for c in snap.courses]
+    for c in courses:
+        for key in ('min_semester', 'credits'):
+            if c['course_id'] in (diff.get(key) or {}): c[key] = int(diff[key][c['course_id']])
+    removed = {tuple(edge) for edge in diff.get('remove_prereqs') or ()}
+    prereqs = [edge for edge in snap.prereqs if edge not in removed] + [tuple(edge) for edge in diff.get('add_prereqs') or ()]
+    proposed = catalog.CatalogSnapshot(snap.version, courses, snap.schedules, prereqs, snap.course_bits)
+    proposed.graph  # compile now, so a diff that closes a cycle fails here (PrereqCycleError is a ValueError)
+    return proposed
+
+
+def load_students(conn, semester=None):
+    """(roll numbers, start semesters, passed matrix over CourseIndex bits, CourseIndex ids), ordered by start semester."""
+    sql = 'SELECT roll_number, COALESCE(current_semester, 0) + 1, passed FROM StudentState'
+    rows = conn.execute(sql + (' WHERE current_semester = ?' if semester is not None else '') + ' ORDER BY current_semester, roll_number',
+                        () if semester is None else (semester,)).fetchall()
+    course_ids = [r[0] for r in conn.execute('SELECT course_id FROM CourseIndex ORDER BY bit')]
+    bit_of = {c: b for b, c in enumerate(course_ids)}
+    width = (len(course_ids) + 7) // 8
+
+    packed = np.zeros((len(rows), width), dtype=np.uint8)
+    dirty = {}
+    for k, (roll, _, blob) in enumerate(rows):
+        if blob is None: dirty[roll] = k
+        elif blob: packed[k, :len(blob)] = np.frombuffer(blob[:width], dtype=np.uint8)
+    passed = np.unpackbits(packed, axis=1, bitorder='little')[:, :len(course_ids)].astype(bool)
+
+    # Bitsets not rebuilt since the last PassedCourses write are read from PassedCourses (and left dirty)
+    rolls = list(dirty)
+    for k in range(0, len(rolls), _CHUNK):
+        chunk = rolls[k:k + _CHUNK]
+        for roll, course_id in conn.execute(f"SELECT roll_number, course_id FROM PassedCourses WHERE roll_number IN ({','.join('?' * len(chunk))})", chunk):
+            if course_id in bit_of: passed[dirty[roll], bit_of[course_id]] = True
+    return [r[0] for r in rows], np.array([r[1] for r in rows], dtype=np.int64), passed, course_ids
+
+
+def project(snap, passed_bits, course_ids, start, strategy='balanced', horizon=DEFAULT_HORIZON):
+    """Plannable courses each student has passed by the end of every semester 0..horizon (a students x
+    semesters array) when following the greedy plan under snap."""
+    idx = planner.get_index(snap)
+    n, nodes = len(snap.courses), snap.graph.nodes
+    bit_of = {c: b for b, c in enumerate(course_ids)}
+    # Columns follow the snapshot's graph nodes; ids no student has passed get an empty column
+    passed = np.zeros((len(start), len(nodes)), dtype=bool, order='F')
+    for i, c in enumerate(nodes):
+        if c in bit_of: passed[:, i] = passed_bits[:, bit_of[c]]
+
+    plannable = [i for i in range(n) if not idx.excluded_mask >> i & 1]
+    prereq_bits = [np.array(bits, dtype=np.intp) for bits in idx.prereq_bits]
+    credit_limit = planner.credit_limit(strategy)
+    taken = np.zeros((len(start), horizon + 1), dtype=np.int32)
+    initial = passed[:, plannable].sum(axis=1)
+
+    # Students are sorted by start semester, so each cohort is a contiguous slice
+    bounds = np.flatnonzero(np.diff(start)) + 1
+    for lo, hi in zip([0, *bounds], [*bounds, len(start)]):
+        cohort = passed[lo:hi]
+        active = initial[lo:hi] < len(plannable)
+        for sem in range(max(int(start[lo]), 1), horizon + 1):
+            if not active.any(): break
+            open_mask = idx.open_mask[max(0, min(sem, len(idx.open_mask) - 1))]
+            order = sorted((i for i in plannable if open_mask >> i & 1), key=lambda i: idx.score(i, strategy, sem), reverse=True)
+            credits = np.zeros(hi - lo, dtype=np.int64)
+            electives = np.zeros(hi - lo, dtype=np.int64)
+            had_candidate = np.zeros(hi - lo, dtype=bool)
+            took = []
+            for i in order:
+                # Prerequisites count only if passed before this semester (took is applied after the loop)
+                candidate = active & ~cohort[:, i]
+                if prereq_bits[i].size: candidate &= cohort[:, prereq_bits[i]].all(axis=1)
+                if not candidate.any(): continue
+                had_candidate |= candidate
+                fits = candidate & (credits + idx.credits[i] <= credit_limit)
+                if idx.elective[i]:
+                    fits &= electives < planner.ELECTIVES_PER_SEMESTER
+                    electives += fits
+                credits += fits * idx.credits[i]
+                took.append((i, fits))
+            count = taken[lo:hi, sem]
+            for i, fits in took:
+                cohort[:, i] |= fits
+                count += fits
+            # Candidates but nothing fits the credit limit: plan_roadmap stops there
+            active &= ~(had_candidate & (count == 0))
+            active &= initial[lo:hi] + taken[lo:hi, :sem + 1].sum(axis=1) < len(plannable)
+    return initial[:, None] + np.cumsum(taken, axis=1)
+
+
+def _reached(progress, target, start):
+    """First semester (not before start - 1) by whose end progress reaches target, or -1."""
+    semesters = np.arange(progress.shape[1])
+    ok = (progress >= target[:, None]) & (semesters[None, :] >= start[:, None] - 1)
+    return np.where(ok.any(axis=1), ok.argmax(axis=1), -1)
+
+
+def simulate(conn, diff, strategy='balanced', horizon=DEFAULT_HORIZON, semester=None, snap=None):
+    """Project every student (or one current_semester cohort) under the stored catalog and under diff.
+
+    A student's milestone is the number of courses their stored-catalog plan has passed by semester 8
+    (what generate-path shows today); the delay is how many semesters later the proposed catalog gets
+    them there, and students it can't get there by horizon are reported as not reaching it."""
+    if np is None: raise RuntimeError('What-if simulation needs numpy (pip install numpy)')
+    horizon = max(horizon, planner.MAX_SEMESTER)
+    t0 = time.perf_counter()
+    snap = snap or catalog.load_snapshot(conn)
+    proposed = apply_diff(snap, diff or {})
+    rolls, start, passed, course_ids = load_students(conn, semester)
+    t_load = time.perf_counter()
+    before = project(snap, passed, course_ids, start, strategy, horizon)
+    after = project(proposed, passed, course_ids, start, strategy, horizon)
+    t_done = time.perf_counter()
+
+    target = before[:, planner.MAX_SEMESTER]
+    reach_before, reach_after = _reached(before, target, start), _reached(after, target, start)
+    missed = reach_after < 0
+    delay = np.where(missed, 0, reach_after - reach_before)
+    delayed = ~missed & (delay > 0)
+    plannable = sum(1 for c in snap.courses if c['course_id'] not in planner.FYP_COURSES)
+    histogram = dict(zip(*(v.tolist() for v in np.unique(delay[delayed], return_counts=True))))
+    shown = np.flatnonzero(delayed | missed)[:SAMPLE_SIZE]
+    return {
+        "students": len(rolls), "strategy": strategy, "horizon": horizon, "semester": semester,
+        "delayed": int(delayed.sum()),
+        "advanced": int((~missed & (delay < 0)).sum()),
+        "not_reached": int(missed.sum()),
+        "mean_delay": round(float(delay[delayed].mean()), 3) if delayed.any() else 0,
+        "max_delay": int(delay.max()) if delay.size else 0,
+        "delay_histogram": {str(d): histogram[d] for d in sorted(histogram)},
+        "completed_catalog": {"baseline": int((before[:, -1] >= plannable).sum()), "proposed": int((after[:, -1] >= plannable).sum())},
+        # Per semester: courses passed across the cohort and students at their milestone, stored vs proposed catalog
+        "progression": [{"semester": s, "baseline_courses": int(before[:, s].sum()), "proposed_courses": int(after[:, s].sum()),
+                         "baseline_at_milestone": int(((reach_before >= 0) & (reach_before <= s)).sum()),
+                         "proposed_at_milestone": int(((reach_after >= 0) & (reach_after <= s)).sum())}
+                        for s in range(1, horizon + 1)],
+        "sample": [{"roll_number": rolls[k], "milestone_courses": int(target[k]), "baseline_semester": int(reach_before[k]),
+                    "proposed_semester": int(reach_after[k]) if reach_after[k] >= 0 else None} for k in shown],
+        "timing_ms": {"load": round((t_load - t0) * 1000, 1), "project": round((t_done - t_load) * 1000, 1)},
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Project how a catalog change delays students, without writing to the database.')
+    parser.add_argument('--db', default=db.DB_PATH)
+    parser.add_argument('--diff', default='{}', help='JSON diff, or @file.json')
+    parser.add_argument('--strategy', default='balanced', choices=('balanced', 'aggressive', 'relaxed'))
+    parser.add_argument('--horizon', type=int, default=DEFAULT_HORIZON)
+    parser.add_argument('--semester', type=int, default=None, help='only students currently in this semester')
+    args = parser.parse_args()
+
+    conn = db.open_raw(args.db)
+    try:
+        if args.diff.startswith('@'):
+            with open(args.diff[1:]) as f: diff = json.load(f)
+        else: diff = json.loads(args.diff)
+        migrations.migrate(conn)
+        report = simulate(conn, diff, args.strategy, args.horizon, args.semester)
+    except (OSError, ValueError, RuntimeError) as e:
+        # A bad diff (unknown course, cycle, malformed JSON) or a missing diff file: same shape as /api/admin/simulate
+        print(json.dumps({"success": False, "message": str(e)}, indent=2))
+        sys.exit(1)
+    finally: conn.close()
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,94 @@
+import argparse
+import db
+import migrations
+
+# Materialized per-student state (migration 8). StudentState holds the profile,
+# the current-semester registration flag and the passed courses as a bitset
+# over CourseIndex, kept current by triggers, so login and planning read one
+# row. PassedCourses writes only mark the bitset dirty (passed = NULL); the
+# next read rebuilds it, and stores it unless passed_version moved meanwhile.
+#
+#   python student_state.py --db university.db   (rebuild every dirty bitset)
+
+PROFILE_COLUMNS = ('roll_number', 'full_name', 'father_name', 'gpa', 'cgpa', 'current_semester')
+_CHUNK = 500
+
+
+def encode(bits):
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+
+def decode(snap, blob, conn=None):
+    """Course ids set in a passed bitset, in id order (as PassedCourses returns them)."""
+    bits, names = int.from_bytes(blob, 'little'), snap.course_bits
+    positions, b = [], 0
+    while bits:
+        if bits & 1: positions.append(b)
+        bits >>= 1; b += 1
+    ids = [names[p] for p in positions if p < len(names)]
+    missing = [p for p in positions if p >= len(names)]
+    if missing:
+        # Bits appended after this snapshot was loaded (a passed id the catalog doesn't know yet)
+        marks = ','.join('?' * len(missing))
+        ids += [r[0] for r in conn.execute(f'SELECT course_id FROM CourseIndex WHERE bit IN ({marks})', missing)]
+    return sorted(ids)
+
+
+def _passed_bits(conn, roll_number):
+    bits = 0
+    for (bit,) in conn.execute('SELECT ci.bit FROM PassedCourses pc JOIN CourseIndex ci ON ci.course_id = pc.course_id '
+                               'WHERE pc.roll_number = ?', (roll_number,)):
+        bits |= 1 << bit
+    return bits
+
+
+def load(conn, roll_number):
+    """The StudentState row as a dict (passed as a bitset blob), rebuilding a dirty bitset; None without a profile."""
+    row = conn.execute('SELECT * FROM StudentState WHERE roll_number = ?', (roll_number,)).fetchone()
+    return None if row is None else ensure_passed(conn, dict(row))
+
+
+def ensure_passed(conn, state):
+    """Fill in a dirty passed bitset from PassedCourses and store it unless passed_version moved meanwhile."""
+    if state['passed'] is None:
+        state['passed'] = encode(_passed_bits(conn, state['roll_number']))
+        # Readers inside a transaction (a batch snapshot) leave the write to the next plain read
+        if not getattr(conn, 'in_transaction', True):
+            conn.execute('UPDATE StudentState SET passed = ? WHERE roll_number = ? AND passed_version = ?',
+                         (state['passed'], state['roll_number'], state['passed_version']))
+            conn.commit()
+    return state
+
+
+def profile(state):
+    """The login profile: StudentProfiles columns plus is_registered."""
+    return {**{c: state[c] for c in PROFILE_COLUMNS}, 'is_registered': bool(state['is_registered'])}
+
+
+def refresh_all(conn):
+    """Rebuild every dirty bitset (after bulk loads); the caller commits. Returns the number of rows written."""
+    versions = dict(conn.execute('SELECT roll_number, passed_version FROM StudentState WHERE passed IS NULL').fetchall())
+    rolls = list(versions)
+    for k in range(0, len(rolls), _CHUNK):
+        chunk = rolls[k:k + _CHUNK]
+        bits = dict.fromkeys(chunk, 0)
+        for roll, bit in conn.execute(f"""
+                SELECT pc.roll_number, ci.bit FROM PassedCourses pc JOIN CourseIndex ci ON ci.course_id = pc.course_id
+                WHERE pc.roll_number IN ({','.join('?' * len(chunk))})""", chunk):
+            bits[roll] |= 1 << bit
+        conn.executemany('UPDATE StudentState SET passed = ? WHERE roll_number = ? AND passed_version = ?',
+                         [(encode(b), roll, versions[roll]) for roll, b in bits.items()])
+    return len(rolls)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rebuild dirty passed-course bitsets in StudentState.')
+    parser.add_argument('--db', default=db.DB_PATH)
+    args = parser.parse_args()
+
+    conn = db.open_raw(args.db)
+    migrations.migrate(conn)
+    n = refresh_all(conn)
+    conn.commit()
+    print(f"Rebuilt {n} student state row(s)")
+    conn.close()
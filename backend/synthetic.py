@@ -0,0 +1,201 @@
+import argparse
+import itertools
+import random
+import sqlite3
+import time
+import migrations
+import student_state
+from planner import ELECTIVE_PREFIXES
+
+# Deterministic synthetic dataset generator for load and capacity testing.
+# Courses are spread over 8 semesters and several programmes with a random
+# prerequisite DAG (edges only point to earlier semesters); every student follows
+# one programme and has passed most of its earlier courses. Rows are streamed
+# into SQLite in batches with bulk-load pragmas, and secondary indexes are built
+# once after the load instead of being maintained row by row. The same goes for
+# the derived tables: the CourseIndex, StudentState and EnrollmentCounts triggers
+# are dropped for the load, the tables are rebuilt with one grouped INSERT ...
+# SELECT each, and the triggers are recreated afterwards.
+
+SEMESTERS = 8
+BATCH = 50000
+CORE_PREFIXES = ('CMPC', 'CSDC', 'MATH', 'URCQ', 'URCE')
+FIRST_NAMES = ["Ali", "Ahmed", "Sara", "Zara", "Bilal", "Hina", "Omar", "Ayesha", "Usman", "Fatima"]
+LAST_NAMES = ["Khan", "Malik", "Raja", "Bhatti", "Sheikh", "Cheema", "Butt", "Qureshi"]
+DAY_PATTERNS = {4: ('Mon', 'Tue', 'Wed', 'Thu'), 3: ('Mon', 'Wed', 'Fri'), 2: ('Tue', 'Thu'), 1: ('Fri',)}
+BULK_PRAGMAS = (
+    'PRAGMA journal_mode=OFF',
+    'PRAGMA synchronous=OFF',
+    'PRAGMA locking_mode=EXCLUSIVE',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-262144',
+    'PRAGMA threads=4',              # parallel sorter for the deferred CREATE INDEX
+)
+DERIVED_TRIGGERS = ('trg_course_index_%', 'trg_student_state_%', 'trg_enrollment_counts_%')
+
+
+def build_catalog(rng, n_courses, n_programmes, elective_share=0.2, prereq_prob=0.6, max_prereqs=3):
+    """Return (courses, prereqs, programme_of) where programme_of[course_id] is None for shared courses."""
+    courses, prereqs, programme_of, by_sem = [], [], {}, {s: [] for s in range(1, SEMESTERS + 1)}
+    for i in range(n_courses):
+        sem = 1 + i * SEMESTERS // n_courses
+        elective = sem >= 5 and rng.random() < elective_share * 2
+        prefix = rng.choice(ELECTIVE_PREFIXES if elective else CORE_PREFIXES)
+        cid = f"{prefix}-{sem}{i:04d}"
+        # A small slice of the catalog is general education shared by every programme
+        programme_of[cid] = None if rng.random() < 0.05 else rng.randrange(n_programmes)
+        courses.append((cid, f"Synthetic Course {i}", rng.choice((1, 2, 3, 3, 3, 4)), rng.randint(1, 5), sem))
+        if sem > 1 and rng.random() < prereq_prob:
+            # Prefer the previous semester within the same programme
+            pool = [c for c in by_sem[sem - 1] if programme_of[c] in (None, programme_of[cid])] or by_sem[sem - 1]
+            earlier = [c for s in range(1, sem - 1) for c in by_sem[s]]
+            picks = set(rng.sample(pool, min(len(pool), rng.randint(1, max_prereqs))))
+            if earlier and rng.random() < 0.3: picks.add(rng.choice(earlier))
+            prereqs.extend((cid, p) for p in sorted(picks))
+        by_sem[sem].append(cid)
+    return courses, prereqs, programme_of
+
+
+def build_schedule(courses):
+    # Same shape as init_system: cohort courses get consecutive hours, wrapping at 1600
+    offset = {s: 0 for s in range(1, SEMESTERS + 1)}
+    for cid, _, credits, _, sem in courses:
+        start = 800 + (offset[sem] % 8) * 100
+        offset[sem] += 1
+        for day in DAY_PATTERNS.get(credits, ('Fri',)):
+            yield (cid, day, start, start + 100)
+
+
+def student_rows(rng, n_students, n_programmes):
+    for i in range(n_students):
+        semester = 1 + i % SEMESTERS
+        batch_year = 25 - ((semester - 1) // 2)
+        batch_code = f"{'F' if semester % 2 else 'S'}{batch_year}"
+        gpa = round(rng.uniform(2.0, 4.0), 2)
+        yield (f"BSCS51{batch_code}R{i // SEMESTERS + 1:06d}",
+               f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+               f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+               gpa, gpa, semester, i % n_programmes)
+
+
+def academic_rows(rng, students, courses, prereqs, programme_of, pass_rate, size=BATCH):
+    """Yield (passed_rows, registration_rows) batches covering every student."""
+    prereq_map = {}
+    for cid, pid in prereqs: prereq_map.setdefault(cid, []).append(pid)
+    labels = {s: f"Semester {s} (Regular)" for s in range(1, SEMESTERS + 1)}
+    plan = {}  # (programme, semester) -> [(course_id, min_semester, prereqs)] in semester order
+    passed_rows, reg_rows, random_ = [], [], rng.random
+    for roll, _, _, _, _, semester, programme in students:
+        key = (programme, semester)
+        if key not in plan:
+            plan[key] = [(c[0], c[4], tuple(prereq_map.get(c[0], ()))) for c in courses
+                         if programme_of[c[0]] in (None, programme) and c[4] <= semester]
+        passed = set()
+        for cid, min_sem, pre in plan[key]:
+            if pre and not passed.issuperset(pre): continue
+            if min_sem < semester:
+                if random_() < pass_rate:
+                    passed.add(cid)
+                    passed_rows.append((roll, cid))
+                    reg_rows.append((roll, cid, labels[min_sem], 'Completed'))
+            else:
+                reg_rows.append((roll, cid, labels[semester], 'Registered'))
+        if len(reg_rows) >= size:
+            yield passed_rows, reg_rows
+            passed_rows, reg_rows = [], []
+    if reg_rows or passed_rows: yield passed_rows, reg_rows
+
+
+def batched(iterable, size=BATCH):
+    it = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk: return
+        yield chunk
+
+
+def rebuild_derived(conn):
+    """Fill CourseIndex, StudentState and EnrollmentCounts from the loaded rows, as the triggers would have."""
+    conn.execute('INSERT INTO CourseIndex (course_id, bit) SELECT course_id, ROW_NUMBER() OVER (ORDER BY rowid) - 1 FROM Courses')
+    conn.execute("""
+    INSERT INTO StudentState (roll_number, full_name, father_name, gpa, cgpa, current_semester, is_registered)
+    SELECT sp.roll_number, sp.full_name, sp.father_name, sp.gpa, sp.cgpa, sp.current_semester, r.roll_number IS NOT NULL
+    FROM StudentProfiles sp LEFT JOIN (
+        SELECT roll_number, semester FROM Registrations WHERE status = 'Registered' GROUP BY roll_number, semester
+    ) r ON r.roll_number = sp.roll_number AND r.semester = sp.current_semester""")
+    # Grouped on the raw columns (the generator writes no NULLs) so it walks idx_registrations_seats instead of sorting
+    conn.execute("""
+    INSERT INTO EnrollmentCounts (course_id, semester_label, status, count)
+    SELECT IFNULL(course_id, ''), IFNULL(semester_label, ''), IFNULL(status, ''), COUNT(*) FROM Registrations
+    GROUP BY course_id, semester_label, status""")
+    # Passed bitsets: PassedCourses is keyed by roll number, so the grouping walks its primary key
+    bits = conn.execute("""
+        SELECT pc.roll_number, group_concat(ci.bit) FROM PassedCourses pc JOIN CourseIndex ci ON ci.course_id = pc.course_id
+        GROUP BY pc.roll_number""")
+    conn.executemany('UPDATE StudentState SET passed = ? WHERE roll_number = ?',
+                     ((student_state.encode(sum(1 << int(b) for b in group.split(','))), roll) for roll, group in bits))
+    conn.execute("UPDATE StudentState SET passed = x'' WHERE passed IS NULL")
+
+
+def generate(path, n_courses=500, n_students=200000, seed=42, n_programmes=None, pass_rate=0.92, log=print):
+    rng = random.Random(seed)
+    n_programmes = n_programmes or max(1, n_courses // 40)
+    t0 = time.perf_counter()
+
+    conn = sqlite3.connect(path, isolation_level=None)
+    for pragma in BULK_PRAGMAS: conn.execute(pragma)
+    migrations.reset(conn)
+    migrations.migrate(conn)
+
+    # Defer secondary indexes and the derived-table triggers: drop them now, recreate after the load
+    indexes = conn.execute("SELECT name, sql FROM sqlite_master WHERE type='index' AND sql IS NOT NULL").fetchall()
+    for name, _ in indexes: conn.execute(f'DROP INDEX "{name}"')
+    triggers = conn.execute(f"SELECT name, sql FROM sqlite_master WHERE type='trigger' AND ({' OR '.join(['name LIKE ?'] * len(DERIVED_TRIGGERS))})",
+                            DERIVED_TRIGGERS).fetchall()
+    for name, _ in triggers: conn.execute(f'DROP TRIGGER "{name}"')
+
+    courses, prereqs, programme_of = build_catalog(rng, n_courses, n_programmes)
+    students = list(student_rows(rng, n_students, n_programmes))
+    counts = {'courses': len(courses), 'prerequisites': len(prereqs), 'students': len(students), 'passed': 0, 'registrations': 0}
+
+    conn.execute('BEGIN')
+    conn.executemany('INSERT INTO Courses (course_id, course_name, credits, difficulty_level, min_semester) VALUES (?,?,?,?,?)', courses)
+    conn.executemany('INSERT INTO Prerequisites (course_id, prereq_id) VALUES (?,?)', prereqs)
+    conn.executemany('INSERT INTO CourseSchedule (course_id, day_of_week, start_time, end_time) VALUES (?,?,?,?)', build_schedule(courses))
+    conn.execute("INSERT INTO Users (username, password, role) VALUES ('admin', 'admin123', 'admin')")
+    for chunk in batched(students):
+        conn.executemany('INSERT INTO Users (username, password, role) VALUES (?, ?, ?)', [(s[0], '1234', 'student') for s in chunk])
+        conn.executemany('INSERT INTO StudentProfiles (roll_number, full_name, father_name, gpa, cgpa, current_semester) VALUES (?,?,?,?,?,?)',
+                         [s[:6] for s in chunk])
+    for passed, regs in academic_rows(rng, students, courses, prereqs, programme_of, pass_rate):
+        conn.executemany('INSERT INTO PassedCourses (roll_number, course_id) VALUES (?, ?)', passed)
+        conn.executemany('INSERT INTO Registrations (roll_number, course_id, semester_label, status) VALUES (?, ?, ?, ?)', regs)
+        counts['passed'] += len(passed); counts['registrations'] += len(regs)
+    conn.execute('COMMIT')
+    t_load = time.perf_counter()
+
+    for _, sql in indexes: conn.execute(sql)
+    conn.execute('BEGIN')
+    rebuild_derived(conn)
+    for _, sql in triggers: conn.execute(sql)
+    conn.execute('COMMIT')
+    conn.execute('PRAGMA analysis_limit=1000')
+    conn.execute('ANALYZE')
+    conn.execute('PRAGMA journal_mode=DELETE')
+    conn.close()
+    t_done = time.perf_counter()
+
+    log(f"Generated {counts} in {t_done - t0:.1f}s (load {t_load - t0:.1f}s, indexes and derived tables {t_done - t_load:.1f}s)")
+    return counts
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a deterministic synthetic university database.')
+    parser.add_argument('--db', required=True, help='output database (existing tables are dropped)')
+    parser.add_argument('--courses', type=int, default=500)
+    parser.add_argument('--students', type=int, default=200000)
+    parser.add_argument('--programmes', type=int, default=None, help='default: one per 40 courses')
+    parser.add_argument('--pass-rate', type=float, default=0.92)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    generate(args.db, args.courses, args.students, args.seed, args.programmes, args.pass_rate)
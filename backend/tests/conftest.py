@@ -0,0 +1,54 @@
+import os
+import shutil
+import sys
+import tempfile
+import pytest
+
+# Backend modules are imported flat (import db, import planner), and importing app
+# migrates COURSE_ADVISOR_DB, so point it at a scratch copy before anything loads.
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DB = os.path.join(BACKEND, '..', 'university.db')
+sys.path.insert(0, BACKEND)
+_scratch = tempfile.mkdtemp(prefix='course_advisor_tests_')
+shutil.copy(BASELINE_DB, os.path.join(_scratch, 'university.db'))
+os.environ['COURSE_ADVISOR_DB'] = os.path.join(_scratch, 'university.db')
+
+import db
+import migrations
+import synthetic
+
+
+@pytest.fixture
+def university_db(tmp_path):
+    """A migrated copy of the committed university.db."""
+    path = str(tmp_path / 'university.db')
+    shutil.copy(BASELINE_DB, path)
+    conn = db.open_raw(path)
+    migrations.migrate(conn)
+    conn.close()
+    return path
+
+
+@pytest.fixture(scope='session')
+def synthetic_db(tmp_path_factory):
+    """A small generated database (60 courses, 400 students); copy it before writing to it."""
+    path = str(tmp_path_factory.mktemp('synthetic') / 'synthetic.db')
+    synthetic.generate(path, n_courses=60, n_students=400, seed=7, log=lambda *_: None)
+    return path
+
+
+@pytest.fixture
+def synthetic_copy(synthetic_db, tmp_path):
+    path = str(tmp_path / 'synthetic.db')
+    shutil.copy(synthetic_db, path)
+    return path
+
+
+@pytest.fixture
+def conn_of():
+    opened = []
+    def connect(path):
+        opened.append(db.open_raw(path))
+        return opened[-1]
+    yield connect
+    for conn in opened: conn.close()
@@ -0,0 +1,56 @@
+import analytics
+import registrations
+
+
+def recount(conn):
+    return [tuple(r) for r in conn.execute("""
+        SELECT IFNULL(course_id, ''), IFNULL(semester_label, ''), IFNULL(status, ''), COUNT(*)
+        FROM Registrations GROUP BY 1, 2, 3 ORDER BY 1, 2, 3""")]
+
+
+def stored(conn):
+    return [tuple(r) for r in conn.execute('SELECT course_id, semester_label, status, count FROM EnrollmentCounts ORDER BY 1, 2, 3')]
+
+
+def _set_capacity(conn, course_id, capacity):
+    conn.execute('BEGIN')
+    conn.execute('UPDATE Courses SET capacity = ? WHERE course_id = ?', (capacity, course_id))
+    conn.execute('COMMIT')
+
+
+def test_counts_match_a_recount_after_writes(synthetic_copy, conn_of):
+    conn = conn_of(synthetic_copy)
+    assert stored(conn) == recount(conn)
+    students = [r[0] for r in conn.execute('SELECT roll_number FROM StudentProfiles ORDER BY roll_number LIMIT 30')]
+    course, label = conn.execute('SELECT course_id FROM Courses ORDER BY course_id LIMIT 1').fetchone()[0], 'Test Term'
+
+    # 30 requests for 10 seats: the rest are waitlisted, and the counter never oversells
+    _set_capacity(conn, course, 10)
+    outcomes = registrations.register_bulk(conn, [(s, course, label) for s in students])
+    assert outcomes.count('registered') == 10 and outcomes.count('waitlisted') == 20
+    assert registrations.taken(conn, course, label) == 10
+    assert stored(conn) == recount(conn)
+
+    _set_capacity(conn, course, 25)
+    assert registrations.promote_waitlist(conn, course) == 15
+    assert registrations.taken(conn, course, label) == 25
+    assert stored(conn) == recount(conn)
+
+    conn.execute('BEGIN')
+    conn.execute('DELETE FROM Registrations WHERE course_id = ? AND semester_label = ? AND roll_number IN (?, ?)', (course, label, *students[:2]))
+    conn.execute("UPDATE Registrations SET status = 'Completed' WHERE course_id = ? AND semester_label = ? AND roll_number = ?", (course, label, students[2]))
+    conn.execute("UPDATE Registrations SET semester_label = 'Other Term' WHERE course_id = ? AND semester_label = ? AND roll_number = ?", (course, label, students[3]))
+    conn.execute('DELETE FROM Registrations WHERE course_id = ? AND semester_label = ? AND status = ?', (course, label, registrations.WAITLISTED))
+    conn.execute('COMMIT')
+    assert stored(conn) == recount(conn)
+    assert not conn.execute('SELECT 1 FROM EnrollmentCounts WHERE count <= 0').fetchone()  # empty counters are removed
+
+
+def test_analytics_totals_follow_the_counters(synthetic_copy, conn_of):
+    conn = conn_of(synthetic_copy)
+    report = analytics.enrollment(conn)
+    assert report['total'] == conn.execute('SELECT COUNT(*) FROM Registrations').fetchone()[0]
+    assert report['by_status'] == {r[0]: r[1] for r in conn.execute('SELECT status, COUNT(*) FROM Registrations GROUP BY status')}
+    label = 'Semester 3 (Regular)'
+    assert analytics.enrollment(conn, label)['total'] == \
+        conn.execute('SELECT COUNT(*) FROM Registrations WHERE semester_label = ?', (label,)).fetchone()[0]
@@ -0,0 +1,12 @@
+import exports
+
+
+def _disposition(filename):
+    return exports.csv_response(filename, ['a'], []).headers['Content-Disposition']
+
+
+def test_user_supplied_filenames_are_quoted():
+    assert _disposition('students.csv') == 'attachment; filename=students.csv'
+    assert _disposition('roster_a"b;c d.csv') == 'attachment; filename="roster_a\\"b;c d.csv"'
+    assert _disposition('plan_x\r\nSet-Cookie: y.csv') == 'attachment; filename="plan_x__Set-Cookie: y.csv"'
+    assert _disposition('plan_é.csv') == "attachment; filename=plan_e.csv; filename*=UTF-8''plan_%C3%A9.csv"
@@ -0,0 +1,47 @@
+import json
+import pytest
+import app
+import listing
+
+LISTINGS = [(app.STUDENTS_LIST, ()), (app.REGISTRATIONS_LIST, ()), (app.COURSE_REGISTRATIONS_LIST, ('CMPC-10001',))]
+
+
+def _plan(conn, sql, params):
+    return ' | '.join(r[3] for r in conn.execute('EXPLAIN QUERY PLAN ' + sql, params))
+
+
+def _course(conn):
+    return conn.execute('SELECT course_id FROM Registrations GROUP BY course_id ORDER BY COUNT(*) DESC LIMIT 1').fetchone()[0]
+
+
+@pytest.mark.parametrize('spec, base', LISTINGS)
+def test_plans_walk_an_index_in_key_order(synthetic_db, conn_of, spec, base):
+    conn = conn_of(synthetic_db)
+    after = ['x'] * len(spec.keys)
+    for filters in [{}, *({name: 1} for name in spec.filters)]:
+        for bound in [None, *spec._after(after)]:
+            sql, params = spec.query(filters, bound, 101, base, as_json=True)
+            plan = _plan(conn, sql, params)
+            assert 'TEMP B-TREE' not in plan, plan
+            assert plan.startswith(('SCAN r', 'SEARCH r', 'SCAN StudentProfiles', 'SEARCH StudentProfiles')), plan
+
+
+@pytest.mark.parametrize('spec, filters', [(app.REGISTRATIONS_LIST, {}), (app.REGISTRATIONS_LIST, {'semester': 3}),
+                                           (app.COURSE_REGISTRATIONS_LIST, {}), (app.STUDENTS_LIST, {'semester': 2})])
+def test_pages_cover_the_full_listing_in_order(synthetic_db, conn_of, spec, filters):
+    conn = conn_of(synthetic_db)
+    base = (_course(conn),) if spec.where else ()
+    sql, params = spec.query(filters, base_params=base, as_json=True)
+    expected = [json.loads(r[0]) for r in conn.execute(sql, params)]
+    got, cursor = [], None
+    while True:
+        body = json.loads(spec.page_json(conn, filters, cursor, 37, base))
+        got += body['items']
+        cursor = body['next_cursor']
+        if cursor is None: break
+    assert got == expected and expected
+
+
+def test_cursor_must_match_the_keys(synthetic_db, conn_of):
+    with pytest.raises(ValueError):
+        app.REGISTRATIONS_LIST.page_json(conn_of(synthetic_db), {}, listing.encode_cursor(['only one']), 10)
@@ -0,0 +1,50 @@
+import shutil
+import migrations
+from conftest import BASELINE_DB
+from test_student_state import assert_state_matches
+
+BASE_TABLES = ('Users', 'StudentProfiles', 'Courses', 'PassedCourses', 'Prerequisites', 'CourseSchedule')
+
+
+def _counts(conn, tables):
+    return {t: conn.execute(f'SELECT COUNT(*) FROM {t}').fetchone()[0] for t in tables}
+
+
+def _schema(conn):
+    return conn.execute("SELECT type, name, tbl_name, sql FROM sqlite_master ORDER BY type, name").fetchall()
+
+
+def test_migrations_apply_to_the_committed_database(tmp_path, conn_of):
+    path = str(tmp_path / 'university.db')
+    shutil.copy(BASELINE_DB, path)
+    conn = conn_of(path)
+    before = _counts(conn, BASE_TABLES)
+    dangling = [tuple(r) for r in conn.execute('PRAGMA foreign_key_check')]  # the committed data has a few already
+    distinct = conn.execute('SELECT COUNT(*) FROM (SELECT DISTINCT roll_number, course_id, semester_label FROM Registrations)').fetchone()[0]
+
+    assert migrations.migrate(conn) == [v for v, _, _ in migrations.MIGRATIONS]
+    assert migrations.current_version(conn) == migrations.latest_version()
+    assert migrations.migrate(conn) == []
+    assert _counts(conn, BASE_TABLES) == before
+    assert _counts(conn, ['Registrations'])['Registrations'] == distinct  # migration 3 drops duplicates
+    assert conn.execute('PRAGMA integrity_check').fetchone()[0] == 'ok'
+    assert [tuple(r) for r in conn.execute('PRAGMA foreign_key_check')] == dangling
+
+    # Backfilled derived tables agree with the base tables
+    assert_state_matches(conn)
+    assert conn.execute('SELECT COUNT(*) FROM CourseIndex').fetchone()[0] == \
+        conn.execute('SELECT COUNT(*) FROM (SELECT course_id FROM Courses UNION SELECT course_id FROM PassedCourses)').fetchone()[0]
+    assert [tuple(r) for r in conn.execute('SELECT * FROM EnrollmentCounts ORDER BY 1, 2, 3')] == \
+        [tuple(r) for r in conn.execute('SELECT course_id, semester_label, status, COUNT(*) FROM Registrations GROUP BY 1, 2, 3 ORDER BY 1, 2, 3')]
+
+
+def test_stepwise_and_one_shot_migrations_agree(tmp_path, conn_of):
+    paths = [str(tmp_path / name) for name in ('stepwise.db', 'one_shot.db')]
+    for path in paths: shutil.copy(BASELINE_DB, path)
+    stepwise, one_shot = conn_of(paths[0]), conn_of(paths[1])
+    for version, _, _ in migrations.MIGRATIONS:
+        assert migrations.migrate(stepwise, version) == [version]
+    migrations.migrate(one_shot)
+    assert _schema(stepwise) == _schema(one_shot)
+    assert [tuple(r) for r in stepwise.execute('SELECT * FROM StudentState ORDER BY roll_number')] == \
+        [tuple(r) for r in one_shot.execute('SELECT * FROM StudentState ORDER BY roll_number')]
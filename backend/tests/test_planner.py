@@ -0,0 +1,69 @@
+import pytest
+import catalog
+import planner
+import student_state
+
+
+def _students(conn, n):
+    snap = catalog.load_snapshot(conn)
+    rows = conn.execute('SELECT roll_number, current_semester FROM StudentState ORDER BY roll_number').fetchall()
+    for row in rows[::max(1, len(rows) // n)][:n]:
+        state = student_state.load(conn, row['roll_number'])
+        passed = planner.get_index(snap).mask_of(student_state.decode(snap, state['passed'], conn))
+        yield snap, passed, (row['current_semester'] or 0) + 1
+
+
+def _check_valid(snap, passed_mask, start_sem, strategy, roadmap):
+    """Every semester respects the credit limit, the elective cap, min_semester and prerequisites passed earlier."""
+    idx = planner.get_index(snap)
+    passed = {idx.courses[i]['course_id'] for i in range(len(idx.courses)) if passed_mask >> i & 1}
+    prereqs = {}
+    for course_id, prereq_id in snap.prereqs: prereqs.setdefault(course_id, set()).add(prereq_id)
+    last = start_sem - 1
+    for sem in roadmap:
+        ids = [c['course_id'] for c in sem['courses']]
+        assert sem['semester'] > last
+        assert sem['total_credits'] == sum(c['credits'] for c in sem['courses']) <= planner.credit_limit(strategy)
+        assert sum(planner.get_course_type(c) == 'Elective' for c in ids) <= planner.ELECTIVES_PER_SEMESTER
+        for c in sem['courses']:
+            assert c['course_id'] not in passed and c['course_id'] not in planner.FYP_COURSES
+            assert (c['min_semester'] or 1) <= sem['semester']
+            assert prereqs.get(c['course_id'], set()) <= passed
+        passed.update(ids)
+        last = sem['semester']
+    return passed
+
+
+@pytest.mark.parametrize('strategy', ['balanced', 'aggressive', 'relaxed'])
+@pytest.mark.parametrize('source', ['university_db', 'synthetic_db'])
+def test_optimal_plan_is_valid_and_no_longer_than_greedy(request, conn_of, source, strategy):
+    conn = conn_of(request.getfixturevalue(source))
+    for snap, passed, start_sem in _students(conn, 12):
+        stats = {}
+        best = planner.search_roadmap(snap, passed, start_sem, strategy, planner.MAX_DEADLINE_MS, stats)
+        covered = _check_valid(snap, passed, start_sem, strategy, best)
+
+        # The greedy plan, as the search uses it for its incumbent
+        greedy = planner.plan_roadmap(snap, passed, start_sem, strategy)
+        greedy_covered = _check_valid(snap, passed, start_sem, strategy, greedy)
+        assert covered >= greedy_covered
+        if greedy_covered == covered:
+            assert planner._last_semester(best, start_sem) <= planner._last_semester(greedy, start_sem)
+        if not stats['unscheduled']: assert stats['semesters'] >= stats['lower_bound']
+        assert all(sem['semester'] <= planner.MAX_SEMESTER for sem in best)
+        idx = planner.get_index(snap)
+        plannable = planner.plannable_mask(idx, passed, planner.credit_limit(strategy))
+        assert set(stats['unscheduled']) == {idx.courses[i]['course_id'] for i in range(len(idx.courses)) if plannable >> i & 1} - covered
+        if stats['exceeds_max_semester']: assert stats['unscheduled'] and not stats['optimal']
+
+
+def test_search_stops_at_max_semester(synthetic_db, conn_of):
+    # A first-semester student cannot finish the whole catalog by semester 8
+    conn = conn_of(synthetic_db)
+    snap = catalog.load_snapshot(conn)
+    stats = {}
+    best = planner.search_roadmap(snap, 0, 1, 'relaxed', planner.MAX_DEADLINE_MS, stats)
+    assert best and best[-1]['semester'] <= planner.MAX_SEMESTER
+    assert stats['exceeds_max_semester'] and stats['unscheduled']
+    scheduled = {c['course_id'] for sem in best for c in sem['courses']}
+    assert not scheduled & set(stats['unscheduled'])
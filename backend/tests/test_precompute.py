@@ -0,0 +1,48 @@
+import time
+import pytest
+import precompute
+
+
+def _job(conn, semester=2):
+    return precompute.create_job(conn, 'balanced', semester)
+
+
+def test_a_job_is_claimed_once_across_connections(synthetic_copy, conn_of):
+    # Two connections stand in for two gunicorn workers
+    first, second = conn_of(synthetic_copy), conn_of(synthetic_copy)
+    job_id = _job(first)
+    assert not precompute.get_job(second, job_id)['running']
+
+    runner = precompute.claim_job(first, job_id)
+    assert runner is not None
+    assert precompute.claim_job(second, job_id) is None
+    assert precompute.get_job(second, job_id)['running']
+    assert not precompute.start_job(job_id, path=synthetic_copy)
+    with pytest.raises(precompute.JobRunning):
+        precompute.run_job(job_id, path=synthetic_copy)
+
+
+def test_a_stale_claim_is_taken_over_and_the_old_runner_loses_it(synthetic_copy, conn_of):
+    conn = conn_of(synthetic_copy)
+    job_id = _job(conn)
+    old = precompute.claim_job(conn, job_id)
+    conn.execute('UPDATE PrecomputeJobs SET heartbeat_at = ? WHERE job_id = ?', (time.time() - precompute.STALE_AFTER_S - 1, job_id))
+    conn.commit()
+    assert not precompute.get_job(conn, job_id)['running']
+
+    new = precompute.claim_job(conn, job_id)
+    assert new not in (None, old)
+    assert not precompute._beat(conn, job_id, old)
+    precompute._set_status(conn, job_id, old, 'completed')
+    assert precompute.get_job(conn, job_id)['status'] == 'running'
+
+
+def test_run_job_plans_every_selected_student(synthetic_copy, conn_of):
+    conn = conn_of(synthetic_copy)
+    job_id = _job(conn)
+    assert precompute.run_job(job_id, workers=1, chunk_size=16, path=synthetic_copy) == 'completed'
+    job = precompute.get_job(conn, job_id)
+    assert job['done'] == job['total'] > 0 and not job['running']
+    assert conn.execute('SELECT COUNT(*) FROM PlannedRoadmaps WHERE job_id = ?', (job_id,)).fetchone()[0] == job['total']
+    # Resuming a finished job claims it again and completes straight away
+    assert precompute.run_job(job_id, workers=1, path=synthetic_copy) == 'completed'
@@ -0,0 +1,46 @@
+import sqlite3
+import threading
+import pytest
+import registrations
+
+
+def _row(conn):
+    roll = conn.execute('SELECT roll_number FROM StudentProfiles ORDER BY roll_number').fetchone()[0]
+    course = conn.execute('SELECT course_id FROM Courses ORDER BY course_id').fetchone()[0]
+    return roll, course, 'Test Term'
+
+
+def test_writer_survives_a_database_it_cannot_open(tmp_path, synthetic_copy, conn_of):
+    writer = registrations.RegistrationWriter(path=str(tmp_path / 'missing' / 'university.db'))
+    with pytest.raises(sqlite3.OperationalError):
+        writer.register([('x', 'y', 'z')], timeout=5)
+
+    # The same thread picks up the next group
+    thread = writer._thread
+    writer.path = synthetic_copy
+    assert writer.register([_row(conn_of(synthetic_copy))], timeout=5) == ['registered']
+    assert writer._thread is thread
+
+
+def test_a_stuck_group_times_out_instead_of_hanging(synthetic_copy, conn_of, monkeypatch):
+    writer = registrations.RegistrationWriter(path=synthetic_copy)
+    release = threading.Event()
+    commit = writer._commit
+    monkeypatch.setattr(writer, '_commit', lambda conn, group: (release.wait(10), commit(conn, group)))
+    try:
+        with pytest.raises(registrations.WriterBusy):
+            writer.register([_row(conn_of(synthetic_copy))], timeout=0.2)
+    finally: release.set()
+
+
+
+def test_resubmitting_reports_the_existing_status(synthetic_copy, conn_of):
+    conn = conn_of(synthetic_copy)
+    roll, course, label = _row(conn)
+    other = conn.execute('SELECT roll_number FROM StudentProfiles ORDER BY roll_number LIMIT 1 OFFSET 1').fetchone()[0]
+    conn.execute('BEGIN')
+    conn.execute('UPDATE Courses SET capacity = 1 WHERE course_id = ?', (course,))
+    conn.execute('COMMIT')
+    assert registrations.register_bulk(conn, [(roll, course, label), (other, course, label)]) == ['registered', 'waitlisted']
+    assert registrations.register_bulk(conn, [(other, course, label), (roll, course, label), (roll, course, label)]) == \
+        ['already_waitlisted', 'already_registered', 'already_registered']
@@ -0,0 +1,40 @@
+import pytest
+import catalog
+import planner
+import simulation
+
+
+def _expected(snap, passed_ids, start, strategy, horizon):
+    """Plannable courses passed by the end of every semester 0..horizon, from plan_roadmap for one student."""
+    idx = planner.get_index(snap)
+    plannable = {c['course_id'] for c in snap.courses if c['course_id'] not in planner.FYP_COURSES}
+    progress = [len(plannable & set(passed_ids))] * (horizon + 1)
+    for sem in planner.plan_roadmap(snap, idx.mask_of(passed_ids), start, strategy, max_semester=horizon):
+        for s in range(sem['semester'], horizon + 1): progress[s] += len(sem['courses'])
+    return progress
+
+
+def _diff(snap):
+    # Push a course with dependents later and drop one prerequisite edge
+    depended = sorted({p for _, p in snap.prereqs if p in snap.courses_map})
+    return {'min_semester': {depended[0]: 6}, 'remove_prereqs': [list(snap.prereqs[-1])]}
+
+
+@pytest.mark.parametrize('strategy', ['balanced', 'relaxed'])
+@pytest.mark.parametrize('with_diff', [False, True])
+def test_projection_matches_plan_roadmap(synthetic_db, conn_of, strategy, with_diff):
+    conn = conn_of(synthetic_db)
+    snap = catalog.load_snapshot(conn)
+    if with_diff: snap = simulation.apply_diff(snap, _diff(snap))
+    rolls, start, passed, course_ids = simulation.load_students(conn)
+    horizon = simulation.DEFAULT_HORIZON
+    progress = simulation.project(snap, passed, course_ids, start, strategy, horizon)
+
+    for k in range(0, len(rolls), 7):
+        passed_ids = [course_ids[b] for b in passed[k].nonzero()[0]]
+        assert progress[k].tolist() == _expected(snap, passed_ids, int(start[k]), strategy, horizon), rolls[k]
+
+
+def test_unknown_course_in_diff_is_rejected(synthetic_db, conn_of):
+    with pytest.raises(ValueError):
+        simulation.simulate(conn_of(synthetic_db), {'min_semester': {'NOPE-0000': 3}})
@@ -0,0 +1,75 @@
+import pytest
+import catalog
+import registrations
+import student_state
+
+PROFILE = 'roll_number, full_name, father_name, gpa, cgpa, current_semester'
+
+
+def recount(conn):
+    """StudentState as the triggers should have left it, recomputed from the base tables."""
+    return [tuple(r) for r in conn.execute(f"""
+        SELECT {PROFILE}, EXISTS (SELECT 1 FROM Registrations r WHERE r.roll_number = sp.roll_number
+                                  AND r.semester = sp.current_semester AND r.status = 'Registered')
+        FROM StudentProfiles sp ORDER BY roll_number""")]
+
+
+def stored(conn):
+    return [tuple(r) for r in conn.execute(f'SELECT {PROFILE}, is_registered FROM StudentState ORDER BY roll_number')]
+
+
+def assert_state_matches(conn):
+    assert stored(conn) == recount(conn)
+    snap = catalog.load_snapshot(conn)
+    for (roll,) in conn.execute('SELECT roll_number FROM StudentProfiles').fetchall():
+        passed = [r[0] for r in conn.execute('SELECT course_id FROM PassedCourses WHERE roll_number = ? ORDER BY course_id', (roll,))]
+        assert student_state.decode(snap, student_state.load(conn, roll)['passed'], conn) == passed
+
+
+def _current_term(conn, k):
+    """k students with their current-semester label and a course they are not registered for in it."""
+    out = []
+    for roll, sem in conn.execute('SELECT roll_number, current_semester FROM StudentProfiles ORDER BY roll_number').fetchall():
+        label = f'Semester {sem} (Regular)'
+        course = conn.execute("""SELECT course_id FROM Courses WHERE course_id NOT IN (
+                                     SELECT course_id FROM Registrations WHERE roll_number = ? AND semester_label = ?)
+                                 ORDER BY course_id LIMIT 1""", (roll, label)).fetchone()
+        if course: out.append((roll, course[0], label))
+        if len(out) == k: break
+    return out
+
+
+@pytest.mark.parametrize('source', ['university_db', 'synthetic_copy'])
+def test_state_matches_a_recount_after_writes(request, conn_of, source):
+    conn = conn_of(request.getfixturevalue(source))
+    assert_state_matches(conn)
+    rows = _current_term(conn, 6)
+    course = rows[0][1]
+
+    # Clear the students' current-term registrations so the flag has to be set by the writes below
+    conn.execute('BEGIN')
+    conn.executemany('DELETE FROM Registrations WHERE roll_number = ? AND semester_label = ?', [(r[0], r[2]) for r in rows])
+    conn.execute('UPDATE Courses SET capacity = 0 WHERE course_id = ?', (course,))
+    conn.execute('COMMIT')
+    assert_state_matches(conn)
+
+    # A full course waitlists: those students are not registered yet
+    outcomes = registrations.register_bulk(conn, [(r[0], course, r[2]) for r in rows])
+    assert set(outcomes) == {'waitlisted'}
+    assert_state_matches(conn)
+
+    conn.execute('BEGIN')
+    conn.execute('UPDATE Courses SET capacity = NULL WHERE course_id = ?', (course,))
+    conn.execute('COMMIT')
+    assert registrations.promote_waitlist(conn, course) == len(rows)
+    assert_state_matches(conn)
+
+    assert set(registrations.register_bulk(conn, rows)) <= {'registered', 'already_registered'}
+    conn.execute('BEGIN')
+    conn.execute('DELETE FROM Registrations WHERE roll_number = ? AND semester_label = ?', (rows[0][0], rows[0][2]))
+    conn.execute("UPDATE Registrations SET status = 'Waitlisted' WHERE roll_number = ? AND semester_label = ?", (rows[1][0], rows[1][2]))
+    conn.execute('UPDATE StudentProfiles SET current_semester = current_semester + 1 WHERE roll_number = ?', (rows[2][0],))
+    conn.execute('INSERT OR IGNORE INTO PassedCourses (roll_number, course_id) VALUES (?, ?)', (rows[3][0], rows[3][1]))
+    conn.execute('DELETE FROM PassedCourses WHERE roll_number = ?', (rows[4][0],))
+    conn.execute('COMMIT')
+    assert_state_matches(conn)
@@ -0,0 +1,317 @@
+import argparse
+import itertools
+import random
+import time
+import catalog
+import db
+import migrations
+
+# Timetable solver for CourseSchedule. Every course meets once per credit hour,
+# one hour a day on distinct weekdays, at the same start time each day (the
+# shape init_system always produced). Courses are nodes of a weighted conflict
+# graph: courses of the same cohort (min_semester) get COHORT_WEIGHT, pairs that
+# students are registered for together this term get STUDENT_WEIGHT per shared
+# student, so real clashes outrank cohort ones when not everything fits. A
+# placement costs the weight of every neighbour it shares an hour with, so a
+# cost of zero is a clash-free timetable.
+#
+# solve() starts from the current schedule, places unscheduled courses greedily
+# (heaviest-constrained first) and then runs a min-conflicts local search with a
+# tabu list until it is clash-free or out of time. With only some courses marked
+# movable it re-solves incrementally around the rest; a full re-solve is only
+# written back if evaluate() scores it strictly better than what is stored.
+#
+#   python timetable.py --db university.db --rooms 6
+#   python timetable.py --course CMPC-5205 --course CMPC-5209   (incremental)
+
+DAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri')
+FIRST_HOUR, LAST_HOUR = 800, 1600           # meetings start on the hour, ending by LAST_HOUR
+HOURS = tuple(range(FIRST_HOUR, LAST_HOUR, 100))
+PREFERRED_DAYS = {4: ('Mon', 'Tue', 'Wed', 'Thu'), 3: ('Mon', 'Wed', 'Fri'), 2: ('Tue', 'Thu'), 1: ('Fri',)}
+COHORT_WEIGHT = 1
+STUDENT_WEIGHT = 10
+ROOM_PENALTY = 1000                          # per slot over the room limit
+TABU_TENURE = 7
+
+
+def slot_of(day, hour):
+    return DAYS.index(day) * len(HOURS) + HOURS.index(hour)
+
+
+def slot_label(slot):
+    day, hour = divmod(slot, len(HOURS))
+    return DAYS[day], HOURS[hour], HOURS[hour] + 100
+
+
+def slots_from_rows(rows):
+    """Slots covered by CourseSchedule-style (day, start, end) rows; hours are rounded outwards."""
+    out = set()
+    for day, start, end in rows:
+        if day not in DAYS: continue
+        for hour in HOURS:
+            if hour < end and hour + 100 > start: out.add(slot_of(day, hour))
+    return tuple(sorted(out))
+
+
+class Problem:
+    def __init__(self, courses, edges, rooms=None, shared=()):
+        """courses: [(course_id, credits, min_semester)]; edges: {(a, b): weight} with a < b;
+        shared: the pairs that registered students take together."""
+        self.ids = [c[0] for c in courses]
+        self.index = {cid: i for i, cid in enumerate(self.ids)}
+        self.credits = [max(1, min(len(DAYS), c[1] or 1)) for c in courses]
+        self.cohort = [c[2] for c in courses]
+        self.rooms = rooms
+        self.neighbours = [[] for _ in courses]  # i -> [(j, weight)]
+        for (a, b), w in edges.items():
+            if a in self.index and b in self.index and w > 0:
+                i, j = self.index[a], self.index[b]
+                self.neighbours[i].append((j, w))
+                self.neighbours[j].append((i, w))
+        self.shared = {tuple(sorted((self.index[a], self.index[b]))) for a, b in shared if a in self.index and b in self.index}
+        self.options = [self._options(i) for i in range(len(courses))]
+
+    def _options(self, i):
+        """(slots, soft cost) for every day pattern and start hour; soft costs stay below one clash."""
+        k, sem = self.credits[i], self.cohort[i] or 0
+        preferred = PREFERRED_DAYS.get(k)
+        base = FIRST_HOUR if sem % 2 else 1200   # odd cohorts in the morning, even ones after noon, as before
+        out = []
+        for days in itertools.combinations(DAYS, k):
+            for hour in HOURS:
+                soft = (0 if days == preferred else 0.1) + abs(hour - base) / 100 * 0.01
+                out.append((tuple(sorted(slot_of(d, hour) for d in days)), soft))
+        out.sort(key=lambda o: o[1])
+        return out
+
+
+def cohort_edges(courses, weight=COHORT_WEIGHT):
+    by_sem = {}
+    for cid, _, sem in courses: by_sem.setdefault(sem, []).append(cid)
+    edges = {}
+    for ids in by_sem.values():
+        for a, b in itertools.combinations(sorted(ids), 2): edges[a, b] = weight
+    return edges
+
+
+def load_problem(conn, rooms=None, cohort_weight=COHORT_WEIGHT):
+    courses = [(r[0], r[1], r[2]) for r in conn.execute('SELECT course_id, credits, min_semester FROM Courses ORDER BY course_id')]
+    edges, shared = cohort_edges(courses, cohort_weight), set()
+    # Students registered for both courses this term must be able to attend both. Only current-term rows
+    # (the student's current_semester, as StudentState.is_registered counts them) are paired; past terms don't sit this timetable
+    for a, b, n in conn.execute("""
+            WITH term AS (
+                SELECT r.roll_number, r.course_id FROM StudentState s
+                JOIN Registrations r ON r.roll_number = s.roll_number AND r.semester = s.current_semester
+                WHERE s.is_registered AND r.status = 'Registered')
+            SELECT a.course_id, b.course_id, COUNT(*)
+            FROM term a JOIN term b ON b.roll_number = a.roll_number AND b.course_id > a.course_id
+            GROUP BY a.course_id, b.course_id"""):
+        edges[a, b] = edges.get((a, b), 0) + STUDENT_WEIGHT * n
+        shared.add((a, b))
+    current = {}
+    for r in conn.execute('SELECT course_id, day_of_week, start_time, end_time FROM CourseSchedule'):
+        current.setdefault(r[0], []).append((r[1], r[2], r[3]))
+    return Problem(courses, edges, rooms, shared), {cid: slots_from_rows(rows) for cid, rows in current.items()}
+
+
+class _State:
+    def __init__(self, problem):
+        self.p = problem
+        n_slots = len(DAYS) * len(HOURS)
+        self.assign = [None] * len(problem.ids)
+        self.pressure = [[0] * n_slots for _ in problem.ids]   # i -> slot -> weight of neighbours there
+        self.usage = [0] * n_slots
+        self.occupants = [set() for _ in range(n_slots)]
+
+    def place(self, i, slots, sign=1):
+        for j, w in self.p.neighbours[i]:
+            row = self.pressure[j]
+            for s in slots: row[s] += sign * w
+        for s in slots:
+            self.usage[s] += sign
+            if sign > 0: self.occupants[s].add(i)
+            else: self.occupants[s].discard(i)
+
+    def move(self, i, slots):
+        if self.assign[i] is not None: self.place(i, self.assign[i], -1)
+        self.assign[i] = slots
+        if slots is not None: self.place(i, slots)
+
+    def clash(self, i, slots):
+        row = self.pressure[i]
+        return sum(row[s] for s in slots)
+
+    def cost(self, i, option):
+        slots, soft = option
+        cost = self.clash(i, slots) + soft
+        if self.p.rooms is not None:
+            own = self.assign[i] or ()
+            cost += ROOM_PENALTY * sum(1 for s in slots if self.usage[s] - (s in own) >= self.p.rooms)
+        return cost
+
+    def violation(self, i):
+        """Clash weight plus room penalty of course i where it currently sits."""
+        return self.cost(i, (self.assign[i], 0))
+
+    def overflow(self):
+        return 0 if self.p.rooms is None else sum(max(0, n - self.p.rooms) for n in self.usage)
+
+    def best_option(self, i, tabu=None, it=0, current_cost=None):
+        best, best_cost = None, None
+        for option in self.p.options[i]:
+            c = self.cost(i, option)
+            if tabu and tabu.get((i, option[0]), -1) > it and not (current_cost is not None and c < current_cost): continue
+            if best is None or c < best_cost: best, best_cost = option, c
+            if c == 0: break
+        return best, best_cost
+
+
+def solve(problem, current=None, movable=None, time_limit=5.0, seed=42):
+    """Assign every course a tuple of slots. Returns (assignment {course_id: slots}, stats).
+
+    current: existing {course_id: slots}; courses outside movable keep theirs
+    (movable=None re-solves everything, courses without a schedule are always placed).
+    A full re-solve starts the search from the current slots rather than from scratch.
+    """
+    started = time.monotonic()
+    rng = random.Random(seed)
+    state = _State(problem)
+    current = current or {}
+    free = set(range(len(problem.ids))) if movable is None else \
+        {problem.index[c] for c in movable if c in problem.index} | {i for i, c in enumerate(problem.ids) if not current.get(c)}
+    for i, cid in enumerate(problem.ids):
+        if (i not in free or movable is None) and current.get(cid): state.move(i, current[cid])
+
+    # Greedy: most constrained (total edge weight, then meetings) first
+    order = sorted((i for i in free if state.assign[i] is None),
+                   key=lambda i: (-sum(w for _, w in problem.neighbours[i]), -problem.credits[i], problem.ids[i]))
+    for i in order:
+        state.move(i, state.best_option(i)[0][0])
+
+    # Min-conflicts local search over the movable courses that still clash
+    deadline, it, moves = started + time_limit, 0, 0
+    tabu = {}
+    conflicted = {i for i in free if state.violation(i)}
+    clashes = sum(state.clash(i, a) for i, a in enumerate(state.assign) if a)  # every clash counted from both ends
+    best_total, best = clashes + 2 * ROOM_PENALTY * state.overflow(), list(state.assign)
+    while conflicted and time.monotonic() < deadline:
+        it += 1
+        i = rng.choice(tuple(conflicted))
+        old = state.assign[i]
+        option, _ = state.best_option(i, tabu, it, state.violation(i))
+        if option is None or option[0] == old:
+            # Stuck: jump to a random option to escape the local minimum
+            option = rng.choice(problem.options[i])
+        tabu[i, old] = it + TABU_TENURE + rng.randrange(3)
+        before = state.clash(i, old)
+        state.move(i, option[0])
+        clashes += 2 * (state.clash(i, option[0]) - before)
+        moves += 1
+        touched = {i, *(j for j, _ in problem.neighbours[i])}
+        if problem.rooms is not None:
+            for s in (*old, *option[0]): touched |= state.occupants[s]
+        for j in touched:
+            if j in free and state.violation(j): conflicted.add(j)
+            else: conflicted.discard(j)
+        total = clashes + 2 * ROOM_PENALTY * state.overflow()
+        if total < best_total:
+            best_total, best = total, list(state.assign)
+
+    # The search keeps walking after plateaus; report the best timetable it visited
+    assignment = {cid: best[i] for i, cid in enumerate(problem.ids)}
+    return assignment, evaluate(problem, assignment, {
+        'courses': len(problem.ids), 'movable': len(free), 'local_search_moves': moves,
+        'elapsed_ms': round((time.monotonic() - started) * 1000, 1)})
+
+
+def evaluate(problem, assignment, stats=None):
+    """Clash statistics for an assignment: weighted clash hours, clashing pairs, student clashes, room overflow."""
+    stats = dict(stats or {})
+    clash_weight, pairs, student_pairs = 0, 0, 0
+    for i, cid in enumerate(problem.ids):
+        mine = set(assignment.get(cid) or ())
+        for j, w in problem.neighbours[i]:
+            if j < i: continue
+            shared = len(mine.intersection(assignment.get(problem.ids[j]) or ()))
+            if shared:
+                clash_weight += w * shared
+                pairs += 1
+                if (min(i, j), max(i, j)) in problem.shared: student_pairs += 1
+    usage = {}
+    for slots in assignment.values():
+        for s in slots or (): usage[s] = usage.get(s, 0) + 1
+    overflow = sum(max(0, n - problem.rooms) for n in usage.values()) if problem.rooms is not None else 0
+    stats.update({'clash_weight': clash_weight, 'clashing_pairs': pairs, 'student_clash_pairs': student_pairs,
+                  'room_overflow': overflow, 'clash_free': pairs == 0 and overflow == 0})
+    return stats
+
+
+def schedule_rows(assignment, course_ids=None):
+    """CourseSchedule rows (course_id, day, start, end), one per meeting."""
+    ids = assignment if course_ids is None else course_ids
+    return [(cid, *slot_label(s)) for cid in ids for s in assignment.get(cid) or ()]
+
+
+def write_schedule(conn, assignment, course_ids=None):
+    """Replace CourseSchedule for course_ids (default: every course) inside one transaction."""
+    ids = list(assignment) if course_ids is None else list(course_ids)
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        if course_ids is None: conn.execute('DELETE FROM CourseSchedule')
+        else:
+            for k in range(0, len(ids), 500):
+                chunk = ids[k:k + 500]
+                conn.execute(f"DELETE FROM CourseSchedule WHERE course_id IN ({','.join('?' * len(chunk))})", chunk)
+        conn.executemany('INSERT INTO CourseSchedule (course_id, day_of_week, start_time, end_time) VALUES (?,?,?,?)',
+                         schedule_rows(assignment, ids))
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def _score(stats):
+    """Lower is better: room overflow first, then weighted clash hours."""
+    return stats['room_overflow'], stats['clash_weight']
+
+
+def resolve(conn, courses=None, rooms=None, time_limit=5.0, write=True, seed=42):
+    """Load, solve and (unless write is False) store. courses: ids to re-place incrementally, None for all."""
+    problem, current = load_problem(conn, rooms)
+    assignment, stats = solve(problem, current, courses, time_limit, seed)
+    if courses is not None and not stats['clash_free']:
+        # The rest of the timetable boxes the changed courses in: let their neighbours move as well
+        widened = set(courses)
+        for cid in courses:
+            if cid in problem.index: widened.update(problem.ids[j] for j, _ in problem.neighbours[problem.index[cid]])
+        assignment, stats = solve(problem, current, widened, time_limit, seed)
+    if courses is None and all(current.get(cid) for cid in problem.ids) and \
+            not _score(stats) < _score(evaluate(problem, current)):
+        # Nothing to place and no better than the stored timetable: keep it rather than reshuffle it
+        assignment, stats = current, evaluate(problem, current, {**stats, 'kept_current': True})
+    changed = [cid for cid in problem.ids if tuple(assignment.get(cid) or ()) != tuple(current.get(cid) or ())]
+    stats['changed_courses'] = changed
+    if write and changed:
+        write_schedule(conn, assignment, None if courses is None else changed)
+        catalog.bump_version()
+    return assignment, stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a clash-free CourseSchedule.')
+    parser.add_argument('--db', default=db.DB_PATH)
+    parser.add_argument('--rooms', type=int, default=None, help='parallel sections per hour (default: unlimited)')
+    parser.add_argument('--time-limit', type=float, default=5.0, help='seconds of local search')
+    parser.add_argument('--course', action='append', default=None, help='re-place only this course (repeatable)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--dry-run', action='store_true', help='report without writing CourseSchedule')
+    args = parser.parse_args()
+
+    conn = db.open_raw(args.db)
+    migrations.migrate(conn)
+    _, stats = resolve(conn, args.course, args.rooms, args.time_limit, not args.dry_run, args.seed)
+    conn.close()
+    changed = stats.pop('changed_courses')
+    print(f"{'Clash-free' if stats['clash_free'] else 'Best found'}: {stats}")
+    print(f"{len(changed)} course(s) {'would change' if args.dry_run else 'rescheduled'}")
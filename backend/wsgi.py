@@ -0,0 +1,13 @@
+import db
+from app import app, warm_up
+
+# WSGI entry point for production servers:
+#   gunicorn -c gunicorn.conf.py wsgi:application
+#   waitress-serve --port=5000 wsgi:application
+# With gunicorn's preload_app the warm-up runs once in the master and the
+# catalog snapshot and compiled planner index are inherited by every worker.
+
+warm_up()
+db.reset_pool()  # SQLite connections must not cross a fork; workers open their own
+
+application = app
@@ -3,8 +3,51 @@ import time
 import platform
 import os
 import sys
+import argparse
+import importlib.util
+import urllib.request
+
+BACKEND_URL = "http://127.0.0.1:5000"
+
+def backend_command(system, prod, workers, threads):
+    """(command, environment) that serve the Flask app from inside backend/; the launcher's own environment is left alone."""
+    python = "py" if system == "Windows" else f'"{sys.executable}"'
+    env = dict(os.environ)
+    if not prod:
+        return f"{python} app.py", env
+    env["COURSE_ADVISOR_THREADS"] = str(threads)
+    if workers: env["COURSE_ADVISOR_WORKERS"] = str(workers)
+    if system != "Windows" and importlib.util.find_spec("gunicorn"):
+        return f"{python} -m gunicorn -c gunicorn.conf.py wsgi:application", env
+    if importlib.util.find_spec("waitress"):
+        # waitress is single-process; scale with threads instead
+        return f"{python} -m waitress --listen=127.0.0.1:5000 --threads={threads * (workers or 1)} wsgi:application", env
+    print("   ⚠️  Neither gunicorn nor waitress is installed (pip install -r requirements.txt).")
+    print("      Falling back to the development server.")
+    return f"{python} app.py", env
+
+def wait_until_ready(process, timeout):
+    """Poll /readyz until the backend answers 200. False on timeout or if the server exits."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(f"{BACKEND_URL}/readyz", timeout=1) as resp:
+                if resp.status == 200: return True
+        except OSError:
+            pass
+        time.sleep(0.1)
+    return False
 
 def start_project():
+    parser = argparse.ArgumentParser(description="Launch the CoursePath Advisor backend and frontend.")
+    parser.add_argument("--reinit-db", action="store_true", help="rebuild university.db from scratch")
+    parser.add_argument("--prod", action="store_true", help="serve the backend with gunicorn (waitress on Windows)")
+    parser.add_argument("--workers", type=int, default=None, help="backend worker processes (--prod; default 1, metrics and caches are per process)")
+    parser.add_argument("--threads", type=int, default=8, help="threads per worker (--prod)")
+    parser.add_argument("--ready-timeout", type=float, default=60, help="seconds to wait for /readyz")
+    args = parser.parse_args()
     system = platform.system()
     
     print("=================================================")
@@ -14,8 +57,8 @@ def start_project():
     db_path = 'university.db'
     
     # 1. Initialize Database if it doesn't exist or if --reinit-db is passed
-    if not os.path.exists(db_path) or "--reinit-db" in sys.argv:
-        if "--reinit-db" in sys.argv:
+    if not os.path.exists(db_path) or args.reinit_db:
+        if args.reinit_db:
             print("\n[Step 1/3] Force re-initializing database...")
         else:
             print("\n[Step 1/3] Database not found. Initializing...")
@@ -32,15 +75,23 @@ def start_project():
         print("   (To re-initialize, run: python run.py --reinit-db)")
 
     print("\n[Step 2/3] Launching Backend Server...")
+    command, env = backend_command(system, args.prod, args.workers, args.threads)
+    print(f"   {command}")
     if system == "Windows":
         # Windows: Start in new CMD window
-        subprocess.Popen('start "Flask Backend" cmd /k "cd backend && py app.py"', shell=True)
+        subprocess.Popen(f'start "Flask Backend" cmd /k "cd backend && {command}"', shell=True, env=env)
+        backend = None
     else:
         # Linux/Mac: Start in background
-        subprocess.Popen("cd backend && python3 app.py", shell=True)
+        backend = subprocess.Popen(command, shell=True, cwd="backend", env=env)
     
-    print("   Waiting for backend to warm up...")
-    time.sleep(5) 
+    print("   Waiting for backend to report ready...")
+    started = time.monotonic()
+    if not wait_until_ready(backend, args.ready_timeout):
+        print(f"❌ Backend did not become ready within {args.ready_timeout:.0f}s (see its output above).")
+        if backend is not None and backend.poll() is None: backend.terminate()
+        return
+    print(f"✅ Backend ready in {time.monotonic() - started:.1f}s.")
 
     print("\n[Step 3/3] Launching Frontend Dashboard...")
     if system == "Windows":
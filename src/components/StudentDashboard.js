@@ -3,6 +3,16 @@ import { Footer, SidebarHeader, getCourseCategory, getDifficultyColor } from './
 import StrategySelector from './StrategySelector';
 import './StudentDashboard.css';
 
+const OUTCOME_LABELS = {
+    registered: 'Enrolled',
+    already_registered: 'Already enrolled',
+    waitlisted: 'Waitlisted (course is full)',
+    already_waitlisted: 'Already on the waitlist',
+    duplicate: 'Already recorded for this semester',
+    unknown_course: 'Not offered',
+};
+const ENROLLED = ['registered', 'already_registered'];
+
 const WeeklyTimetable = ({ courses }) => {
     const days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri'];
     const timeToPx = (time) => {
@@ -55,28 +65,34 @@ const StudentDashboard = ({ profile, passedCourses, onLogout }) => {
     const [error, setError] = useState("");
     const [strategy, setStrategy] = useState("balanced");
     const [isRegistered, setIsRegistered] = useState(profile.is_registered || false);
+    const [outcomes, setOutcomes] = useState([]);
 
     useEffect(() => {
-        fetch('http://127.0.0.1:5000/api/courses')
+        // The catalog stays a plain GET so the browser revalidates it with its ETag (304 + cached body);
+        // only the per-student reads go through /api/batch
+        const fail = () => setError('Could not load your courses. Please refresh the page.');
+        const catalogRequest = fetch('http://127.0.0.1:5000/api/courses').then(r => r.ok ? r.json() : Promise.reject(r));
+        const registrationsRequest = !isRegistered ? Promise.resolve(null) : fetch('http://127.0.0.1:5000/api/batch', {
+            method: 'POST', headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ ops: { registrations: { op: 'registrations', args: { roll_number: profile.roll_number } } } })
+        })
             .then(r => r.json())
-            .then(setCatalog);
-    }, []);
-
-    useEffect(() => {
-        if (isRegistered && catalog.length > 0) {
-            fetch(`http://127.0.0.1:5000/api/student/registrations?roll_number=${profile.roll_number}`)
-                .then(r => r.json())
-                .then(data => {
+            .then(batch => batch.success ? batch.results.registrations : Promise.reject(batch));
+        Promise.all([catalogRequest, registrationsRequest])
+            .then(([courses, registrations]) => {
+                setCatalog(courses);
+                if (registrations) {
                     const currentSemesterLabel = `Semester ${profile.current_semester}`;
-                    const registeredCourseIds = data
-                        .filter(reg => reg.semester_label.includes(currentSemesterLabel))
+                    const registeredCourseIds = registrations
+                        .filter(reg => reg.semester_label.includes(currentSemesterLabel) && reg.status !== 'Waitlisted')
                         .map(reg => reg.course_id);
                     
-                    const registeredCourses = catalog.filter(course => registeredCourseIds.includes(course.id));
+                    const registeredCourses = courses.filter(course => registeredCourseIds.includes(course.id));
                     setSchedule(registeredCourses);
-                });
-        }
-    }, [profile.roll_number, catalog, isRegistered, profile.current_semester]);
+                }
+            })
+            .catch(fail);
+    }, [profile.roll_number, isRegistered, profile.current_semester]);
     
     const generateRoadmap = async () => {
         const res = await fetch('http://127.0.0.1:5000/api/generate-path', {
@@ -117,7 +133,10 @@ const StudentDashboard = ({ profile, passedCourses, onLogout }) => {
             });
             const result = await res.json();
             if (result.success) {
-                setIsRegistered(true);
+                // Per course: registered, waitlisted (course full), already_registered / already_waitlisted, or unknown_course
+                const results = result.results || [];
+                setOutcomes(results);
+                setIsRegistered(results.some(r => ENROLLED.includes(r.outcome)));
                 setView('success');
             } else {
                 setError(result.message);
@@ -134,6 +153,7 @@ const StudentDashboard = ({ profile, passedCourses, onLogout }) => {
     };
 
     const totalCredits = schedule.reduce((acc, c) => acc + c.credits, 0);
+    const allEnrolled = outcomes.every(r => ENROLLED.includes(r.outcome));
     const isSemesterFull = totalCredits >= 18;
     const fypCourses = ['CMPC-6702', 'CMPC-6703'];
     const availableCourses = catalog.filter(c => !passedCourses.includes(c.id) && !fypCourses.includes(c.id));
@@ -169,7 +189,16 @@ const StudentDashboard = ({ profile, passedCourses, onLogout }) => {
 						<div className="content-body">
 								{view === 'success' && (
 										<div style={{textAlign:'center', padding:'50px'}}>
-												<h1 style={{fontSize:'4rem'}}>🎉</h1><h2>Registration Successful!</h2><button className="btn-primary" onClick={()=>setView('planner')}>Back</button>
+												<h1 style={{fontSize:'4rem'}}>{allEnrolled ? '🎉' : '⏳'}</h1>
+												<h2>{allEnrolled ? 'Registration Successful!' : 'Registration Submitted'}</h2>
+												<div style={{display:'inline-block', textAlign:'left', marginBottom:'20px'}}>
+														{outcomes.map(r => (
+																<div key={r.course_id} style={{padding:'4px 0'}}>
+																		<b>{(catalog.find(c => c.id === r.course_id) || {}).name || r.course_id}</b>: {OUTCOME_LABELS[r.outcome] || r.outcome}
+																</div>
+														))}
+												</div>
+												<div><button className="btn-primary" onClick={()=>setView('planner')}>Back</button></div>
 										</div>
 								)}
 